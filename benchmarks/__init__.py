@@ -0,0 +1,4 @@
+"""
+Benchmarks of the bot. Every module is runnable with
+`python -m benchmarks.<module>` from the project root.
+"""
@@ -0,0 +1,85 @@
+"""
+Benchmark of the keyboard cost per update: building the markup from
+SELECTOR on every update against taking it from the keyboard registry.
+
+Run: python -m benchmarks.bench_keyboards
+"""
+import argparse
+import timeit
+from typing import Callable, Dict
+
+from bot.keyboards import (
+    build_language_keyboard,
+    build_selection_keyboard,
+    build_sorting_keyboard,
+    build_url_keyboard,
+    get_language_keyboard,
+    get_selection_keyboard,
+    get_sorting_keyboard,
+    get_url_keyboard,
+)
+from settings.selector import SELECTOR
+
+
+def full_flow(
+    selection: Callable, url: Callable, sorting: Callable, language: Callable
+) -> Callable[[], None]:
+    """Return a function that takes every keyboard of one search."""
+
+    def flow() -> None:
+        language()
+        url("ru")
+        for filter_name in SELECTOR:
+            selection(filter_name, "ru")
+        sorting("ru")
+
+    return flow
+
+
+def measure(function: Callable[[], None], number: int) -> float:
+    """Return the best time of one call in microseconds."""
+    timer = timeit.Timer(function)
+    return min(timer.repeat(repeat=5, number=number)) / number * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=2000)
+    args = parser.parse_args()
+
+    cases: Dict[str, Dict[str, Callable[[], None]]] = {
+        "size keyboard (1 update)": {
+            "build": lambda: build_selection_keyboard("size", "ru"),
+            "registry": lambda: get_selection_keyboard("size", "ru"),
+        },
+        "danger keyboard (1 update)": {
+            "build": lambda: build_selection_keyboard("danger", "ru"),
+            "registry": lambda: get_selection_keyboard("danger", "ru"),
+        },
+        "whole search (9 updates)": {
+            "build": full_flow(
+                build_selection_keyboard,
+                build_url_keyboard,
+                build_sorting_keyboard,
+                build_language_keyboard,
+            ),
+            "registry": full_flow(
+                get_selection_keyboard,
+                get_url_keyboard,
+                get_sorting_keyboard,
+                get_language_keyboard,
+            ),
+        },
+    }
+    print(f"{'case':<28}{'build, us':>12}{'registry, us':>14}{'speedup':>10}")
+    for name, functions in cases.items():
+        build = measure(functions["build"], args.number)
+        registry = measure(functions["registry"], args.number)
+        print(
+            f"{name:<28}{build:>12.2f}{registry:>14.3f}"
+            f"{build / registry:>9.0f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Benchmark of the logging overhead per update.
+
+"before" repeats the logging calls of one filter step (generate_handlers,
+get_current_language, safe_send_message) the way they were written before:
+f-strings built even at INFO level and a RotatingFileHandler writing from
+the calling thread. "after" makes the same calls with lazy %-style
+arguments through a QueueHandler, the file is written by a QueueListener.
+
+Run: python -m benchmarks.bench_logging
+"""
+import argparse
+import logging
+import os
+import tempfile
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from queue import SimpleQueue
+from typing import Callable
+
+from bot.keyboards import get_selection_keyboard
+
+KEYBOARD = get_selection_keyboard("type", "en")
+DATA = {"current_language": "en", "url_size": "size=3", "url_type": "type=21"}
+TEXT = {"en": "Choose the alignment of the monster", "ru": "Выберите"}
+URL = "https://dnd.su/bestiary/?search=&size=3&type=21"
+
+
+def format_reply_markup_for_log(reply_markup):
+    # Copy of bot.utils.format_reply_markup_for_log, importing bot.utils
+    # requires BOT_TOKEN
+    return [
+        {"text": button.text, "callback_data": button.callback_data}
+        for row in reply_markup.inline_keyboard[:3]
+        for button in row[:3]
+    ]
+
+
+def update_before(logger: logging.Logger) -> None:
+    logger.debug(f"data in state = {list(DATA.keys()) if DATA else 'None'}")
+    logger.debug(f"Keyword {'type'}")
+    logger.debug({f"url_{'type'}": "type=21"})
+    logger.debug(f"{'Current state'}: {'FSMSearchAC:type_selection'}")
+    logger.debug(f"chat_id = {42}, keyboard = {KEYBOARD}")
+    logger.debug(
+        "STARTED chat_id = {}, text = {}".format(
+            42,
+            f"{list(TEXT.keys())[0]}: {str(list(TEXT.values())[0])[:30]}",
+        )
+    )
+    logger.debug(f"current_language = {DATA['current_language']}")
+    logger.debug(f"clean_text = {TEXT['en'][:20]}")
+    logger.debug(f"reply_markup = {format_reply_markup_for_log(KEYBOARD)}")
+    logger.info(f"Final url is {URL}")
+
+
+def update_after(logger: logging.Logger) -> None:
+    debug = logger.isEnabledFor(logging.DEBUG)
+    if debug:
+        logger.debug("data in state = %s", list(DATA) if DATA else None)
+    logger.debug("Keyword %s", "type")
+    logger.debug("url_%s: %s", "type", "type=21")
+    logger.debug("%s: %s", "Current state", "FSMSearchAC:type_selection")
+    logger.debug("chat_id = %s, keyboard = %s", 42, KEYBOARD)
+    if debug:
+        logger.debug(
+            "STARTED chat_id = %s, text = %s",
+            42,
+            f"{list(TEXT.keys())[0]}: {str(list(TEXT.values())[0])[:30]}",
+        )
+    logger.debug("current_language = %s", DATA["current_language"])
+    logger.debug("clean_text = %s", TEXT["en"][:20])
+    if debug:
+        logger.debug(
+            "reply_markup = %s", format_reply_markup_for_log(KEYBOARD)
+        )
+    logger.info("Final url is %s", URL)
+
+
+def measure(update: Callable[[], None], updates: int) -> float:
+    """Return the mean time of one update in microseconds."""
+    start = time.perf_counter()
+    for _ in range(updates):
+        update()
+    return (time.perf_counter() - start) / updates * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--updates", type=int, default=20000)
+    args = parser.parse_args()
+    formatter = logging.Formatter(
+        "%(asctime)s %(levelname)s %(funcName)s %(message)s"
+    )
+
+    with tempfile.TemporaryDirectory() as directory:
+        file_handler = RotatingFileHandler(
+            os.path.join(directory, "before.log"), maxBytes=1000000
+        )
+        file_handler.setFormatter(formatter)
+        before = logging.getLogger("benchmarks.logging.before")
+        before.propagate = False
+        before.setLevel(logging.INFO)
+        before.addHandler(file_handler)
+
+        queue: SimpleQueue = SimpleQueue()
+        queued_file_handler = RotatingFileHandler(
+            os.path.join(directory, "after.log"), maxBytes=1000000
+        )
+        queued_file_handler.setFormatter(formatter)
+        listener = QueueListener(queue, queued_file_handler)
+        listener.start()
+        after = logging.getLogger("benchmarks.logging.after")
+        after.propagate = False
+        after.setLevel(logging.INFO)
+        after.addHandler(QueueHandler(queue))
+
+        before_us = measure(lambda: update_before(before), args.updates)
+        after_us = measure(lambda: update_after(after), args.updates)
+        listener.stop()
+        file_handler.close()
+        queued_file_handler.close()
+
+    print(f"{'logging per update':<22}{'us':>10}")
+    print(f"{'before':<22}{before_us:>10.2f}")
+    print(f"{'after':<22}{after_us:>10.2f}")
+    print(f"{'speedup':<22}{before_us / after_us:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+"""
+Offline benchmark of the scraper against a recorded or generated corpus of
+dnd.su listing pages served by a local stub server (benchmarks/dnd_stub.py).
+
+Stages: get_soup (fetch and html parsing), scrape_cards and is_last_page
+are measured page by page, scrape_bestiary end to end for every search.
+Speed is measured without tracemalloc, memory in a separate pass with it.
+The results are saved as JSON, --baseline compares them with an earlier
+run.
+
+Run: python -m benchmarks.bench_scraper [--corpus DIR] [--baseline FILE]
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Any, Dict, Optional
+
+import aiohttp
+
+from benchmarks.dnd_stub import (
+    Corpus,
+    DEFAULT_CORPUS_DIR,
+    load_corpus,
+    search_url,
+    start_stub_server,
+    synthetic_corpus,
+)
+from scraper import scraper
+from settings.constantns import SCRAPER_SETTINGS
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None  # type: ignore [assignment]
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def peak_rss_kb() -> Optional[int]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def rate(amount: float, seconds: float) -> float:
+    return amount / seconds if seconds else 0.0
+
+
+async def bench_stages(
+    session: aiohttp.ClientSession, base_url: str, corpus: Corpus
+) -> Dict[str, Dict[str, float]]:
+    """Time every stage over all pages of the corpus."""
+    seconds = {"get_soup": 0.0, "scrape_cards": 0.0, "is_last_page": 0.0}
+    pages = cards = 0
+    for name, listing in corpus.items():
+        for page in range(1, len(listing) + 1):
+            url = search_url(base_url, name) + f"&page={page}"
+            start = time.perf_counter()
+            soup = await scraper.get_soup(session=session, current_url=url)
+            seconds["get_soup"] += time.perf_counter() - start
+            if soup is None:
+                continue
+            page_cards = soup.find_all("div", class_="card")
+            start = time.perf_counter()
+            scraper.scrape_cards(page_cards, 0, 30)
+            seconds["scrape_cards"] += time.perf_counter() - start
+            start = time.perf_counter()
+            scraper.is_last_page(soup)
+            seconds["is_last_page"] += time.perf_counter() - start
+            pages += 1
+            cards += len(page_cards)
+    return {
+        stage: {
+            "seconds": round(total, 6),
+            "pages_per_s": round(rate(pages, total), 2),
+            "cards_per_s": round(rate(cards, total), 2),
+        }
+        for stage, total in seconds.items()
+    }
+
+
+async def bench_searches(
+    base_url: str, corpus: Corpus, repeat: int
+) -> Dict[str, Dict[str, Any]]:
+    """Run scrape_bestiary over every search, best of `repeat` runs."""
+    results = {}
+    for name, listing in corpus.items():
+        best = float("inf")
+        found = 0
+        for _ in range(repeat):
+            start = time.perf_counter()
+            monsters = await scraper.scrape_bestiary(
+                search_url(base_url, name), 0, 30
+            )
+            best = min(best, time.perf_counter() - start)
+            found = len(monsters)
+        results[name] = {
+            "pages": len(listing),
+            "cards": found,
+            "seconds": round(best, 6),
+            "pages_per_s": round(rate(len(listing), best), 2),
+            "cards_per_s": round(rate(found, best), 2),
+        }
+    return results
+
+
+async def bench_memory(
+    base_url: str, corpus: Corpus
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Measure allocations of scrape_bestiary with tracemalloc.
+
+    peak_kb is the tracemalloc peak during the search, gen0_collections
+    counts the young generation collections, which the interpreter runs
+    after every ~700 container allocations, so it follows allocation churn.
+    retained_blocks are memory blocks still alive after the search besides
+    the result.
+    """
+    results = {}
+    for name in corpus:
+        gc.collect()
+        collections = gc.get_stats()[0]["collections"]
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        monsters = await scraper.scrape_bestiary(
+            search_url(base_url, name), 0, 30
+        )
+        _, peak = tracemalloc.get_traced_memory()
+        del monsters
+        gc.collect()
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        retained = sum(
+            stat.count_diff
+            for stat in after.compare_to(before, "filename")
+            if stat.count_diff > 0
+        )
+        results[name] = {
+            "peak_kb": round(peak / 1024, 1),
+            "gen0_collections": gc.get_stats()[0]["collections"] - collections,
+            "retained_blocks": retained,
+            "peak_rss_kb": peak_rss_kb(),
+        }
+    return results
+
+
+async def run(corpus: Corpus, repeat: int) -> Dict[str, Any]:
+    runner, base_url = await start_stub_server(corpus)
+    try:
+        async with aiohttp.ClientSession() as session:
+            # Warm up the connection and the parser
+            await scraper.get_soup(
+                session=session,
+                current_url=search_url(base_url, next(iter(corpus))),
+            )
+            stages = await bench_stages(session, base_url, corpus)
+        searches = await bench_searches(base_url, corpus, repeat)
+        memory = await bench_memory(base_url, corpus)
+    finally:
+        await runner.cleanup()
+    return {"stages": stages, "searches": searches, "memory": memory}
+
+
+def print_results(
+    results: Dict[str, Any], baseline: Optional[Dict[str, Any]]
+) -> None:
+    def change(section: str, name: str, key: str) -> str:
+        if not baseline or name not in baseline.get(section, {}):
+            return ""
+        old = baseline[section][name][key]
+        new = results[section][name][key]
+        return f"{(new / old - 1) * 100:+7.1f}%" if old else ""
+
+    print(f"{'stage':<16}{'pages/s':>12}{'cards/s':>12}")
+    for name, stage in results["stages"].items():
+        print(
+            f"{name:<16}{stage['pages_per_s']:>12.1f}"
+            f"{stage['cards_per_s']:>12.1f}"
+            f" {change('stages', name, 'pages_per_s')}"
+        )
+    print(
+        f"\n{'search':<16}{'pages':>7}{'cards':>7}{'pages/s':>10}"
+        f"{'cards/s':>10}{'peak KB':>10}{'gen0 gc':>9}{'RSS KB':>10}"
+    )
+    for name, search in results["searches"].items():
+        memory = results["memory"][name]
+        print(
+            f"{name:<16}{search['pages']:>7}{search['cards']:>7}"
+            f"{search['pages_per_s']:>10.1f}{search['cards_per_s']:>10.1f}"
+            f"{memory['peak_kb']:>10.1f}{memory['gen0_collections']:>9}"
+            f"{memory['peak_rss_kb'] or 0:>10}"
+            f" {change('searches', name, 'pages_per_s')}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--corpus",
+        default=DEFAULT_CORPUS_DIR,
+        help="recorded corpus, the generated one is used if it is empty",
+    )
+    parser.add_argument("--cards-per-page", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="path of the JSON results")
+    parser.add_argument("--baseline", help="JSON results to compare with")
+    args = parser.parse_args()
+
+    # The stub is local: no politeness pauses
+    SCRAPER_SETTINGS["SLEEP_TIME"] = 0
+    scraper.rate_limiter.interval = 0
+
+    corpus = load_corpus(args.corpus)
+    source = args.corpus
+    if not corpus:
+        corpus = synthetic_corpus(cards_per_page=args.cards_per_page)
+        source = f"synthetic, {args.cards_per_page} cards per page"
+    commit = git_commit()
+    results: Dict[str, Any] = {
+        "commit": commit,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "corpus": source,
+        **asyncio.run(run(corpus, args.repeat)),
+        "peak_rss_kb": peak_rss_kb(),
+    }
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+
+    output = args.output or os.path.join(
+        RESULTS_DIR,
+        f"scraper-{commit or 'unknown'}-{time.strftime('%Y%m%d%H%M%S')}.json",
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    print(f"\nResults are saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
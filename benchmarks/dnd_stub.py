@@ -0,0 +1,250 @@
+"""
+The module contains a local stand-in for the dnd.su bestiary listing.
+
+A corpus maps a search name to its listing pages. It is either recorded
+from dnd.su once (one directory per search with page_1.html, page_2.html,
+...) or generated with the same markup the scraper reads. The stub server
+answers /bestiary/?search=<name>&page=<n> from the corpus, so benchmarks
+and load tests never touch the real site.
+
+Record a search: python -m benchmarks.dnd_stub URL NAME [--corpus DIR]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import re
+from typing import Dict, List, Optional, Tuple
+
+import aiohttp
+from aiohttp import web
+from bs4 import BeautifulSoup
+
+from scraper.scraper import is_last_page, rate_limiter
+from settings.constantns import SCRAPER_CONSTANTS, SCRAPER_SETTINGS
+
+logger = logging.getLogger(__name__)
+
+Corpus = Dict[str, List[str]]
+
+DEFAULT_CORPUS_DIR = os.path.join(os.path.dirname(__file__), "corpus")
+# Search name -> number of listing pages, from a one page filter to the
+# whole bestiary
+SYNTHETIC_SEARCHES: Dict[str, int] = {
+    "single": 1,
+    "small": 3,
+    "medium": 12,
+    "large": 42,
+}
+CARDS_PER_PAGE = 20
+SIZES = ("Крошечный", "Маленький", "Средний", "Большой", "Огромный")
+DANGERS = ("0", "1/8", "1/4", "1/2", "1", "2", "5", "10", "17", "—")
+PAGE_FILE = re.compile(r"^page_(\d+)\.html$")
+
+
+def make_card(number: int, rng: random.Random) -> str:
+    armor_class = rng.randint(5, 25)
+    danger = rng.choice(DANGERS)
+    return f"""
+    <div class="card">
+        <div class="card-header">
+            <h2 class="card-title" itemprop="name">
+                <a href="/bestiary/{number}-monster-{number}/" target="_blank"
+                itemprop="url" class="item-link">Монстр {number} [Monster
+                {number}]</a>
+            </h2>
+        </div>
+        <div class="card-body new-article" itemprop="articleBody">
+            <ul class="params">
+                <li class="size-type-alignment">{rng.choice(SIZES)}
+                чудовище, без мировоззрения</li>
+                <li class=""><strong>Класс Доспеха</strong> {armor_class}
+                (природный доспех)</li>
+                <li class=""><strong>Хиты</strong> {rng.randint(1, 300)}
+                ({rng.randint(1, 20)}к10)</li>
+                <li class=""><strong>Скорость</strong> 30 фт.</li>
+                <li class=""><strong>Опасность</strong> {danger}
+                ({rng.randint(10, 20000)} опыта)</li>
+            </ul>
+        </div>
+        <div class="card-footer"></div>
+    </div>"""
+
+
+def make_page(cards: List[str], page: int, pages: int) -> str:
+    pagination = "".join(
+        f'<li class="page-item"><a href="?page={number}">{number}</a></li>'
+        for number in range(max(1, page - 2), min(pages, page + 2) + 1)
+    )
+    if page < pages:
+        pagination += (
+            f'<li class="page-item"><a href="?page={page + 1}">'
+            f'{SCRAPER_CONSTANTS["NEXT_PAGE_INDICATOR"]}</a></li>'
+        )
+    navigation = (
+        f'<ul class="pagination">{pagination}</ul>' if pages > 1 else ""
+    )
+    return (
+        "<!DOCTYPE html><html><head><title>Бестиарий</title></head><body>"
+        '<div class="container"><div class="cards-wrapper">'
+        + "".join(cards)
+        + f"</div>{navigation}</div></body></html>"
+    )
+
+
+def synthetic_corpus(
+    searches: Optional[Dict[str, int]] = None,
+    cards_per_page: int = CARDS_PER_PAGE,
+    seed: int = 0,
+) -> Corpus:
+    """
+    Generate listing pages with the markup of dnd.su.
+
+    Args:
+        searches (Optional[Dict[str, int]]): Search name -> number of pages.
+        Defaults to SYNTHETIC_SEARCHES.
+        cards_per_page (int): Number of monster cards on a page.
+        seed (int): Seed of the random armor classes and dangers.
+
+    Returns:
+        Corpus: Search name -> pages.
+    """
+    rng = random.Random(seed)
+    corpus: Corpus = {}
+    number = 0
+    for name, pages in (searches or SYNTHETIC_SEARCHES).items():
+        corpus[name] = []
+        for page in range(1, pages + 1):
+            cards = []
+            for _ in range(cards_per_page):
+                number += 1
+                cards.append(make_card(number, rng))
+            corpus[name].append(make_page(cards, page, pages))
+    return corpus
+
+
+def load_corpus(directory: str) -> Corpus:
+    """
+    Read a recorded corpus: one subdirectory per search with page_N.html.
+
+    Args:
+        directory (str): The corpus directory.
+
+    Returns:
+        Corpus: Search name -> pages, empty if there is no corpus.
+    """
+    corpus: Corpus = {}
+    if not os.path.isdir(directory):
+        return corpus
+    for name in sorted(os.listdir(directory)):
+        search_dir = os.path.join(directory, name)
+        if not os.path.isdir(search_dir):
+            continue
+        numbered = sorted(
+            (int(match.group(1)), file_name)
+            for file_name in os.listdir(search_dir)
+            if (match := PAGE_FILE.match(file_name))
+        )
+        pages = []
+        for _, file_name in numbered:
+            with open(
+                os.path.join(search_dir, file_name), encoding="utf-8"
+            ) as f:
+                pages.append(f.read())
+        if pages:
+            corpus[name] = pages
+    return corpus
+
+
+def make_app(corpus: Corpus) -> web.Application:
+    async def handle_bestiary(request: web.Request) -> web.Response:
+        pages = corpus.get(request.query.get("search", ""))
+        if not pages:
+            raise web.HTTPNotFound()
+        try:
+            page = int(request.query.get("page", "1"))
+        except ValueError:
+            page = 1
+        # dnd.su answers pages past the end with the last page
+        html = pages[min(max(page, 1), len(pages)) - 1]
+        return web.Response(text=html, content_type="text/html")
+
+    app = web.Application()
+    app.router.add_get("/bestiary/", handle_bestiary)
+    return app
+
+
+async def start_stub_server(
+    corpus: Corpus, host: str = "127.0.0.1", port: int = 0
+) -> Tuple[web.AppRunner, str]:
+    """
+    Serve the corpus on a local port.
+
+    Args:
+        corpus (Corpus): The pages to serve.
+        host (str): The interface to listen on.
+        port (int): The port, 0 takes a free one.
+
+    Returns:
+        Tuple[web.AppRunner, str]: The runner, call its cleanup() to stop
+        the server, and the base URL, for example "http://127.0.0.1:4242".
+    """
+    runner = web.AppRunner(make_app(corpus), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host=host, port=port)
+    await site.start()
+    bound_host, bound_port = runner.addresses[0][:2]
+    return runner, f"http://{bound_host}:{bound_port}"
+
+
+def search_url(base_url: str, name: str) -> str:
+    """Return the listing URL of a corpus search in the scraper format."""
+    return f"{base_url}/bestiary/?search={name}"
+
+
+async def record_search(url: str, name: str, directory: str) -> int:
+    """
+    Download all listing pages of a dnd.su search into the corpus.
+
+    Args:
+        url (str): The search URL, as it is passed to scrape_bestiary.
+        name (str): The name of the search in the corpus.
+        directory (str): The corpus directory.
+
+    Returns:
+        int: The number of recorded pages.
+    """
+    search_dir = os.path.join(directory, name)
+    os.makedirs(search_dir, exist_ok=True)
+    headers = {"User-Agent": SCRAPER_CONSTANTS["USER_AGENT"]}
+    page = 0
+    async with aiohttp.ClientSession(headers=headers) as session:
+        last_page = False
+        while not last_page and page < SCRAPER_SETTINGS["MAX_PAGES"]:
+            page += 1
+            await rate_limiter.wait()
+            async with session.get(url + f"&page={page}") as response:
+                html = await response.text()
+            path = os.path.join(search_dir, f"page_{page}.html")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(html)
+            last_page = is_last_page(BeautifulSoup(html, "lxml"))
+            await asyncio.sleep(SCRAPER_SETTINGS["SLEEP_TIME"])
+    return page
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Record a dnd.su search into the benchmark corpus"
+    )
+    parser.add_argument("url", help="https://dnd.su/bestiary/?search=...")
+    parser.add_argument("name", help="name of the search in the corpus")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS_DIR)
+    args = parser.parse_args()
+    pages = asyncio.run(record_search(args.url, args.name, args.corpus))
+    print(f"Recorded {pages} pages into {args.corpus}/{args.name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""
+The module contains a local fake of the Telegram Bot API for load tests.
+
+It implements the methods the bot uses: getMe, deleteWebhook, getUpdates
+(long polling), sendMessage, answerCallbackQuery and editMessageText.
+Updates are pushed by the test with push_update(), everything the bot
+sends to a chat is put into the inbox of that chat. A share of the
+outgoing calls can be answered with 429 Too Many Requests.
+"""
+import asyncio
+import itertools
+import json
+import logging
+import random
+import time
+from collections import Counter, defaultdict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+BOT_USER = {
+    "id": 42,
+    "is_bot": True,
+    "first_name": "Armor class bot",
+    "username": "armor_class_bot",
+}
+LIMITED_METHODS = ("sendmessage", "answercallbackquery", "editmessagetext")
+_callback_ids = itertools.count(1)
+
+Handler = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+
+class FakeBotAPI:
+    """
+    In-memory Bot API server.
+
+    Attributes:
+        error_rate (float): Share of sendMessage, answerCallbackQuery and
+        editMessageText calls answered with 429.
+        retry_after (int): retry_after of the injected 429 answers.
+        calls (Counter): Number of calls of every method, "429" counts the
+        injected errors.
+        inboxes (Dict[int, asyncio.Queue]): Messages sent to every chat.
+    """
+
+    def __init__(
+        self, error_rate: float = 0.0, retry_after: int = 1, seed: int = 0
+    ) -> None:
+        self.error_rate: float = error_rate
+        self.retry_after: int = retry_after
+        self.calls: Counter = Counter()
+        self.inboxes: Dict[int, asyncio.Queue] = defaultdict(asyncio.Queue)
+        self._random = random.Random(seed)
+        self._updates: List[Dict[str, Any]] = []
+        self._next_update_id: int = 1
+        self._next_message_id: int = 1
+        self._new_updates = asyncio.Event()
+        self._methods: Dict[str, Handler] = {
+            "getme": self.get_me,
+            "deletewebhook": self.delete_webhook,
+            "getupdates": self.get_updates,
+            "sendmessage": self.send_message,
+            "answercallbackquery": self.answer_callback_query,
+            "editmessagetext": self.edit_message_text,
+        }
+
+    def push_update(self, update: Dict[str, Any]) -> int:
+        """
+        Queue an update for the bot.
+
+        Args:
+            update (Dict[str, Any]): The update without update_id.
+
+        Returns:
+            int: The assigned update_id.
+        """
+        update_id = self._next_update_id
+        self._next_update_id += 1
+        self._updates.append({"update_id": update_id, **update})
+        self._new_updates.set()
+        return update_id
+
+    def make_message(
+        self, chat_id: int, text: str, sender: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        message_id = self._next_message_id
+        self._next_message_id += 1
+        return {
+            "message_id": message_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": sender,
+            "text": text,
+        }
+
+    async def get_me(self, params: Dict[str, Any]) -> Any:
+        return BOT_USER
+
+    async def delete_webhook(self, params: Dict[str, Any]) -> Any:
+        return True
+
+    async def get_updates(self, params: Dict[str, Any]) -> Any:
+        offset = int(params.get("offset") or 0)
+        timeout = float(params.get("timeout") or 0)
+        # Updates before the offset are confirmed by the bot
+        self._updates = [
+            update for update in self._updates if update["update_id"] >= offset
+        ]
+        if not self._updates and timeout:
+            self._new_updates.clear()
+            try:
+                await asyncio.wait_for(self._new_updates.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        limit = int(params.get("limit") or 100)
+        return self._updates[:limit]
+
+    async def send_message(self, params: Dict[str, Any]) -> Any:
+        chat_id = int(params["chat_id"])
+        message = self.make_message(chat_id, params.get("text", ""), BOT_USER)
+        if params.get("reply_markup"):
+            message["reply_markup"] = json.loads(params["reply_markup"])
+        await self.inboxes[chat_id].put(message)
+        return message
+
+    async def answer_callback_query(self, params: Dict[str, Any]) -> Any:
+        return True
+
+    async def edit_message_text(self, params: Dict[str, Any]) -> Any:
+        chat_id = int(params.get("chat_id") or 0)
+        message = self.make_message(chat_id, params.get("text", ""), BOT_USER)
+        message["message_id"] = int(params.get("message_id") or 0)
+        await self.inboxes[chat_id].put(message)
+        return message
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"].lower()
+        handler = self._methods.get(method)
+        self.calls[method] += 1
+        if handler is None:
+            return web.json_response(
+                {
+                    "ok": False,
+                    "error_code": 404,
+                    "description": "Not Found: method not found",
+                },
+                status=404,
+            )
+        if (
+            method in LIMITED_METHODS
+            and self._random.random() < self.error_rate
+        ):
+            self.calls["429"] += 1
+            return web.json_response(
+                {
+                    "ok": False,
+                    "error_code": 429,
+                    "description": "Too Many Requests: retry after "
+                    f"{self.retry_after}",
+                    "parameters": {"retry_after": self.retry_after},
+                },
+                status=429,
+            )
+        params: Dict[str, Any] = dict(request.query)
+        if request.can_read_body:
+            params.update(await request.post())
+        result = await handler(params)
+        return web.json_response({"ok": True, "result": result})
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_route("*", "/bot{token}/{method}", self.handle)
+        return app
+
+
+async def start_fake_bot_api(
+    api: FakeBotAPI, host: str = "127.0.0.1", port: int = 0
+) -> Tuple[web.AppRunner, str]:
+    """
+    Serve the fake Bot API on a local port.
+
+    Args:
+        api (FakeBotAPI): The fake to serve.
+        host (str): The interface to listen on.
+        port (int): The port, 0 takes a free one.
+
+    Returns:
+        Tuple[web.AppRunner, str]: The runner, call its cleanup() to stop
+        the server, and the base URL for TelegramAPIServer.from_base().
+    """
+    runner = web.AppRunner(api.make_app(), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host=host, port=port).start()
+    bound_host, bound_port = runner.addresses[0][:2]
+    return runner, f"http://{bound_host}:{bound_port}"
+
+
+def make_user(chat_id: int) -> Dict[str, Any]:
+    return {"id": chat_id, "is_bot": False, "first_name": f"user{chat_id}"}
+
+
+def message_update(api: FakeBotAPI, chat_id: int, text: str) -> Dict[str, Any]:
+    message = api.make_message(chat_id, text, make_user(chat_id))
+    if text.startswith("/"):
+        message["entities"] = [
+            {"type": "bot_command", "offset": 0, "length": len(text)}
+        ]
+    return {"message": message}
+
+
+def callback_update(
+    api: FakeBotAPI,
+    chat_id: int,
+    data: str,
+    message: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    return {
+        "callback_query": {
+            "id": str(next(_callback_ids)),
+            "from": make_user(chat_id),
+            "chat_instance": str(chat_id),
+            "data": data,
+            "message": message or api.make_message(chat_id, "", BOT_USER),
+        }
+    }
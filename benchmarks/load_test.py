@@ -0,0 +1,297 @@
+"""
+Load test of the whole bot against a fake Bot API and a dnd.su stub.
+
+Simulated chats go through the full flow: /start, language, "form a
+link", a random button of every filter keyboard, an armor class range and
+a sorting button, waiting for the reply of the bot after every step. The
+bot runs in this process with long polling, its storage is a temporary
+file, the scraper reads the local stub without pauses.
+
+Reported: completed chats and updates per second, latency percentiles
+of every step (from pushing the update to the first reply), the handler
+latency recorded by the bot, injected 429 answers and memory growth.
+The generator, both fakes and the bot share one event loop, so the
+numbers are a lower bound for a dedicated bot process.
+
+Run: python -m benchmarks.load_test [--chats 1000] [--concurrency 100]
+     [--error-rate 0.01]
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+from benchmarks.dnd_stub import search_url, start_stub_server, synthetic_corpus
+from benchmarks.fake_bot_api import (
+    callback_update,
+    FakeBotAPI,
+    message_update,
+    start_fake_bot_api,
+)
+from bot.states import PHRASES_AND_STATES
+from metrics.registry import REGISTRY
+from settings.constantns import (
+    BESTIARY_SETTINGS,
+    CALLBACK_DATA,
+    DETAILS_SETTINGS,
+    LANGUAGES,
+    METRICS_SETTINGS,
+    SCRAPER_SETTINGS,
+    STORAGE_SETTINGS,
+)
+from settings.messages import MESSAGES
+
+TOKEN = "42:load-test"
+
+
+def current_rss_kb() -> Optional[int]:
+    try:
+        with open("/proc/self/statm") as statm:
+            pages = int(statm.read().split()[1])
+    except (OSError, IndexError, ValueError):  # Not Linux
+        return None
+    return pages * os.sysconf("SC_PAGE_SIZE") // 1024
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {}
+    ordered = sorted(values)
+    return {
+        f"p{share}": round(
+            ordered[min(len(ordered) * share // 100, len(ordered) - 1)] * 1000,
+            2,
+        )
+        for share in (50, 90, 95, 99)
+    }
+
+
+def random_button(message: Dict[str, Any], rng: random.Random) -> str:
+    rows = (message.get("reply_markup") or {}).get("inline_keyboard", [])
+    buttons = [button["callback_data"] for row in rows for button in row]
+    return rng.choice(buttons)
+
+
+class Chat:
+    """
+    One simulated user.
+
+    Attributes:
+        chat_id (int): The chat id and the user id.
+        latencies (Dict[str, List[float]]): Seconds from an update of the
+        step to the first reply, shared by all chats.
+    """
+
+    def __init__(
+        self,
+        api: FakeBotAPI,
+        chat_id: int,
+        latencies: Dict[str, List[float]],
+        step_timeout: float,
+        rng: random.Random,
+    ) -> None:
+        self.api: FakeBotAPI = api
+        self.chat_id: int = chat_id
+        self.latencies: Dict[str, List[float]] = latencies
+        self.step_timeout: float = step_timeout
+        self.rng: random.Random = rng
+        self.last_message: Dict[str, Any] = {}
+
+    async def step(self, name: str, update: Dict[str, Any]) -> None:
+        inbox = self.api.inboxes[self.chat_id]
+        start = time.perf_counter()
+        self.api.push_update(update)
+        self.last_message = await asyncio.wait_for(
+            inbox.get(), self.step_timeout
+        )
+        self.latencies[name].append(time.perf_counter() - start)
+
+    async def click(self, name: str, data: str) -> None:
+        await self.step(
+            name,
+            callback_update(self.api, self.chat_id, data, self.last_message),
+        )
+
+    async def run(self) -> None:
+        language = self.rng.choice(list(LANGUAGES.values()))
+        await self.step(
+            "start", message_update(self.api, self.chat_id, "/start")
+        )
+        await self.click("language", language)
+        await self.click("url_form", CALLBACK_DATA["URL_FORM"])
+        for keyword in PHRASES_AND_STATES:
+            await self.click(
+                keyword, random_button(self.last_message, self.rng)
+            )
+        low = self.rng.randint(5, 20)
+        await self.step(
+            "armor_class",
+            message_update(
+                self.api, self.chat_id, f"{low} {low + self.rng.randint(0, 5)}"
+            ),
+        )
+        if not self.last_message.get("reply_markup"):
+            return  # Nothing found, the bot has ended the search
+        await self.click("sort", random_button(self.last_message, self.rng))
+        final_word = MESSAGES["FINAL_WORD"][language]
+        inbox = self.api.inboxes[self.chat_id]
+        while self.last_message.get("text") != final_word:
+            self.last_message = await asyncio.wait_for(
+                inbox.get(), self.step_timeout
+            )
+
+
+async def run_load(args: argparse.Namespace) -> Dict[str, Any]:
+    api = FakeBotAPI(error_rate=args.error_rate, seed=args.seed)
+    api_runner, api_url = await start_fake_bot_api(api)
+    stub_runner, stub_url = await start_stub_server(
+        synthetic_corpus({"load": args.pages})
+    )
+    # The bot modules create the bot and read the settings at import time,
+    # so they are imported only after both point to the fakes
+    os.environ["BOT_TOKEN"] = TOKEN
+    os.environ["BOT_API_URL"] = api_url
+    from bot import bot as bot_module
+    from scraper import scraper
+
+    scraper.rate_limiter.interval = 0
+    bot_module.BASE_FORMED_URL = search_url(stub_url, "load")
+    await bot_module.dynamic_handlers_registration()
+    await bot_module.register_routers()
+    polling = asyncio.create_task(
+        bot_module.dp.start_polling(
+            bot_module.bot, handle_signals=False, polling_timeout=1
+        )
+    )
+
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    rng = random.Random(args.seed)
+    semaphore = asyncio.Semaphore(args.concurrency)
+    failed = 0
+
+    async def simulate(chat_id: int) -> None:
+        nonlocal failed
+        async with semaphore:
+            chat = Chat(api, chat_id, latencies, args.step_timeout, rng)
+            try:
+                await chat.run()
+            except asyncio.TimeoutError:
+                failed += 1
+            api.inboxes.pop(chat_id, None)
+
+    gc.collect()
+    rss_before = current_rss_kb()
+    objects_before = len(gc.get_objects())
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(simulate(1000 + index) for index in range(args.chats))
+    )
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    rss_after = current_rss_kb()
+
+    await bot_module.dp.stop_polling()
+    await polling
+    await bot_module.storage.flush()
+    handler_latency = REGISTRY.histogram(
+        "bot_handler_seconds", "", ["handler"]
+    )
+    handlers = {
+        " ".join(labels): round(state[-2] / state[-1] * 1000, 2)
+        for labels, state in handler_latency._values.items()
+        if state[-1]
+    }
+    await stub_runner.cleanup()
+    await api_runner.cleanup()
+
+    updates = sum(len(values) for values in latencies.values())
+    return {
+        "chats": args.chats,
+        "concurrency": args.concurrency,
+        "pages_per_search": args.pages,
+        "error_rate": args.error_rate,
+        "seconds": round(elapsed, 3),
+        "completed_chats": args.chats - failed,
+        "failed_chats": failed,
+        "chats_per_s": round((args.chats - failed) / elapsed, 2),
+        "updates_per_s": round(updates / elapsed, 2),
+        "step_latency_ms": {
+            name: percentiles(values) for name, values in latencies.items()
+        },
+        "handler_mean_ms": handlers,
+        "api_calls": dict(api.calls),
+        "rss_before_kb": rss_before,
+        "rss_after_kb": rss_after,
+        "rss_growth_kb": (
+            rss_after - rss_before if rss_before and rss_after else None
+        ),
+        "gc_objects_growth": len(gc.get_objects()) - objects_before,
+    }
+
+
+def print_results(results: Dict[str, Any]) -> None:
+    print(
+        f"{results['completed_chats']} of {results['chats']} chats completed"
+        f" in {results['seconds']} s: {results['chats_per_s']} chats/s,"
+        f" {results['updates_per_s']} updates/s"
+    )
+    print(
+        f"429 answers: {results['api_calls'].get('429', 0)},"
+        f" RSS growth: {results['rss_growth_kb']} KB,"
+        f" objects growth: {results['gc_objects_growth']}"
+    )
+    print(f"\n{'step':<14}{'p50 ms':>10}{'p90 ms':>10}{'p95 ms':>10}"
+          f"{'p99 ms':>10}")  # fmt: skip
+    for name, values in results["step_latency_ms"].items():
+        print(
+            f"{name:<14}{values['p50']:>10.1f}{values['p90']:>10.1f}"
+            f"{values['p95']:>10.1f}{values['p99']:>10.1f}"
+        )
+    print("\nMean handler time, ms")
+    for name, value in sorted(results["handler_mean_ms"].items()):
+        print(f"  {name:<36}{value:>10.2f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chats", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument(
+        "--pages", type=int, default=3, help="listing pages of every search"
+    )
+    parser.add_argument(
+        "--error-rate",
+        type=float,
+        default=0.0,
+        help="share of outgoing calls answered with 429",
+    )
+    parser.add_argument("--step-timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="path of the JSON results")
+    args = parser.parse_args()
+
+    storage_dir = tempfile.mkdtemp(prefix="armor_class_load_")
+    STORAGE_SETTINGS["PATH"] = os.path.join(storage_dir, "fsm.sqlite3")
+    # Searches go to the stub, not to a local bestiary
+    BESTIARY_SETTINGS["PATH"] = os.path.join(storage_dir, "bestiary.json")
+    BESTIARY_SETTINGS["SNAPSHOT_PATH"] = os.path.join(storage_dir, "snapshot")
+    METRICS_SETTINGS["ENABLED"] = False
+    DETAILS_SETTINGS["ENABLED"] = False  # The stub has no monster pages
+    SCRAPER_SETTINGS["SLEEP_TIME"] = 0
+    results = asyncio.run(run_load(args))
+    print_results(results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    sys.exit(1 if results["failed_chats"] else 0)
+
+
+if __name__ == "__main__":
+    main()
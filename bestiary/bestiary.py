@@ -0,0 +1,162 @@
+"""
+The module contains the local copy of the dnd.su bestiary.
+
+Monsters are numbered in the order of the full bestiary listing, the order
+dnd.su shows search results in. For every value of every filter from
+settings/selector.py the bestiary keeps the monsters dnd.su returns for
+this value alone as an int bitset: bit i is set if monster i matches.
+A search with several filters is the AND of their bitsets.
+"""
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+from urllib.parse import urlsplit
+
+from scraper.monster_card import MonsterCard
+from settings.selector import SELECTOR
+
+logger = logging.getLogger(__name__)
+
+FILTER_NAMES: Tuple[str, ...] = tuple(SELECTOR)
+FORMAT_VERSION = 1
+
+# Filter name -> value code, for example {"size": "3", "type": "21"}
+Selections = Dict[str, str]
+
+
+def filter_values(name: str) -> List[str]:
+    """Return the value codes of the filter in the keyboard order."""
+    return list(SELECTOR[name]["en"].values())
+
+
+def iter_bits(bitset: int) -> Iterator[int]:
+    """Yield the numbers of the set bits in ascending order."""
+    while bitset:
+        lowest = bitset & -bitset
+        yield lowest.bit_length() - 1
+        bitset ^= lowest
+
+
+class MonsterRecord(NamedTuple):
+    title: str
+    link: str
+    armor_class: int
+    danger_rate: float
+
+    @classmethod
+    def from_card(cls, card: MonsterCard) -> "MonsterRecord":
+        return cls(
+            card.title, card.link, card.armor_class or 0, card.danger_rate
+        )
+
+    def to_card(self) -> MonsterCard:
+        danger = MonsterCard.DANGER_RATE_STRINGS.get(
+            self.danger_rate, f"{self.danger_rate:g}"
+        )
+        return MonsterCard(self.title, self.link, self.armor_class, danger)
+
+
+class Bestiary:
+    """
+    All monsters and the filter bitsets.
+
+    Attributes:
+        monsters (List[MonsterRecord]): Monsters in the listing order.
+        filters (Dict[str, Dict[str, int]]): Filter name -> value code ->
+        bitset of the matching monsters.
+    """
+
+    def __init__(
+        self,
+        monsters: List[MonsterRecord],
+        filters: Dict[str, Dict[str, int]],
+    ) -> None:
+        self.monsters: List[MonsterRecord] = monsters
+        self.filters: Dict[str, Dict[str, int]] = filters
+
+    def __len__(self) -> int:
+        return len(self.monsters)
+
+    def all_bits(self) -> int:
+        return (1 << len(self.monsters)) - 1
+
+    def digest(self) -> bytes:
+        """
+        Identify the bestiary contents, files derived from the bestiary
+        store it to detect that they are outdated.
+        """
+        content = hashlib.blake2b(digest_size=16)
+        for monster in self.monsters:
+            content.update(f"{monster.link}|{monster.armor_class}\n".encode())
+        for name in sorted(self.filters):
+            for code, bits in sorted(self.filters[name].items()):
+                content.update(f"{name}={code}:{bits:x}\n".encode())
+        return content.digest()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "version": FORMAT_VERSION,
+            "monsters": [list(monster) for monster in self.monsters],
+            "filters": {
+                name: {code: f"{bits:x}" for code, bits in values.items()}
+                for name, values in self.filters.items()
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Bestiary":
+        if data.get("version") != FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported bestiary version {data.get('version')}"
+            )
+        return cls(
+            monsters=[MonsterRecord(*monster) for monster in data["monsters"]],
+            filters={
+                name: {code: int(bits, 16) for code, bits in values.items()}
+                for name, values in data["filters"].items()
+            },
+        )
+
+    def save(self, path: str) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temporary = f"{path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as file:
+            json.dump(self.to_dict(), file, ensure_ascii=False)
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path: str) -> "Bestiary":
+        with open(path, encoding="utf-8") as file:
+            return cls.from_dict(json.load(file))
+
+
+def selections_from_url(url: str) -> Optional[Selections]:
+    """
+    Read the filters of a dnd.su search URL.
+
+    Args:
+        url (str): A formed or pasted URL, for example
+        "https://dnd.su/bestiary/?search=&size=3&type=21".
+
+    Returns:
+        Optional[Selections]: The filters, or None if the URL has a text
+        search, unknown filters or values, or the same filter twice; such
+        searches can only be answered by dnd.su.
+    """
+    selections: Selections = {}
+    for pair in urlsplit(url).query.split("&"):
+        name, _, code = pair.partition("=")
+        if not pair or name == "page" or (name == "search" and not code):
+            continue
+        if (
+            name not in SELECTOR
+            or name in selections
+            or code not in SELECTOR[name]["en"].values()
+        ):
+            return None
+        selections[name] = code
+    return selections
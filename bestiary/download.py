@@ -0,0 +1,78 @@
+"""
+The module downloads the local bestiary from dnd.su.
+
+The full listing gives the monsters, then every filter value is searched
+alone to learn which monsters match it. This takes one full listing per
+filter, with the usual pauses between pages.
+
+Run: python -m bestiary.download [--path data/bestiary.json]
+"""
+import argparse
+import asyncio
+import logging
+from typing import Dict, List
+
+from bestiary.bestiary import (
+    Bestiary,
+    FILTER_NAMES,
+    filter_values,
+    MonsterRecord,
+)
+from scraper.scraper import scrape_bestiary
+from settings.constantns import BASE_FORMED_URL, BESTIARY_SETTINGS
+from settings.log_config import setup_logging
+
+logger = logging.getLogger(__name__)
+
+# Every armor class dnd.su can show
+ARMOR_CLASS_RANGE = (0, 99)
+
+
+async def download_bestiary(base_url: str = BASE_FORMED_URL) -> Bestiary:
+    """
+    Read the whole bestiary and the monsters of every filter value.
+
+    Args:
+        base_url (str): The search URL without filters.
+
+    Returns:
+        Bestiary: The local bestiary.
+    """
+    monsters: List[MonsterRecord] = []
+    numbers: Dict[str, int] = {}
+    for card in await scrape_bestiary(base_url, *ARMOR_CLASS_RANGE):
+        if card.link not in numbers:
+            numbers[card.link] = len(monsters)
+            monsters.append(MonsterRecord.from_card(card))
+    logger.info("Bestiary listing: %s monsters", len(monsters))
+    filters: Dict[str, Dict[str, int]] = {}
+    for name in FILTER_NAMES:
+        filters[name] = {}
+        for code in filter_values(name):
+            bits = 0
+            found = await scrape_bestiary(
+                f"{base_url}&{name}={code}", *ARMOR_CLASS_RANGE
+            )
+            for card in found:
+                number = numbers.get(card.link)
+                if number is None:
+                    logger.warning("%s is not in the listing", card.link)
+                    continue
+                bits |= 1 << number
+            filters[name][code] = bits
+            logger.info("%s=%s: %s monsters", name, code, bits.bit_count())
+    return Bestiary(monsters, filters)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--path", default=BESTIARY_SETTINGS["PATH"])
+    args = parser.parse_args()
+    setup_logging()
+    bestiary = asyncio.run(download_bestiary())
+    bestiary.save(args.path)
+    print(f"Saved {len(bestiary)} monsters to {args.path}")
+
+
+if __name__ == "__main__":
+    main()
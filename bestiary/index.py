@@ -0,0 +1,165 @@
+"""
+The module contains the bitmap indexes over the local bestiary.
+
+A search is answered the way dnd.su evaluates the URL: the bitsets of the
+chosen filter values are ANDed, then the result is ANDed with the OR of
+the armor class bitsets within the range. The set bits are the monsters
+in the order of the dnd.su listing.
+"""
+import abc
+import logging
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from bestiary.bestiary import Bestiary, iter_bits, MonsterRecord, Selections
+from scraper.monster_card import MonsterCard
+
+logger = logging.getLogger(__name__)
+
+
+class BitsetIndex(abc.ABC):
+    """
+    Searches over filter and armor class bitsets, subclasses keep them.
+
+    Attributes:
+        monsters (Sequence[MonsterRecord]): Monsters in the listing order.
+    """
+
+    monsters: Sequence[MonsterRecord]
+
+    def __len__(self) -> int:
+        return len(self.monsters)
+
+    @abc.abstractmethod
+    def digest(self) -> bytes:
+        """Return the digest of the indexed bestiary."""
+
+    @abc.abstractmethod
+    def value_bits(self, name: str, code: str) -> Optional[int]:
+        """Return the bitset of the filter value, None if it is unknown."""
+
+    @abc.abstractmethod
+    def armor_class_bitsets(self) -> Iterable[Tuple[int, int]]:
+        """Yield armor class and the bitset of the monsters with it."""
+
+    def all_bits(self) -> int:
+        return (1 << len(self.monsters)) - 1
+
+    def filter_bits(self, selections: Selections) -> Optional[int]:
+        """
+        Find the monsters matching all the filters.
+
+        Args:
+            selections (Selections): The chosen filters.
+
+        Returns:
+            Optional[int]: The bitset, or None if the bestiary has no data
+            for a filter value.
+        """
+        bits = self.all_bits()
+        for name, code in selections.items():
+            value_bits = self.value_bits(name, code)
+            if value_bits is None:
+                return None
+            bits &= value_bits
+        return bits
+
+    def armor_class_bits(
+        self, min_armor_class: int, max_armor_class: int
+    ) -> int:
+        """Return the bitset of the monsters within the armor class range."""
+        if max_armor_class < min_armor_class:
+            min_armor_class, max_armor_class = max_armor_class, min_armor_class
+        bits = 0
+        for armor_class, class_bits in self.armor_class_bitsets():
+            if min_armor_class <= armor_class <= max_armor_class:
+                bits |= class_bits
+        return bits
+
+    def query(
+        self,
+        selections: Selections,
+        min_armor_class: int,
+        max_armor_class: int,
+    ) -> Optional[List[int]]:
+        """
+        Find the monsters of the search.
+
+        Args:
+            selections (Selections): The chosen filters.
+            min_armor_class (int): Minimum armor class.
+            max_armor_class (int): Maximum armor class.
+
+        Returns:
+            Optional[List[int]]: Monster numbers in the listing order, or
+            None if the search has to be made on dnd.su.
+        """
+        bits = self.filter_bits(selections)
+        if bits is None:
+            return None
+        bits &= self.armor_class_bits(min_armor_class, max_armor_class)
+        return list(iter_bits(bits))
+
+    def search(
+        self,
+        selections: Selections,
+        min_armor_class: int,
+        max_armor_class: int,
+    ) -> Optional[List[MonsterCard]]:
+        """Same as query, but return the monster cards."""
+        numbers = self.query(selections, min_armor_class, max_armor_class)
+        if numbers is None:
+            return None
+        return [self.monsters[number].to_card() for number in numbers]
+
+    def cards(
+        self,
+        numbers: Iterable[int],
+        min_armor_class: int,
+        max_armor_class: int,
+    ) -> List[MonsterCard]:
+        """
+        Make cards of the monsters within the armor class range.
+
+        Args:
+            numbers (Iterable[int]): Monster numbers in ascending order.
+            min_armor_class (int): Minimum armor class.
+            max_armor_class (int): Maximum armor class.
+
+        Returns:
+            List[MonsterCard]: The cards in the listing order.
+        """
+        bits = self.armor_class_bits(min_armor_class, max_armor_class)
+        return [
+            self.monsters[number].to_card()
+            for number in numbers
+            if bits >> number & 1
+        ]
+
+
+class BitmapIndex(BitsetIndex):
+    """
+    Index of a bestiary loaded into memory.
+
+    Attributes:
+        bestiary (Bestiary): The indexed bestiary.
+        armor_classes (Dict[int, int]): Armor class -> bitset of the
+        monsters with it.
+    """
+
+    def __init__(self, bestiary: Bestiary) -> None:
+        self.bestiary: Bestiary = bestiary
+        self.monsters = bestiary.monsters
+        self.armor_classes: Dict[int, int] = {}
+        for number, monster in enumerate(bestiary.monsters):
+            self.armor_classes[monster.armor_class] = (
+                self.armor_classes.get(monster.armor_class, 0) | 1 << number
+            )
+
+    def digest(self) -> bytes:
+        return self.bestiary.digest()
+
+    def value_bits(self, name: str, code: str) -> Optional[int]:
+        return self.bestiary.filters.get(name, {}).get(code)
+
+    def armor_class_bitsets(self) -> Iterable[Tuple[int, int]]:
+        return self.armor_classes.items()
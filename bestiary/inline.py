@@ -0,0 +1,112 @@
+"""
+The module answers inline queries like "15 dragon" from the local index.
+
+The query is an armor class or a range, optionally followed by a monster
+type in English or Russian or a part of a monster name. The answer is
+built only from the index, never from dnd.su, so it fits into the time
+Telegram waits for an inline answer.
+"""
+import logging
+import re
+from typing import List, NamedTuple, Optional, Tuple
+
+from bestiary.bestiary import iter_bits
+from bestiary.index import BitsetIndex
+from scraper.monster_card import MonsterCard
+from settings.selector import SELECTOR
+
+logger = logging.getLogger(__name__)
+
+INLINE_QUERY = re.compile(
+    r"^\s*(\d{1,2})(?:\s*[-\s]\s*(\d{1,2})(?!\S))?(?:\s+(.+?))?\s*$"
+)
+TYPE_CODES = {
+    name.casefold(): code
+    for names in SELECTOR["type"].values()
+    for name, code in names.items()
+}
+
+
+class InlineSearch(NamedTuple):
+    min_armor_class: int
+    max_armor_class: int
+    text: str
+
+
+def parse_inline_query(query: str) -> Optional[InlineSearch]:
+    """
+    Read the armor class range and the text of an inline query.
+
+    Args:
+        query (str): The query, for example "15 dragon" or "12-14 orc".
+
+    Returns:
+        Optional[InlineSearch]: The search, or None if the query does not
+        start with an armor class.
+    """
+    matches = INLINE_QUERY.match(query)
+    if not matches:
+        return None
+    low = int(matches.group(1))
+    high = int(matches.group(2)) if matches.group(2) else low
+    return InlineSearch(
+        min(low, high), max(low, high), (matches.group(3) or "").casefold()
+    )
+
+
+def find_monsters(index: BitsetIndex, search: InlineSearch) -> List[int]:
+    """
+    Find the monsters of the inline search in the listing order.
+
+    A text that is the name of a monster type filters by the type,
+    any other text has to be a part of the monster title.
+
+    Args:
+        index (BitsetIndex): The local index.
+        search (InlineSearch): The parsed query.
+
+    Returns:
+        List[int]: Monster numbers.
+    """
+    bits = index.armor_class_bits(
+        search.min_armor_class, search.max_armor_class
+    )
+    type_code = TYPE_CODES.get(search.text)
+    if type_code is not None:
+        type_bits = index.value_bits("type", type_code)
+        if type_bits is not None:
+            return list(iter_bits(bits & type_bits))
+    if not search.text:
+        return list(iter_bits(bits))
+    return [
+        number
+        for number in iter_bits(bits)
+        if search.text in index.monsters[number].title.casefold()
+    ]
+
+
+def inline_page(
+    index: BitsetIndex, query: str, offset: str, page_size: int
+) -> Tuple[List[MonsterCard], str]:
+    """
+    Find one page of the inline answer.
+
+    Args:
+        index (BitsetIndex): The local index.
+        query (str): The inline query.
+        offset (str): The offset Telegram sends back, empty for the first
+        page.
+        page_size (int): Number of results on a page.
+
+    Returns:
+        Tuple[List[MonsterCard], str]: The cards of the page and the offset
+        of the next page, empty if it is the last one.
+    """
+    search = parse_inline_query(query)
+    if search is None:
+        return [], ""
+    start = int(offset) if offset.isdigit() else 0
+    numbers = find_monsters(index, search)
+    end = start + page_size
+    cards = [index.monsters[number].to_card() for number in numbers[start:end]]
+    return cards, str(end) if end < len(numbers) else ""
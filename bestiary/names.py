@@ -0,0 +1,123 @@
+"""
+The module contains the trigram index of the monster names.
+
+dnd.su titles hold both names, "Барсук [Badger]". Each half is split into
+trigrams of its words padded with spaces, like in PostgreSQL pg_trgm, so
+"badger" gives "  b", " ba", "bad", "adg", "dge", "ger", "er ". A query
+is scored against every half sharing a trigram with it by the Jaccard
+similarity of their trigram sets, which tolerates typos and missing
+letters. Every word of a name is scored as a name too, and a monster is
+ranked by its best name.
+"""
+import heapq
+import logging
+import re
+from array import array
+from typing import Dict, FrozenSet, List, Sequence, Set, Tuple
+
+from bestiary.bestiary import MonsterRecord
+
+logger = logging.getLogger(__name__)
+
+TITLE = re.compile(r"^(.*?)\s*\[(.*)\]\s*$")
+NON_WORD = re.compile(r"[\W_]+")
+
+
+def split_title(title: str) -> Tuple[str, ...]:
+    """
+    Split a dnd.su title into the Russian and the English name.
+
+    Args:
+        title (str): The title, for example "Барсук [Badger]".
+
+    Returns:
+        Tuple[str, ...]: The names, one if the title has no brackets.
+    """
+    matches = TITLE.match(title)
+    if not matches:
+        return (title.strip(),)
+    return tuple(name for name in matches.groups() if name)
+
+
+def trigrams(text: str) -> FrozenSet[str]:
+    """Return the trigrams of the words of the text."""
+    words = NON_WORD.sub(" ", text.casefold().replace("ё", "е")).split()
+    return frozenset(
+        "".join(letters)
+        for padded in (f"  {word} " for word in words)
+        for letters in zip(padded, padded[1:], padded[2:])
+    )
+
+
+def name_variants(title: str) -> Set[FrozenSet[str]]:
+    """
+    Return the trigrams of both names of the title and of their words, so
+    "Giant badger" is found by "badger" as well as by "giant badger".
+    """
+    variants: Set[FrozenSet[str]] = set()
+    for name in split_title(title):
+        variants.add(trigrams(name))
+        variants.update(trigrams(word) for word in name.split())
+    variants.discard(frozenset())
+    return variants
+
+
+class NameIndex:
+    """
+    Trigram index of the monster names.
+
+    Attributes:
+        monsters (Sequence[MonsterRecord]): The indexed monsters.
+    """
+
+    def __init__(self, monsters: Sequence[MonsterRecord]) -> None:
+        self.monsters: Sequence[MonsterRecord] = monsters
+        # Every name and word of every title: its monster and its size
+        self._name_monsters = array("I")
+        self._name_sizes = array("H")
+        postings: Dict[str, List[int]] = {}
+        for number in range(len(monsters)):
+            for name_trigrams in name_variants(monsters[number].title):
+                name_number = len(self._name_monsters)
+                self._name_monsters.append(number)
+                self._name_sizes.append(len(name_trigrams))
+                for trigram in name_trigrams:
+                    postings.setdefault(trigram, []).append(name_number)
+        self._postings: Dict[str, array] = {
+            trigram: array("I", names) for trigram, names in postings.items()
+        }
+
+    def search(
+        self, query: str, limit: int = 10, threshold: float = 0.3
+    ) -> List[Tuple[int, float]]:
+        """
+        Find the monsters with names similar to the query.
+
+        Args:
+            query (str): A name or a part of it, in Russian or English.
+            limit (int): Maximum number of monsters.
+            threshold (float): Minimum similarity, from 0 to 1.
+
+        Returns:
+            List[Tuple[int, float]]: Monster numbers and similarities, the
+            most similar first, then in the listing order.
+        """
+        query_trigrams = trigrams(query)
+        if not query_trigrams:
+            return []
+        shared: Dict[int, int] = {}
+        for trigram in query_trigrams:
+            for name_number in self._postings.get(trigram, ()):
+                shared[name_number] = shared.get(name_number, 0) + 1
+        best: Dict[int, float] = {}
+        query_size = len(query_trigrams)
+        for name_number, count in shared.items():
+            similarity = count / (
+                query_size + self._name_sizes[name_number] - count
+            )
+            number = self._name_monsters[name_number]
+            if similarity >= threshold and similarity > best.get(number, 0):
+                best[number] = similarity
+        return heapq.nsmallest(
+            limit, best.items(), key=lambda item: (-item[1], item[0])
+        )
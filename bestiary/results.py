@@ -0,0 +1,266 @@
+"""
+The module precomputes the search results of every filter combination.
+
+The keyboards allow a finite number of combinations: every filter is
+either skipped or set to one of its values. The combinations are
+enumerated depth first over the filter bitsets; once the intersection is
+empty, all deeper combinations are empty too and are not visited. Equal
+monster sets are stored once, most combinations share a few of them.
+
+File layout, little endian:
+    header: magic, version, id size, monster count, bestiary digest,
+    number of combinations, of sets and of stored ids
+    keys:    uint32 per combination, ascending
+    sets:    uint32 per combination, the index of its set
+    offsets: uint32 per set + 1, where the ids of the set begin
+    ids:     uint16 (uint32 for big bestiaries) monster numbers
+
+Combinations missing from the file have no monsters.
+
+Run: python -m bestiary.results
+"""
+import argparse
+import logging
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+from bestiary.bestiary import (
+    Bestiary,
+    FILTER_NAMES,
+    filter_values,
+    iter_bits,
+    Selections,
+)
+from settings.constantns import BESTIARY_SETTINGS
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"ACRT"
+VERSION = 1
+HEADER = struct.Struct("<4sHBxI16sIII")
+
+
+def combination_digits() -> List[Dict[str, int]]:
+    """Return value code -> digit of every filter, 0 is a skipped filter."""
+    return [
+        {code: digit for digit, code in enumerate(filter_values(name), 1)}
+        for name in FILTER_NAMES
+    ]
+
+
+DIGITS = combination_digits()
+RADICES = [len(digits) + 1 for digits in DIGITS]
+
+
+def encode_combination(selections: Selections) -> Optional[int]:
+    """
+    Number the filter combination.
+
+    Args:
+        selections (Selections): The chosen filters.
+
+    Returns:
+        Optional[int]: The key of the combination, or None if a filter or a
+        value is unknown.
+    """
+    if any(name not in FILTER_NAMES for name in selections):
+        return None
+    key = 0
+    for name, digits, radix in zip(FILTER_NAMES, DIGITS, RADICES):
+        code = selections.get(name)
+        digit = 0 if code is None else digits.get(code)
+        if digit is None:
+            return None
+        key = key * radix + digit
+    return key
+
+
+def precompute(bestiary: Bestiary) -> Tuple[Dict[int, int], List[int]]:
+    """
+    Find the monsters of every non-empty filter combination.
+
+    Args:
+        bestiary (Bestiary): The local bestiary.
+
+    Returns:
+        Tuple[Dict[int, int], List[int]]: Combination key -> set index, and
+        the distinct sets as bitsets.
+    """
+    options = [
+        [
+            (digits[code], bits)
+            for code, bits in bestiary.filters.get(name, {}).items()
+            if bits and code in digits
+        ]
+        for name, digits in zip(FILTER_NAMES, DIGITS)
+    ]
+    depth_limit = len(FILTER_NAMES)
+    combinations: Dict[int, int] = {}
+    # The bitset is the set content, equal sets get one index
+    sets: Dict[int, int] = {}
+
+    def visit(depth: int, key: int, bits: int) -> None:
+        if depth == depth_limit:
+            combinations[key] = sets.setdefault(bits, len(sets))
+            return
+        key *= RADICES[depth]
+        visit(depth + 1, key, bits)
+        for digit, value_bits in options[depth]:
+            matched = bits & value_bits
+            if matched:
+                visit(depth + 1, key + digit, matched)
+
+    if len(bestiary):
+        visit(0, 0, bestiary.all_bits())
+    return combinations, list(sets)
+
+
+class ResultTable:
+    """
+    Precomputed results read from the file.
+
+    Attributes:
+        monster_count (int): Size of the bestiary the table was built for.
+        digest (bytes): Digest of that bestiary.
+    """
+
+    def __init__(
+        self,
+        monster_count: int,
+        digest: bytes,
+        keys: array,
+        set_numbers: array,
+        offsets: array,
+        ids: array,
+    ) -> None:
+        self.monster_count: int = monster_count
+        self.digest: bytes = digest
+        self._keys = keys
+        self._set_numbers = set_numbers
+        self._offsets = offsets
+        self._ids = ids
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    @property
+    def set_count(self) -> int:
+        return len(self._offsets) - 1
+
+    def lookup(self, selections: Selections) -> Optional[List[int]]:
+        """
+        Find the monsters of the filter combination.
+
+        Args:
+            selections (Selections): The chosen filters.
+
+        Returns:
+            Optional[List[int]]: Monster numbers in the listing order, or
+            None if the combination cannot be made with the keyboards.
+        """
+        key = encode_combination(selections)
+        if key is None:
+            return None
+        position = bisect_left(self._keys, key)
+        if position == len(self._keys) or self._keys[position] != key:
+            return []
+        number = self._set_numbers[position]
+        start, end = self._offsets[number], self._offsets[number + 1]
+        return self._ids[start:end].tolist()
+
+    @classmethod
+    def build(cls, bestiary: Bestiary) -> "ResultTable":
+        combinations, sets = precompute(bestiary)
+        keys = array("I", sorted(combinations))
+        set_numbers = array("I", (combinations[key] for key in keys))
+        offsets = array("I", [0])
+        ids = array("H" if len(bestiary) <= 0xFFFF else "I")
+        for bits in sets:
+            ids.extend(iter_bits(bits))
+            offsets.append(len(ids))
+        return cls(
+            len(bestiary), bestiary.digest(), keys, set_numbers, offsets, ids
+        )
+
+    def save(self, path: str) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        sections = [self._keys, self._set_numbers, self._offsets, self._ids]
+        if sys.byteorder != "little":
+            sections = [array(part.typecode, part) for part in sections]
+            for part in sections:
+                part.byteswap()
+        temporary = f"{path}.tmp"
+        with open(temporary, "wb") as file:
+            file.write(
+                HEADER.pack(
+                    MAGIC,
+                    VERSION,
+                    self._ids.itemsize,
+                    self.monster_count,
+                    self.digest,
+                    len(self._keys),
+                    self.set_count,
+                    len(self._ids),
+                )
+            )
+            for part in sections:
+                part.tofile(file)
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path: str) -> "ResultTable":
+        with open(path, "rb") as file:
+            content = file.read()
+        (
+            magic,
+            version,
+            id_size,
+            monster_count,
+            digest,
+            combination_count,
+            set_count,
+            id_count,
+        ) = HEADER.unpack_from(content)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a result table version {VERSION}")
+        sections = []
+        position = HEADER.size
+        for typecode, count in (
+            ("I", combination_count),
+            ("I", combination_count),
+            ("I", set_count + 1),
+            ("H" if id_size == 2 else "I", id_count),
+        ):
+            part = array(typecode)
+            end = position + part.itemsize * count
+            part.frombytes(content[position:end])
+            if len(part) != count:
+                raise ValueError(f"{path} is truncated")
+            if sys.byteorder != "little":
+                part.byteswap()
+            sections.append(part)
+            position = end
+        return cls(monster_count, digest, *sections)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--bestiary", default=BESTIARY_SETTINGS["PATH"])
+    parser.add_argument("--path", default=BESTIARY_SETTINGS["RESULTS_PATH"])
+    args = parser.parse_args()
+    table = ResultTable.build(Bestiary.load(args.bestiary))
+    table.save(args.path)
+    print(
+        f"{len(table)} non-empty combinations, {table.set_count} distinct"
+        f" sets, {os.path.getsize(args.path)} bytes in {args.path}"
+    )
+
+
+if __name__ == "__main__":
+    main()
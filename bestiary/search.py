@@ -0,0 +1,119 @@
+"""
+The module answers searches from the local bestiary instead of dnd.su.
+"""
+import logging
+import os
+from functools import cached_property
+from typing import List, Optional
+
+from bestiary.bestiary import Bestiary, selections_from_url
+from bestiary.index import BitmapIndex, BitsetIndex
+from bestiary.names import NameIndex
+from bestiary.results import ResultTable
+from bestiary.snapshot import Snapshot
+from scraper.monster_card import MonsterCard
+
+logger = logging.getLogger(__name__)
+
+
+class LocalSearch:
+    """
+    Search over the local bestiary.
+
+    Attributes:
+        index (BitsetIndex): The index answering every search.
+        results (Optional[ResultTable]): Precomputed results of every
+        filter combination, used before the index if present.
+    """
+
+    def __init__(
+        self, index: BitsetIndex, results: Optional[ResultTable] = None
+    ) -> None:
+        if results is not None and results.digest != index.digest():
+            logger.warning(
+                "Precomputed results are built for another bestiary,"
+                " run python -m bestiary.results"
+            )
+            results = None
+        self.index: BitsetIndex = index
+        self.results: Optional[ResultTable] = results
+
+    @cached_property
+    def names(self) -> NameIndex:
+        """The name index, built on the first name search."""
+        return NameIndex(self.index.monsters)
+
+    def answers(self, url: str) -> bool:
+        """Tell if the search of the URL is made without dnd.su."""
+        selections = selections_from_url(url)
+        return (
+            selections is not None
+            and self.index.filter_bits(selections) is not None
+        )
+
+    def search(
+        self, url: str, min_armor_class: int, max_armor_class: int
+    ) -> Optional[List[MonsterCard]]:
+        """
+        Find the monsters dnd.su would return for the URL.
+
+        Args:
+            url (str): The formed or pasted search URL.
+            min_armor_class (int): Minimum armor class.
+            max_armor_class (int): Maximum armor class.
+
+        Returns:
+            Optional[List[MonsterCard]]: The cards in the dnd.su order, or
+            None if the search has to be made on dnd.su.
+        """
+        selections = selections_from_url(url)
+        if selections is None:
+            return None
+        if self.results is not None:
+            numbers = self.results.lookup(selections)
+            if numbers is not None:
+                return self.index.cards(
+                    numbers, min_armor_class, max_armor_class
+                )
+        return self.index.search(selections, min_armor_class, max_armor_class)
+
+
+def load_local_search(
+    bestiary_path: str, results_path: str, snapshot_path: str
+) -> Optional[LocalSearch]:
+    """
+    Load the local bestiary and the precomputed results if they exist.
+
+    Args:
+        bestiary_path (str): Path to the bestiary file.
+        results_path (str): Path to the precomputed results.
+        snapshot_path (str): Path to the bestiary snapshot, used instead
+        of the bestiary file if present.
+
+    Returns:
+        Optional[LocalSearch]: The search, or None if there is no local
+        bestiary and every search goes to dnd.su.
+    """
+    try:
+        index: BitsetIndex
+        if os.path.exists(snapshot_path):
+            index = Snapshot(snapshot_path)
+        elif os.path.exists(bestiary_path):
+            index = BitmapIndex(Bestiary.load(bestiary_path))
+        else:
+            logger.info("No local bestiary, searches go to dnd.su")
+            return None
+        results = (
+            ResultTable.load(results_path)
+            if os.path.exists(results_path)
+            else None
+        )
+    except (OSError, ValueError, KeyError) as error:
+        logger.error(f"Local bestiary is not loaded: {error}")
+        return None
+    logger.info(
+        "Local bestiary: %s monsters, %s precomputed combinations",
+        len(index),
+        len(results) if results is not None else 0,
+    )
+    return LocalSearch(index, results)
@@ -0,0 +1,242 @@
+"""
+The module contains the binary snapshot of the local bestiary.
+
+The snapshot is read through mmap: opening it reads only the header and
+the bitmap directory, monsters and bitsets are decoded on demand, and
+processes opening the same file share its pages.
+
+File layout, little endian:
+    header:    magic, version, monster count, bitset size in bytes,
+               bestiary digest, directory size, text size, CRC32 of
+               everything after the header
+    records:   uint16 armor class and float32 danger rate per monster
+    offsets:   uint32 per title and link + 1, where they begin in text
+    directory: uint8 filter number (255 for an armor class) and the
+               value code per bitmap
+    bitmaps:   one little endian bitset per directory entry
+    text:      UTF-8 titles and links
+
+Run: python -m bestiary.snapshot [--check]
+"""
+import argparse
+import logging
+import mmap
+import os
+import struct
+import zlib
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from bestiary.bestiary import Bestiary, FILTER_NAMES, MonsterRecord
+from bestiary.index import BitmapIndex, BitsetIndex
+from settings.constantns import BESTIARY_SETTINGS
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"ACBS"
+VERSION = 1
+HEADER = struct.Struct("<4sHxxII16sIII")
+RECORD = struct.Struct("<Hf")
+OFFSET = struct.Struct("<I")
+ENTRY = struct.Struct("<B7s")
+ARMOR_CLASS_ENTRY = 0xFF
+
+
+def bitset_size(monster_count: int) -> int:
+    return (monster_count + 7) // 8
+
+
+def write_snapshot(bestiary: Bestiary, path: str) -> None:
+    """
+    Write the snapshot of the bestiary.
+
+    Args:
+        bestiary (Bestiary): The local bestiary.
+        path (str): Path of the snapshot, replaced atomically.
+    """
+    index = BitmapIndex(bestiary)
+    size = bitset_size(len(bestiary))
+    records = bytearray()
+    offsets = bytearray(OFFSET.pack(0))
+    text = bytearray()
+    for monster in bestiary.monsters:
+        records += RECORD.pack(monster.armor_class, monster.danger_rate)
+        for field in (monster.title, monster.link):
+            text += field.encode()
+            offsets += OFFSET.pack(len(text))
+    entries: List[Tuple[int, str, int]] = [
+        (FILTER_NAMES.index(name), code, bits)
+        for name, values in bestiary.filters.items()
+        if name in FILTER_NAMES
+        for code, bits in values.items()
+    ]
+    entries += [
+        (ARMOR_CLASS_ENTRY, str(armor_class), bits)
+        for armor_class, bits in sorted(index.armor_class_bitsets())
+    ]
+    directory = bytearray()
+    bitmaps = bytearray()
+    for number, code, bits in entries:
+        if len(code.encode()) > ENTRY.size - 1:
+            raise ValueError(f"Value code {code} is too long")
+        directory += ENTRY.pack(number, code.encode())
+        bitmaps += bits.to_bytes(size, "little")
+    body = b"".join((records, offsets, directory, bitmaps, text))
+    header = HEADER.pack(
+        MAGIC,
+        VERSION,
+        len(bestiary),
+        size,
+        bestiary.digest(),
+        len(entries),
+        len(text),
+        zlib.crc32(body),
+    )
+    directory_name = os.path.dirname(path)
+    if directory_name:
+        os.makedirs(directory_name, exist_ok=True)
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as file:
+        file.write(header)
+        file.write(body)
+    os.replace(temporary, path)
+
+
+class SnapshotRecords(Sequence[MonsterRecord]):
+    """Monsters of the snapshot, decoded on access."""
+
+    def __init__(self, snapshot: "Snapshot") -> None:
+        self._snapshot = snapshot
+
+    def __len__(self) -> int:
+        return self._snapshot.monster_count
+
+    def __getitem__(self, number: Union[int, slice]) -> MonsterRecord:
+        if isinstance(number, slice):
+            raise TypeError("Snapshot monsters cannot be sliced")
+        return self._snapshot.record(number)
+
+
+class Snapshot(BitsetIndex):
+    """
+    Bitmap index read from a memory-mapped snapshot.
+
+    Attributes:
+        monster_count (int): Number of monsters.
+        monsters (SnapshotRecords): The monsters in the listing order.
+    """
+
+    def __init__(self, path: str) -> None:
+        with open(path, "rb") as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._read_header(path)
+        except (ValueError, struct.error):
+            self._map.close()
+            raise
+        self.monsters = SnapshotRecords(self)
+
+    def _read_header(self, path: str) -> None:
+        if len(self._map) < HEADER.size:
+            raise ValueError(f"{path} is truncated")
+        (
+            magic,
+            version,
+            self.monster_count,
+            self._bitset_size,
+            self._digest,
+            entry_count,
+            text_size,
+            self._crc,
+        ) = HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a snapshot version {VERSION}")
+        self._records = HEADER.size
+        self._offsets = self._records + RECORD.size * self.monster_count
+        directory = self._offsets + OFFSET.size * (2 * self.monster_count + 1)
+        self._bitmaps = directory + ENTRY.size * entry_count
+        self._text = self._bitmaps + self._bitset_size * entry_count
+        if len(self._map) != self._text + text_size:
+            raise ValueError(f"{path} is truncated")
+        self._values: Dict[Tuple[int, str], int] = {}
+        self._armor_classes: List[Tuple[int, int]] = []
+        for position in range(entry_count):
+            number, code = ENTRY.unpack_from(
+                self._map, directory + ENTRY.size * position
+            )
+            code = code.rstrip(b"\0").decode()
+            if number == ARMOR_CLASS_ENTRY:
+                self._armor_classes.append((int(code), position))
+            else:
+                self._values[(number, code)] = position
+
+    def close(self) -> None:
+        self._map.close()
+
+    def verify(self) -> bool:
+        """Check the CRC of the whole snapshot, reads every page."""
+        start = HEADER.size
+        with memoryview(self._map) as content:
+            with content[start:] as body:
+                return zlib.crc32(body) == self._crc
+
+    def digest(self) -> bytes:
+        return self._digest
+
+    def record(self, number: int) -> MonsterRecord:
+        if not 0 <= number < self.monster_count:
+            raise IndexError(number)
+        armor_class, danger_rate = RECORD.unpack_from(
+            self._map, self._records + RECORD.size * number
+        )
+        title_start, title_end, link_end = struct.unpack_from(
+            "<3I", self._map, self._offsets + OFFSET.size * 2 * number
+        )
+        title_start += self._text
+        title_end += self._text
+        link_end += self._text
+        return MonsterRecord(
+            self._map[title_start:title_end].decode(),
+            self._map[title_end:link_end].decode(),
+            armor_class,
+            danger_rate,
+        )
+
+    def _bitmap(self, position: int) -> int:
+        start = self._bitmaps + self._bitset_size * position
+        end = start + self._bitset_size
+        return int.from_bytes(self._map[start:end], "little")
+
+    def value_bits(self, name: str, code: str) -> Optional[int]:
+        if name not in FILTER_NAMES:
+            return None
+        position = self._values.get((FILTER_NAMES.index(name), code))
+        return None if position is None else self._bitmap(position)
+
+    def armor_class_bitsets(self) -> Iterable[Tuple[int, int]]:
+        for armor_class, position in self._armor_classes:
+            yield armor_class, self._bitmap(position)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--bestiary", default=BESTIARY_SETTINGS["PATH"])
+    parser.add_argument("--path", default=BESTIARY_SETTINGS["SNAPSHOT_PATH"])
+    parser.add_argument(
+        "--check", action="store_true", help="only verify the snapshot"
+    )
+    args = parser.parse_args()
+    if not args.check:
+        write_snapshot(Bestiary.load(args.bestiary), args.path)
+    snapshot = Snapshot(args.path)
+    intact = snapshot.verify()
+    print(
+        f"{args.path}: {len(snapshot)} monsters,"
+        f" {os.path.getsize(args.path)} bytes,"
+        f" {'intact' if intact else 'CORRUPTED'}"
+    )
+    snapshot.close()
+    raise SystemExit(0 if intact else 1)
+
+
+if __name__ == "__main__":
+    main()
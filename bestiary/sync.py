@@ -0,0 +1,366 @@
+"""
+The module refreshes the local bestiary without a full re-crawl.
+
+The sync reads the same listings as bestiary.download: the full listing
+and the listing of every filter value. For every listing page it keeps
+the HTTP validators, the hash of the page content and the monsters found
+on it. A page is requested conditionally; a page answered with 304 or
+with the same content hash is not parsed, its stored monsters are used.
+The bestiary is then assembled from the page monsters, so parsing and
+rebuilding cost is proportional to the changed pages, and the change
+report lists the added, removed and changed monsters by link.
+
+Run: python -m bestiary.sync [--report report.json]
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import aiohttp
+from bs4 import BeautifulSoup
+
+from bestiary.bestiary import (
+    Bestiary,
+    FILTER_NAMES,
+    filter_values,
+    iter_bits,
+    MonsterRecord,
+)
+from bestiary.download import ARMOR_CLASS_RANGE
+from bestiary.results import ResultTable
+from bestiary.snapshot import write_snapshot
+from scraper.scraper import (
+    FETCH_BYTES,
+    FETCH_SECONDS,
+    is_last_page,
+    rate_limiter,
+    scrape_cards,
+)
+from settings.constantns import (
+    BASE_FORMED_URL,
+    BESTIARY_SETTINGS,
+    SCRAPER_CONSTANTS,
+    SCRAPER_SETTINGS,
+)
+from settings.log_config import setup_logging
+
+logger = logging.getLogger(__name__)
+
+SYNC_STATE_VERSION = 1
+
+# Page URL -> {"hash", "etag", "last_modified", "last", "monsters"}
+SyncState = Dict[str, Dict[str, Any]]
+
+
+def content_hash(html: str) -> str:
+    """
+    Hash the part of the page with the cards and the pagination, so that
+    tokens and counters in the page frame do not change the hash.
+    """
+    start = max(html.find('class="card'), 0)
+    end = html.rfind('class="pagination"')
+    end = html.find("</ul>", end) if end != -1 else -1
+    if end == -1:
+        end = len(html)
+    return hashlib.sha1(html[start:end].encode()).hexdigest()
+
+
+class SyncReport:
+    """
+    What the sync has read and changed.
+
+    Attributes:
+        pages (Dict[str, int]): Listing pages by outcome: "not_modified"
+        (304), "unchanged" (same hash), "parsed" and "failed".
+        added, removed, changed (List[str]): Links of the monsters.
+        refiltered (List[str]): Links of the monsters whose filter values
+        have changed.
+    """
+
+    def __init__(self) -> None:
+        self.pages: Dict[str, int] = dict.fromkeys(
+            ("not_modified", "unchanged", "parsed", "failed"), 0
+        )
+        self.added: List[str] = []
+        self.removed: List[str] = []
+        self.changed: List[str] = []
+        self.refiltered: List[str] = []
+        self.seconds: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "pages": self.pages,
+            "added": self.added,
+            "removed": self.removed,
+            "changed": self.changed,
+            "refiltered": self.refiltered,
+            "seconds": round(self.seconds, 3),
+        }
+
+    def summary(self) -> str:
+        pages = ", ".join(
+            f"{count} {name}" for name, count in self.pages.items()
+        )
+        return (
+            f"Pages: {pages}. Monsters: {len(self.added)} added,"
+            f" {len(self.removed)} removed, {len(self.changed)} changed,"
+            f" {len(self.refiltered)} with new filter values."
+            f" {self.seconds:.1f} s"
+        )
+
+
+async def sync_page(
+    session: aiohttp.ClientSession,
+    url: str,
+    previous: Optional[Dict[str, Any]],
+    report: SyncReport,
+) -> Optional[Dict[str, Any]]:
+    """
+    Read one listing page unless it is unchanged.
+
+    Args:
+        session (aiohttp.ClientSession): The HTTP session.
+        url (str): The page URL.
+        previous (Optional[Dict[str, Any]]): The stored page state.
+        report (SyncReport): Counts the page outcome.
+
+    Returns:
+        Optional[Dict[str, Any]]: The new page state, None if the page is
+        not read.
+    """
+    headers = {}
+    if previous is not None:
+        if previous.get("etag"):
+            headers["If-None-Match"] = previous["etag"]
+        if previous.get("last_modified"):
+            headers["If-Modified-Since"] = previous["last_modified"]
+    start = time.perf_counter()
+    try:
+        await rate_limiter.wait()
+        async with session.get(url, headers=headers) as response:
+            if response.status == 304 and previous is not None:
+                report.pages["not_modified"] += 1
+                return previous
+            response.raise_for_status()
+            html = await response.text()
+            validators = {
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+            }
+    except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+        logger.error(f"Sync error on {url} - {error}")
+        report.pages["failed"] += 1
+        return None
+    finally:
+        FETCH_SECONDS.observe(time.perf_counter() - start)
+    FETCH_BYTES.observe(len(html))
+    page_hash = content_hash(html)
+    if previous is not None and previous["hash"] == page_hash:
+        report.pages["unchanged"] += 1
+        return {**previous, **validators}
+    report.pages["parsed"] += 1
+    soup = BeautifulSoup(html, "lxml")
+    cards = scrape_cards(
+        soup.find_all("div", class_="card"), *ARMOR_CLASS_RANGE
+    )
+    return {
+        "hash": page_hash,
+        **validators,
+        "last": is_last_page(soup),
+        "monsters": [list(MonsterRecord.from_card(card)) for card in cards],
+    }
+
+
+async def sync_listing(
+    session: aiohttp.ClientSession,
+    url: str,
+    state: SyncState,
+    new_state: SyncState,
+    report: SyncReport,
+) -> Optional[List[MonsterRecord]]:
+    """
+    Read all pages of a listing, the unchanged ones from the state.
+
+    Returns:
+        Optional[List[MonsterRecord]]: The monsters of the listing, None if
+        a page could not be read and the listing is incomplete.
+    """
+    monsters: List[MonsterRecord] = []
+    for page_num in range(1, SCRAPER_SETTINGS["MAX_PAGES"] + 1):
+        page_url = f"{url}&page={page_num}"
+        page = await sync_page(session, page_url, state.get(page_url), report)
+        if page is None:
+            return None
+        new_state[page_url] = page
+        monsters.extend(
+            MonsterRecord(*monster) for monster in page["monsters"]
+        )
+        if page["last"]:
+            break
+        await asyncio.sleep(SCRAPER_SETTINGS["SLEEP_TIME"])
+    return monsters
+
+
+def memberships(bestiary: Bestiary) -> List[Set[Tuple[str, str]]]:
+    """Return the filter values of every monster."""
+    values: List[Set[Tuple[str, str]]] = [set() for _ in bestiary.monsters]
+    for name, codes in bestiary.filters.items():
+        for code, bits in codes.items():
+            for number in iter_bits(bits):
+                values[number].add((name, code))
+    return values
+
+
+def compare(old: Bestiary, new: Bestiary, report: SyncReport) -> None:
+    """Put the differences of the bestiaries into the report."""
+    old_numbers = {monster.link: n for n, monster in enumerate(old.monsters)}
+    new_numbers = {monster.link: n for n, monster in enumerate(new.monsters)}
+    report.added = [link for link in new_numbers if link not in old_numbers]
+    report.removed = [link for link in old_numbers if link not in new_numbers]
+    old_values = memberships(old)
+    new_values = memberships(new)
+    for link, number in new_numbers.items():
+        old_number = old_numbers.get(link)
+        if old_number is None:
+            continue
+        if old.monsters[old_number] != new.monsters[number]:
+            report.changed.append(link)
+        if old_values[old_number] != new_values[number]:
+            report.refiltered.append(link)
+
+
+async def sync_bestiary(
+    bestiary: Bestiary,
+    state: SyncState,
+    base_url: str = BASE_FORMED_URL,
+    filters: Optional[Dict[str, List[str]]] = None,
+) -> Tuple[Optional[Bestiary], SyncState, SyncReport]:
+    """
+    Bring the bestiary up to date with dnd.su.
+
+    Args:
+        bestiary (Bestiary): The current bestiary, may be empty.
+        state (SyncState): The page states of the previous sync.
+        base_url (str): The search URL without filters.
+        filters (Optional[Dict[str, List[str]]]): Filter name -> value
+        codes to read, all of settings/selector.py by default.
+
+    Returns:
+        Tuple[Optional[Bestiary], SyncState, SyncReport]: The new
+        bestiary, None if some page could not be read; the new page
+        states and the report.
+    """
+    start = time.perf_counter()
+    report = SyncReport()
+    new_state: SyncState = {}
+    if filters is None:
+        filters = {name: filter_values(name) for name in FILTER_NAMES}
+    headers = {"User-Agent": SCRAPER_CONSTANTS["USER_AGENT"]}
+    timeout = aiohttp.ClientTimeout(total=SCRAPER_SETTINGS["PAGE_TIMEOUT"])
+    async with aiohttp.ClientSession(
+        headers=headers, timeout=timeout
+    ) as session:
+        listing = await sync_listing(
+            session, base_url, state, new_state, report
+        )
+        if listing is None:
+            report.seconds = time.perf_counter() - start
+            return None, {**state, **new_state}, report
+        monsters: List[MonsterRecord] = []
+        numbers: Dict[str, int] = {}
+        for monster in listing:
+            if monster.link not in numbers:
+                numbers[monster.link] = len(monsters)
+                monsters.append(monster)
+        new_filters: Dict[str, Dict[str, int]] = {}
+        complete = True
+        for name, codes in filters.items():
+            new_filters[name] = {}
+            for code in codes:
+                found = await sync_listing(
+                    session,
+                    f"{base_url}&{name}={code}",
+                    state,
+                    new_state,
+                    report,
+                )
+                if found is None:
+                    complete = False
+                    continue
+                bits = 0
+                for monster in found:
+                    if monster.link in numbers:
+                        bits |= 1 << numbers[monster.link]
+                new_filters[name][code] = bits
+    report.seconds = time.perf_counter() - start
+    if not complete:
+        # Pages that were read are kept and are not parsed next time
+        return None, {**state, **new_state}, report
+    new_bestiary = Bestiary(monsters, new_filters)
+    compare(bestiary, new_bestiary, report)
+    return new_bestiary, new_state, report
+
+
+def load_state(path: str) -> SyncState:
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as file:
+        data = json.load(file)
+    if data.get("version") != SYNC_STATE_VERSION:
+        return {}
+    return data["pages"]
+
+
+def save_state(state: SyncState, path: str) -> None:
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temporary = f"{path}.tmp"
+    with open(temporary, "w", encoding="utf-8") as file:
+        json.dump(
+            {"version": SYNC_STATE_VERSION, "pages": state},
+            file,
+            ensure_ascii=False,
+        )
+    os.replace(temporary, path)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--report", help="path of the JSON change report")
+    args = parser.parse_args()
+    setup_logging()
+    paths = BESTIARY_SETTINGS
+    bestiary = (
+        Bestiary.load(paths["PATH"])
+        if os.path.exists(paths["PATH"])
+        else Bestiary([], {})
+    )
+    new_bestiary, state, report = asyncio.run(
+        sync_bestiary(bestiary, load_state(paths["SYNC_STATE_PATH"]))
+    )
+    save_state(state, paths["SYNC_STATE_PATH"])
+    print(report.summary())
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as file:
+            json.dump(report.to_dict(), file, ensure_ascii=False, indent=2)
+    if new_bestiary is None:
+        print("Some pages are not read, the bestiary is not changed")
+        raise SystemExit(1)
+    if new_bestiary.digest() == bestiary.digest():
+        return
+    new_bestiary.save(paths["PATH"])
+    # Files derived from the bestiary are rebuilt if they are in use
+    if os.path.exists(paths["SNAPSHOT_PATH"]):
+        write_snapshot(new_bestiary, paths["SNAPSHOT_PATH"])
+    if os.path.exists(paths["RESULTS_PATH"]):
+        ResultTable.build(new_bestiary).save(paths["RESULTS_PATH"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""
+The module limits the searches that go to dnd.su.
+
+At most `max_running` searches scrape at once and at most `max_queued`
+wait for their turn; a search beyond that is rejected at once, so a burst
+of users does not pile up coroutines, sockets and parsed pages. An
+admitted search gets an estimate of its waiting time from the average
+duration of recent searches. A rejected user is offered the results of a
+recent search of the same URL, kept in a small LRU cache.
+"""
+import asyncio
+import logging
+import math
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from metrics.registry import REGISTRY
+from scraper.monster_card import MonsterCard
+from scraper.scraper import filter_armor_class
+from settings.constantns import ADMISSION_SETTINGS
+from tracing.tracer import awaiting
+
+logger = logging.getLogger(__name__)
+
+ADMISSIONS = REGISTRY.counter(
+    "search_admissions_total",
+    "Searches to dnd.su by admission: started, queued or rejected",
+    ["result"],
+)
+
+# The smoothing factor of the average search duration
+DURATION_WEIGHT = 0.2
+
+# Armor class range of a kept search and its monsters
+KeptSearch = Tuple[int, int, List[MonsterCard]]
+
+
+class Admission:
+    """
+    An admitted search, waits for its turn when entered.
+
+    Attributes:
+        wait_estimate (float): Expected seconds before the search starts.
+    """
+
+    def __init__(self, control: "SearchAdmission", wait_estimate: float):
+        self.wait_estimate: float = wait_estimate
+        self._control = control
+        self._start = 0.0
+
+    async def __aenter__(self) -> "Admission":
+        control = self._control
+        try:
+            with awaiting():
+                await control.semaphore.acquire()
+        finally:
+            control.queued -= 1
+        control.running += 1
+        self._start = time.perf_counter()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        control = self._control
+        control.running -= 1
+        control.semaphore.release()
+        control.observe(time.perf_counter() - self._start)
+
+
+class SearchAdmission:
+    """
+    Admission control of the searches.
+
+    Attributes:
+        max_running (int): Searches scraping at once.
+        max_queued (int): Admitted searches waiting for their turn.
+        average_seconds (float): Smoothed duration of a search.
+        running (int): Searches scraping now.
+        queued (int): Searches waiting now.
+    """
+
+    def __init__(
+        self, max_running: int, max_queued: int, average_seconds: float
+    ) -> None:
+        self.max_running: int = max_running
+        self.max_queued: int = max_queued
+        self.average_seconds: float = average_seconds
+        self.running: int = 0
+        self.queued: int = 0
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # Created in the loop of the bot, not on import
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_running)
+        return self._semaphore
+
+    def admit(self) -> Optional[Admission]:
+        """
+        Admit a search unless both the running and the queued searches
+        are at their limits. The admission must be entered with
+        `async with` at once.
+
+        Returns:
+            Optional[Admission]: The admission, None if the search is
+            rejected.
+        """
+        if self.running + self.queued >= self.max_running + self.max_queued:
+            ADMISSIONS.inc(result="rejected")
+            logger.warning(
+                "Search rejected: %s running, %s queued",
+                self.running,
+                self.queued,
+            )
+            return None
+        ahead = self.running + self.queued - self.max_running
+        wait_estimate = 0.0
+        if ahead >= 0:
+            # Each wave of max_running searches takes one average duration
+            rounds = math.floor(ahead / self.max_running) + 1
+            wait_estimate = rounds * self.average_seconds
+            ADMISSIONS.inc(result="queued")
+        else:
+            ADMISSIONS.inc(result="started")
+        self.queued += 1
+        return Admission(self, wait_estimate)
+
+    def observe(self, seconds: float) -> None:
+        """Add the duration of a finished search to the average."""
+        self.average_seconds += DURATION_WEIGHT * (
+            seconds - self.average_seconds
+        )
+
+
+class RecentSearches:
+    """
+    Results of the recent dnd.su searches, offered when the bot is busy.
+
+    Attributes:
+        size (int): Number of URLs kept.
+    """
+
+    def __init__(self, size: int) -> None:
+        self.size: int = size
+        self._results: "OrderedDict[str, KeptSearch]" = OrderedDict()
+
+    def put(
+        self,
+        url: str,
+        min_armor_class: int,
+        max_armor_class: int,
+        monsters: List[MonsterCard],
+    ) -> None:
+        """Keep the monsters of the URL found in the armor class range."""
+        if max_armor_class < min_armor_class:
+            min_armor_class, max_armor_class = max_armor_class, min_armor_class
+        kept = self._results.get(url)
+        # A wider range answers more searches and is not replaced
+        if kept is None or (
+            min_armor_class <= kept[0] and kept[1] <= max_armor_class
+        ):
+            self._results[url] = (min_armor_class, max_armor_class, monsters)
+        self._results.move_to_end(url)
+        while len(self._results) > self.size:
+            self._results.popitem(last=False)
+
+    def get(
+        self, url: str, min_armor_class: int, max_armor_class: int
+    ) -> Optional[List[MonsterCard]]:
+        """
+        Return the monsters of the URL in the armor class range if a kept
+        search covers the range.
+        """
+        if max_armor_class < min_armor_class:
+            min_armor_class, max_armor_class = max_armor_class, min_armor_class
+        kept = self._results.get(url)
+        if kept is None or not (
+            kept[0] <= min_armor_class and max_armor_class <= kept[1]
+        ):
+            return None
+        self._results.move_to_end(url)
+        return filter_armor_class(kept[2], min_armor_class, max_armor_class)
+
+
+search_admission = SearchAdmission(
+    max_running=ADMISSION_SETTINGS["MAX_RUNNING"],
+    max_queued=ADMISSION_SETTINGS["MAX_QUEUED"],
+    average_seconds=ADMISSION_SETTINGS["INITIAL_ESTIMATE"],
+)
+recent_searches = RecentSearches(size=ADMISSION_SETTINGS["RECENT_SEARCHES"])
+REGISTRY.gauge(
+    "searches_running", "Searches scraping dnd.su now"
+).set_function(lambda: search_admission.running)
+REGISTRY.gauge(
+    "searches_queued", "Admitted searches waiting for their turn"
+).set_function(lambda: search_admission.queued)
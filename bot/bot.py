@@ -1,17 +1,20 @@
 import asyncio
 import logging
 from functools import partial
-from logging.config import dictConfig
-from typing import List, Match, Optional
+from typing import Dict, List, Match, Optional, Union
 
 from aiogram import Dispatcher, F, Router
 from aiogram.exceptions import TelegramAPIError
-from aiogram.filters import CommandStart, StateFilter
+from aiogram.filters import Command, CommandObject, CommandStart, StateFilter
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import default_state, State
-from aiogram.fsm.storage.memory import MemoryStorage
-from aiogram.types import CallbackQuery, Message
+from aiogram.types import CallbackQuery, InlineQuery, Message
+from aiohttp import web
 
+from bestiary.download import ARMOR_CLASS_RANGE
+from bestiary.inline import inline_page
+from bestiary.search import load_local_search
+from bot.admission import recent_searches, search_admission
 from bot.exception_routes import exception_router
 from bot.keyboards import (
     get_language_keyboard,
@@ -19,48 +22,209 @@ from bot.keyboards import (
     get_sorting_keyboard,
     get_url_keyboard,
 )
+from bot.middlewares import (
+    HandlerMetricsMiddleware,
+    StateSnapshotMiddleware,
+    TracingMiddleware,
+)
+from bot.prefetch import prefetch_slots
 from bot.singleton_bot import SingletonBot
 from bot.states import FSMSearchAC, PHRASES_AND_STATES
+from bot.storage import SQLiteStorage
+from bot.text import pack_messages, select_top
 from bot.utils import (
     bag_report,
     form_final_url,
+    format_message,
     get_current_language,
     logstate,
+    make_inline_article,
     safe_answer_callback,
     safe_send_message,
-    split_message,
 )
-from exceptions.exceptions import EmptyDataError, EnvError
+from bot.webhook import run_webhook
+from exceptions.exceptions import BusyError, EmptyDataError, EnvError
+from metrics.registry import REGISTRY
+from metrics.server import start_metrics_server
+from scraper.details import DetailCache, DetailEnricher
 from scraper.monster_card import MonsterCard
-from scraper.scraper import scrape_bestiary
+from scraper.scraper import filter_armor_class, scrape_bestiary, ScrapeResult
 from settings.constantns import (
+    ADMISSION_SETTINGS,
     BASE_FORMED_URL,
+    BESTIARY_SETTINGS,
     CALLBACK_DATA,
+    DETAILS_SETTINGS,
+    INLINE_SETTINGS,
     LANGUAGES,
+    METRICS_SETTINGS,
+    NAME_SEARCH_SETTINGS,
     PATTERNS,
+    PREFETCH_SETTINGS,
+    RESULTS_SETTINGS,
+    SCRAPER_SETTINGS,
     SORTING_KEYS,
+    STORAGE_SETTINGS,
 )
-from settings.log_config import log_config
 from settings.messages import MESSAGE_TEXT_ERROR, MESSAGES
+from tracing.tracer import awaiting, span
 
-dictConfig(log_config)
 logger = logging.getLogger(__name__)
 
-storage = MemoryStorage()
+storage = SQLiteStorage(
+    path=STORAGE_SETTINGS["PATH"],  # type: ignore [arg-type]
+    flush_interval=STORAGE_SETTINGS["FLUSH_INTERVAL"],
+    batch_size=STORAGE_SETTINGS["BATCH_SIZE"],  # type: ignore [arg-type]
+    cache_size=STORAGE_SETTINGS["CACHE_SIZE"],  # type: ignore [arg-type]
+    ttl=STORAGE_SETTINGS["TTL"],
+)
 logger.debug("Before SingletonBot instance creation")
 bot = SingletonBot()
 logger.debug("After SingletonBot instance creation\n\n")
+REGISTRY.gauge(
+    "fsm_storage_keys", "Number of keys in the FSM storage"
+).set_function(storage.size)
 dp = Dispatcher(storage=storage)
+local_search = load_local_search(
+    BESTIARY_SETTINGS["PATH"],
+    BESTIARY_SETTINGS["RESULTS_PATH"],
+    BESTIARY_SETTINGS["SNAPSHOT_PATH"],
+)
+detail_enricher: Optional[DetailEnricher] = (
+    DetailEnricher(
+        DetailCache(
+            path=DETAILS_SETTINGS["PATH"],  # type: ignore [arg-type]
+            ttl=DETAILS_SETTINGS["TTL"],
+        ),
+        concurrency=DETAILS_SETTINGS["CONCURRENCY"],  # type: ignore [arg-type]
+        timeout=DETAILS_SETTINGS["TIMEOUT"],
+    )
+    if DETAILS_SETTINGS["ENABLED"]
+    else None
+)
 router = Router()
 
 
+async def start_prefetch(chat_id: int, state: FSMContext) -> None:
+    """
+    Start the search of the chat before the armor class is entered.
+
+    Searches answered by the local bestiary are not started.
+
+    Arguments:
+    :param chat_id: int - the chat of the search
+    :param state: FSMContext - the user's state with the chosen filters or
+    the pasted URL
+
+    Returns:
+    None
+    """
+    if not PREFETCH_SETTINGS["ENABLED"]:
+        return
+    data = await state.get_data()
+    url = data.get("url") or await form_final_url(data, BASE_FORMED_URL)
+    if local_search is not None and local_search.answers(url):
+        return
+    prefetch_slots.start(chat_id, url)
+
+
+async def find_monsters(
+    chat_id: int,
+    url: str,
+    min_armor_class: int,
+    max_armor_class: int,
+    state: FSMContext,
+) -> Optional[List[MonsterCard]]:
+    """
+    Find the monsters of the search in the local bestiary, in the
+    prefetched search of the chat or on dnd.su.
+
+    A search to dnd.su waits for admission. The user is told if the wait
+    is long; if the search is rejected, the user is told the bot is busy
+    and gets the recent result of the same search if there is one.
+
+    Arguments:
+    :param chat_id: int - the chat of the search
+    :param url: str - the search URL
+    :param min_armor_class: int - minimum armor class
+    :param max_armor_class: int - maximum armor class
+    :param state: FSMContext - the user's state, used for the messages
+
+    Returns:
+    Optional[List[MonsterCard]] - the monsters, empty if the scraping
+    failed, None if the search is rejected and there is no recent result
+    """
+    if local_search is not None:
+        with span("local_search"):
+            local_monsters = local_search.search(
+                url, min_armor_class, max_armor_class
+            )
+        if local_monsters is not None:
+            return local_monsters
+    prefetched = prefetch_slots.take(chat_id, url)
+    if prefetched is not None:
+        try:
+            with span("await_prefetch", done=prefetched.done()):
+                with awaiting():
+                    cards = await prefetched
+            if not cards.partial:
+                recent_searches.put(url, *ARMOR_CLASS_RANGE, cards)
+            return filter_armor_class(cards, min_armor_class, max_armor_class)
+        except asyncio.CancelledError:
+            if not prefetched.cancelled():
+                raise
+            logger.debug("Prefetch was cancelled, scraping again")
+        except BusyError:
+            logger.debug("Prefetch was not admitted, scraping again")
+        except Exception as error:
+            logger.error(f"Prefetch failed: {error}")
+    admission = search_admission.admit()
+    if admission is None:
+        recent = recent_searches.get(url, min_armor_class, max_armor_class)
+        await safe_send_message(
+            chat_id=chat_id,
+            text=MESSAGES.get(
+                "BUSY" if recent is None else "BUSY_RECENT",
+                MESSAGE_TEXT_ERROR,
+            ),
+            state=state,
+        )
+        return recent
+    if admission.wait_estimate >= ADMISSION_SETTINGS["NOTIFY_WAIT"]:
+        await safe_send_message(
+            chat_id=chat_id,
+            text=format_message(
+                "SEARCH_QUEUED", seconds=round(admission.wait_estimate)
+            ),
+            state=state,
+        )
+    try:
+        async with admission:
+            with span("scrape_bestiary") as scrape_span:
+                monsters = await scrape_bestiary(
+                    url,
+                    min_armor_class,
+                    max_armor_class,
+                    owner=chat_id,
+                    timeout=SCRAPER_SETTINGS["DEADLINE"],
+                )
+                if scrape_span is not None:
+                    scrape_span.attributes["monsters"] = len(monsters)
+    except Exception as error:
+        logger.error(f"Scraping failed: {error}")
+        return []
+    if not monsters.partial:
+        recent_searches.put(url, min_armor_class, max_armor_class, monsters)
+    return monsters
+
+
 @router.message(CommandStart(), StateFilter(default_state))
 async def handle_start_command(message: Message, state: FSMContext):
     keyboard = get_language_keyboard()
     chat_id = message.chat.id
-    logger.debug(f"chat_id = {chat_id}, keyboard = {keyboard}")
+    logger.debug("chat_id = %s, keyboard = %s", chat_id, keyboard)
     current_state = await state.get_state()
-    logger.debug(f"State: {current_state}")
+    logger.debug("State: %s", current_state)
     await safe_send_message(
         chat_id=chat_id,
         text=MESSAGES.get("CHOOSE_USER_LANGUAGE", MESSAGE_TEXT_ERROR),
@@ -70,6 +234,46 @@ async def handle_start_command(message: Message, state: FSMContext):
     await state.set_state(FSMSearchAC.choose_language)
 
 
+@router.message(Command(commands="name"))
+async def handle_name_command(
+    message: Message, command: CommandObject, state: FSMContext
+) -> None:
+    """
+    Handles the '/name' command: finds monsters by a name with typos.
+
+    The search is made in the local bestiary in any state and does not
+    change it.
+
+    Arguments:
+    :param message: Message - the incoming message object from aiogram
+    :param command: CommandObject - the command with its arguments
+    :param state: FSMContext - the current FSM state of the user
+
+    Returns:
+    None
+    """
+    text: Union[str, Dict[str, str]]
+    if local_search is None:
+        text = MESSAGES.get("NAME_SEARCH_UNAVAILABLE", MESSAGE_TEXT_ERROR)
+    elif not command.args:
+        text = MESSAGES.get("NAME_SEARCH_USAGE", MESSAGE_TEXT_ERROR)
+    else:
+        found = local_search.names.search(
+            command.args,
+            limit=int(NAME_SEARCH_SETTINGS["LIMIT"]),
+            threshold=NAME_SEARCH_SETTINGS["THRESHOLD"],
+        )
+        language = await get_current_language(state)
+        monsters = local_search.index.monsters
+        cards = [monsters[number].to_card() for number, _ in found]
+        if detail_enricher is not None:
+            await detail_enricher.enrich(cards)
+        text = "\n\n".join(
+            str(card.set_language(language)) for card in cards
+        ) or MESSAGES.get("NAME_SEARCH_EMPTY", MESSAGE_TEXT_ERROR)
+    await safe_send_message(chat_id=message.chat.id, text=text, state=state)
+
+
 @router.callback_query(StateFilter(FSMSearchAC.choose_language))
 async def choose_language(callback: CallbackQuery, state: FSMContext) -> None:
     await logstate(state, "State in choose_language")
@@ -80,7 +284,7 @@ async def choose_language(callback: CallbackQuery, state: FSMContext) -> None:
         keyboard = get_url_keyboard(language)
 
         chat_id = callback.message.chat.id  # type: ignore # In try block
-        logger.debug(f"chat_id = {chat_id}, keyboard = {keyboard}")
+        logger.debug("chat_id = %s, keyboard = %s", chat_id, keyboard)
         await safe_send_message(
             chat_id=chat_id,
             text=MESSAGES.get("MONSTER_INPUT_INVITATION", MESSAGE_TEXT_ERROR),
@@ -119,22 +323,26 @@ async def generate_handlers(
     try:
         curretnt_language = await get_current_language(state)
 
-        logger.debug(f"Keyword {keyword}")
-        logger.debug(getattr(callback, "data", None))
+        logger.debug("Keyword %s", keyword)
+        logger.debug("%s", getattr(callback, "data", None))
 
         await safe_answer_callback(callback)
         if callback.data != f"{keyword}=_":
-            logger.debug({f"url_{keyword}": callback.data})
+            logger.debug("url_%s: %s", keyword, callback.data)
             await state.update_data({f"url_{keyword}": callback.data})
         logger.debug("Current state?")
         await logstate(state, "Current state in generate_handlers")
 
         await state.set_state(state=new_state)
         await logstate(state, "New state after set_state in generate_handlers")
+        if new_state == FSMSearchAC.get_armor_class:
+            await start_prefetch(
+                callback.message.chat.id, state  # type: ignore # In try block
+            )
         logger.debug(
-            "Before safe send message\n"
-            f"chat_id {callback.message.chat.id}"  # type: ignore
-            "Text_key: {text_key}, state: {state}"
+            "Before safe send message\nchat_id %s Text_key: %s",
+            callback.message.chat.id,  # type: ignore # In try block
+            text_key,
         )
         await safe_send_message(
             chat_id=callback.message.chat.id,  # type: ignore # In try block
@@ -247,12 +455,12 @@ async def handle_url_buttons(
                 state=state,
                 reply_markup=keyboard,
             )
-            logger.debug(f"CALLBACK DATA = {callback.data}")
+            logger.debug("CALLBACK DATA = %s", callback.data)
             current_state = await state.get_state()
-            logger.debug(f"Curent state: {current_state}")
+            logger.debug("Curent state: %s", current_state)
             await state.set_state(FSMSearchAC.size_selection)
             new_state = await state.get_state()
-            logger.debug(f"New state: {new_state}")
+            logger.debug("New state: %s", new_state)
     except TimeoutError as error:
         logger.critical(f"Network error: {error}")
     except AttributeError as error:
@@ -289,6 +497,7 @@ async def handle_url(message: Message, state: FSMContext):
         state=state,
     )
     await state.set_state(FSMSearchAC.get_armor_class)
+    await start_prefetch(chat_id, state)
 
 
 @router.message(
@@ -337,15 +546,25 @@ async def handle_armor_class(message: Message, state: FSMContext):
     if not data:
         logger.critical("Empty data")
         await bag_report(chat_id=message.chat.id, state=state)
-    formed_url = await form_final_url(data, BASE_FORMED_URL)
+    with span("form_final_url"):
+        formed_url = await form_final_url(data, BASE_FORMED_URL)
     url = data.get("url", formed_url)  # Attention
-    logger.debug("Link to be used: {url}")
-    monsters: List[MonsterCard]
-    try:
-        monsters = await scrape_bestiary(url, min_armor_class, max_armor_class)
-    except Exception as error:
-        logger.error(f"Scraping failed: {error}")
-        monsters = []
+    logger.debug("Link to be used: %s", url)
+    monsters = await find_monsters(
+        message.chat.id, url, min_armor_class, max_armor_class, state
+    )
+    if monsters is None:
+        return None  # The bot is busy, the user may send the armor class again
+    if isinstance(monsters, ScrapeResult) and monsters.partial:
+        await safe_send_message(
+            chat_id=message.chat.id,
+            text=format_message(
+                "PARTIAL_RESULTS",
+                read=monsters.pages_read,
+                total=monsters.pages_total,
+            ),
+            state=state,
+        )
 
     if not monsters:
         await safe_send_message(
@@ -385,8 +604,9 @@ async def handle_sort_buttons(
     1. Respond to the callback query.
     2. Retrieve the current state data.
     3. Validate the sorting key.
-    4. Sort the list of monsters based on the selected key.
-    5. Send the sorted list of monsters to the user.
+    4. Select the first RESULTS_SETTINGS["MAX_SHOWN"] monsters by the
+    selected key.
+    5. Send them to the user, telling if more monsters were found.
     6. Clear the state.
 
     Arguments:
@@ -414,21 +634,38 @@ async def handle_sort_buttons(
         )
         return
     monsters: List[MonsterCard] = data.get("monsters", [])
-    logger.debug(f"Is there monsters? {bool(monsters)}")
+    logger.debug("Is there monsters? %s", bool(monsters))
     if not monsters:
         logger.critical("No monsters in data")
-    monsters.sort(key=SORTING_KEYS[sort_key])
-    # Formats a list of monster objects into a string,
-    # setting each monster's language.
-    formatted_monsters = "\n\n".join(
-        [
-            str((lambda m: m.set_language(current_language) or m)(monster))
-            for monster in monsters
-        ]
+    found = len(monsters)
+    with span("select_top", monsters=found):
+        monsters = select_top(
+            monsters, SORTING_KEYS[sort_key], RESULTS_SETTINGS["MAX_SHOWN"]
+        )
+    if detail_enricher is not None:
+        shown_with_details = int(DETAILS_SETTINGS["MAX_CARDS"])
+        with span("enrich_details"):
+            await detail_enricher.enrich(monsters[:shown_with_details])
+    # Renders the monsters one by one, setting each monster's language
+    rendered = (
+        str(monster.set_language(current_language) or monster)
+        for monster in monsters
     )
-    for output_part in split_message(formatted_monsters):
-        await safe_send_message(chat_id=chat_id, text=output_part, state=state)
-        await asyncio.sleep(0.5)
+    with span("send_results", monsters=len(monsters)):
+        for output_part in pack_messages(rendered):
+            await safe_send_message(
+                chat_id=chat_id, text=output_part, state=state
+            )
+            with awaiting():
+                await asyncio.sleep(0.5)
+    if found > len(monsters):
+        await safe_send_message(
+            chat_id=chat_id,
+            text=format_message(
+                "RESULTS_CAPPED", shown=len(monsters), total=found
+            ),
+            state=state,
+        )
     await safe_send_message(
         chat_id=chat_id,
         text=MESSAGES.get("FINAL_WORD", MESSAGE_TEXT_ERROR),
@@ -437,13 +674,54 @@ async def handle_sort_buttons(
     await state.clear()
 
 
+@router.inline_query()
+async def handle_inline_query(inline_query: InlineQuery) -> None:
+    """
+    Answer an inline query like "15 dragon" from the local bestiary.
+
+    The query is an armor class or a range and an optional monster type or
+    a part of a name. Nothing is scraped, without the local bestiary the
+    answer is empty.
+
+    Arguments:
+    :param inline_query: InlineQuery - the query from aiogram.
+
+    Returns:
+    None
+    """
+    language = (
+        LANGUAGES["RU"]
+        if (inline_query.from_user.language_code or "").startswith("ru")
+        else LANGUAGES["EN"]
+    )
+    cards: List[MonsterCard] = []
+    next_offset = ""
+    if local_search is not None:
+        cards, next_offset = inline_page(
+            local_search.index,
+            inline_query.query,
+            inline_query.offset,
+            INLINE_SETTINGS["PAGE_SIZE"],
+        )
+    try:
+        await inline_query.answer(
+            [make_inline_article(card, language) for card in cards],
+            cache_time=INLINE_SETTINGS["CACHE_TIME"],
+            is_personal=True,  # The cards are in the user language
+            next_offset=next_offset,
+        )
+    except TelegramAPIError as error:
+        logger.error(f"Error answering inline query: {error}")
+
+
 async def register_routers() -> None:
     """
     Register main and exception routers to the dispatcher.
 
     This function includes the main router to the dispatcher and the exception
-    router to the main router. It also logs the state of the routers and the
-    dispatcher.
+    router to the main router, and attaches the metrics, state snapshot and
+    tracing middlewares to messages and callback queries. It also logs the
+    state of the routers and the dispatcher.
 
     Note: Assumes that `dp`, `router`, and `exception_router` are already
     initialized.
@@ -458,6 +736,13 @@ async def register_routers() -> None:
     logger.debug(f"dp.include_router({router})")
     router.include_router(exception_router)
     logger.debug(f"router.include_router({exception_router})")
+    for observer in (dp.message, dp.callback_query):
+        observer.middleware(HandlerMetricsMiddleware())
+        observer.middleware(StateSnapshotMiddleware())
+        observer.middleware(TracingMiddleware())
+    dp.inline_query.middleware(HandlerMetricsMiddleware())
+    if detail_enricher is not None:
+        dp.shutdown.register(detail_enricher.close)
     logger.debug("Subrouters: %s", router.sub_routers)
     logger.debug(
         "Exception_router: %s", exception_router.resolve_used_update_types()
@@ -466,21 +751,53 @@ async def register_routers() -> None:
     logger.debug("Dispatcher: %s", dp.resolve_used_update_types())
 
 
-async def run_bot():
+async def start_metrics(port_offset: int = 0) -> Optional[web.AppRunner]:
+    """
+    Start the metrics endpoint if it is enabled in METRICS_SETTINGS.
+
+    Args:
+        port_offset (int): Added to the configured port, so that several
+        processes on one machine get their own ports.
+
+    Returns:
+        Optional[web.AppRunner]: The runner of the server or None.
+    """
+    if not METRICS_SETTINGS["ENABLED"]:
+        return None
+    try:
+        return await start_metrics_server(
+            host=METRICS_SETTINGS["HOST"],  # type: ignore [arg-type]
+            port=METRICS_SETTINGS["PORT"] + port_offset,  # type: ignore
+            path=METRICS_SETTINGS["PATH"],  # type: ignore [arg-type]
+        )
+    except OSError as error:
+        logger.error(f"Metrics server is not started: {error}")
+        return None
+
+
+async def run_bot(mode: str = "polling"):
     """
     The main function that starts the bot's operation.
 
     Actions:
         1. Logs that the program has started.
         2. Registers dynamic handlers.
-        3. Starts message polling.
+        3. Starts the metrics endpoint.
+        4. Starts message polling or the webhook server.
+        5. On exit closes the metrics endpoint and the bot session.
+
+    Args:
+        mode (str): "polling" for long polling, "webhook" to serve updates
+        on the embedded aiohttp server. Default is "polling".
     """
     logger.info("The program has started")
+    metrics_runner = None
     try:
         await dynamic_handlers_registration()
         logger.debug("Registration of dynamic handlers completed.")
         await register_routers()
         logger.debug("Routers registered")
+        metrics_runner = await start_metrics()
         logger.debug("Bot = %s", bot)
         logger.debug("Bot = %s", dp)
         print(
@@ -495,7 +812,14 @@ async def run_bot():
             "\n To stop the bot, close the program\n"
             " or press ctrl+c.\n"
         )
-        await dp.start_polling(bot)
-        logger.debug("Polling started")
+        if mode == "webhook":
+            await run_webhook(dp, bot)
+        else:
+            await dp.start_polling(bot)
+            logger.debug("Polling started")
     except (TelegramAPIError, EnvError) as error:
         logger.critical(f"Telegram API error: {error}")
+    finally:
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
+        await SingletonBot.close_session()
@@ -1,5 +1,4 @@
 import logging
-from logging.config import dictConfig
 
 from aiogram import Router
 from aiogram.filters import Command, StateFilter
@@ -7,13 +6,12 @@ from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import default_state
 from aiogram.types import Message
 
+from bot.prefetch import prefetch_slots
 from bot.singleton_bot import SingletonBot
 from bot.states import FSMSearchAC
 from bot.utils import safe_send_message
-from settings.log_config import log_config
 from settings.messages import MESSAGE_TEXT_ERROR, MESSAGES
 
-dictConfig(log_config)
 logger = logging.getLogger(__name__)
 
 bot = SingletonBot()
@@ -70,6 +68,7 @@ async def handle_cancel_in_state(message: Message, state: FSMContext):
         text=MESSAGES.get("CANCEL", MESSAGE_TEXT_ERROR),
         state=state,
     )
+    prefetch_slots.cancel(chat_id)
     await state.clear()
 
 
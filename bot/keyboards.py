@@ -1,19 +1,79 @@
+"""
+The module contains the inline keyboards of the bot.
+
+All keyboards are static, so they are built once when the module is
+imported and then shared between all users and updates. The shared
+instances are frozen and must not be changed.
+"""
 import logging
+from functools import partial
 from itertools import islice
-from logging.config import dictConfig
-from typing import Dict, Optional
+from typing import Callable, Dict, Hashable, Optional, Tuple
 
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
-
-from settings.constantns import BUTTON_FACTOR, BUTTON_TEXT, CALLBACK_DATA
-from settings.log_config import log_config
+from pydantic import ConfigDict
+
+from settings.constantns import (
+    BUTTON_FACTOR,
+    BUTTON_TEXT,
+    CALLBACK_DATA,
+    LANGUAGES,
+)
 from settings.selector import SELECTOR
 
-dictConfig(log_config)
 logger = logging.getLogger("armor_class_bot")
 
 
+class FrozenInlineKeyboardButton(InlineKeyboardButton):
+    model_config = ConfigDict(frozen=True)
+
+
+class FrozenInlineKeyboardMarkup(InlineKeyboardMarkup):
+    model_config = ConfigDict(frozen=True)
+
+
+KEYBOARD_REGISTRY: Dict[
+    Tuple[Hashable, ...], Optional[InlineKeyboardMarkup]
+] = {}
+
+
+def get_registered_keyboard(
+    key: Tuple[Hashable, ...],
+    builder: Callable[[], Optional[InlineKeyboardMarkup]],
+) -> Optional[InlineKeyboardMarkup]:
+    """
+    Return the keyboard from the registry, building it on the first call.
+
+    Args:
+        key (Tuple[Hashable, ...]): The registry key of the keyboard.
+        builder (Callable): The function that builds the keyboard.
+
+    Returns:
+        Optional[InlineKeyboardMarkup]: The shared keyboard instance.
+    """
+    try:
+        return KEYBOARD_REGISTRY[key]
+    except KeyError:
+        keyboard = KEYBOARD_REGISTRY[key] = builder()
+        return keyboard
+
+
 def get_url_keyboard(language: str) -> InlineKeyboardMarkup:
+    """
+    Return the shared inline keyboard for URL options.
+
+    Args:
+        language (str): Language code to determine the text on buttons.
+
+    Returns:
+        InlineKeyboardMarkup: A keyboard with buttons for URL options.
+    """
+    return get_registered_keyboard(  # type: ignore [return-value]
+        ("url", language), partial(build_url_keyboard, language)
+    )
+
+
+def build_url_keyboard(language: str) -> InlineKeyboardMarkup:
     """
     Generate and return an inline keyboard for URL options.
 
@@ -23,20 +83,20 @@ def get_url_keyboard(language: str) -> InlineKeyboardMarkup:
     Returns:
         InlineKeyboardMarkup: A keyboard with buttons for URL options.
     """
-    button_url_paste = InlineKeyboardButton(
+    button_url_paste = FrozenInlineKeyboardButton(
         text=BUTTON_TEXT.get(language, BUTTON_TEXT["en"]).get(
             "URL_PASTE", "Unknown button"
         ),
         callback_data=CALLBACK_DATA["URL_PASTE"],
     )
 
-    button_url_form = InlineKeyboardButton(
+    button_url_form = FrozenInlineKeyboardButton(
         text=BUTTON_TEXT.get(language, BUTTON_TEXT["en"]).get(
             "URL_FORM", "Unknown button"
         ),
         callback_data=CALLBACK_DATA["URL_FORM"],
     )
-    keyboard = InlineKeyboardMarkup(
+    keyboard = FrozenInlineKeyboardMarkup(
         inline_keyboard=[[button_url_paste, button_url_form]]
     )
     return keyboard
@@ -44,6 +104,25 @@ def get_url_keyboard(language: str) -> InlineKeyboardMarkup:
 
 def get_selection_keyboard(
     filter_name: str, language: str
+) -> Optional[InlineKeyboardMarkup]:
+    """
+    Return the shared inline keyboard for the given filter name.
+
+    Args:
+        filter_name (str): The name of the filter.
+        language (str): Language code to determine the text on buttons.
+
+    Returns:
+        InlineKeyboardMarkup: A keyboard with buttons related to the filter.
+    """
+    return get_registered_keyboard(
+        ("selection", filter_name, language),
+        partial(build_selection_keyboard, filter_name, language),
+    )
+
+
+def build_selection_keyboard(
+    filter_name: str, language: str
 ) -> Optional[InlineKeyboardMarkup]:
     """
     Generate and return an inline keyboard based on the given filter name.
@@ -56,8 +135,8 @@ def get_selection_keyboard(
     Returns:
         InlineKeyboardMarkup: A keyboard with buttons related to the filter.
     """
-    logger.debug(f"Keyboard name {filter_name}")
-    logger.debug(f"Language used: {language}")
+    logger.debug("Keyboard name %s", filter_name)
+    logger.debug("Language used: %s", language)
 
     if filter_name is None:
         return None
@@ -74,12 +153,12 @@ def get_selection_keyboard(
     if buttons is None:
         logger.error(f"There is no buttons for {language} language")
         return None
-    logger.debug(f"Buttons for {filter_name}: {list(buttons)[:3]}")
+    logger.debug("Buttons for %s: %s", filter_name, list(buttons)[:3])
     button_iter = iter(buttons.items())
 
     inline_keyboard = [
         [
-            InlineKeyboardButton(
+            FrozenInlineKeyboardButton(
                 text=text, callback_data=f"{filter_name}={value}"
             )
             for text, value in islice(button_iter, BUTTON_FACTOR["columns"])
@@ -90,17 +169,32 @@ def get_selection_keyboard(
     inline_keyboard = [row for row in inline_keyboard if row]
     inline_keyboard.append(
         [
-            InlineKeyboardButton(
+            FrozenInlineKeyboardButton(
                 text=BUTTON_TEXT[language]["SKIP"],
                 callback_data=f"{filter_name}=_",
             )
         ]
     )
 
-    return InlineKeyboardMarkup(inline_keyboard=inline_keyboard)
+    return FrozenInlineKeyboardMarkup(inline_keyboard=inline_keyboard)
 
 
 def get_sorting_keyboard(language: str) -> InlineKeyboardMarkup:
+    """
+    Return the shared inline keyboard for sorting options.
+
+    Args:
+        language (str): Language code to determine the text on buttons.
+
+    Returns:
+        InlineKeyboardMarkup: A keyboard with sorting options.
+    """
+    return get_registered_keyboard(  # type: ignore [return-value]
+        ("sorting", language), partial(build_sorting_keyboard, language)
+    )
+
+
+def build_sorting_keyboard(language: str) -> InlineKeyboardMarkup:
     """
     Generate and return an inline keyboard for sorting options.
 
@@ -110,28 +204,28 @@ def get_sorting_keyboard(language: str) -> InlineKeyboardMarkup:
     Returns:
         InlineKeyboardMarkup: A keyboard with sorting options.
     """
-    button_danger = InlineKeyboardButton(
+    button_danger = FrozenInlineKeyboardButton(
         text=BUTTON_TEXT.get(language, BUTTON_TEXT["en"]).get(
             "SORT_BY_DANGER", "Unknown button"
         ),
         callback_data=CALLBACK_DATA["SORT_BY_DANGER"],
     )
 
-    button_ac = InlineKeyboardButton(
+    button_ac = FrozenInlineKeyboardButton(
         text=BUTTON_TEXT.get(language, BUTTON_TEXT["en"]).get(
             "SORT_BY_AC", "Unknown button"
         ),
         callback_data=CALLBACK_DATA["SORT_BY_AC"],
     )
 
-    button_title = InlineKeyboardButton(
+    button_title = FrozenInlineKeyboardButton(
         text=BUTTON_TEXT.get(language, BUTTON_TEXT["en"]).get(
             "SORT_BY_TITLE", "Unknown button"
         ),
         callback_data=CALLBACK_DATA["SORT_BY_TITLE"],
     )
 
-    keyboard = InlineKeyboardMarkup(
+    keyboard = FrozenInlineKeyboardMarkup(
         inline_keyboard=[[button_danger, button_ac, button_title]]
     )
 
@@ -139,14 +233,47 @@ def get_sorting_keyboard(language: str) -> InlineKeyboardMarkup:
 
 
 def get_language_keyboard() -> InlineKeyboardMarkup:
+    """
+    Return the shared inline keyboard for language options.
+
+    Returns:
+        InlineKeyboardMarkup: A keyboard with buttons for language options.
+    """
+    return get_registered_keyboard(  # type: ignore [return-value]
+        ("language",), build_language_keyboard
+    )
+
+
+def build_language_keyboard() -> InlineKeyboardMarkup:
     """
     Generate and return an inline keyboard for language options.
 
     Returns:
         InlineKeyboardMarkup: A keyboard with buttons for language options.
     """
-    button_en = InlineKeyboardButton(text="English", callback_data="en")
+    button_en = FrozenInlineKeyboardButton(text="English", callback_data="en")
 
-    button_ru = InlineKeyboardButton(text="Руский", callback_data="ru")
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[[button_en, button_ru]])
+    button_ru = FrozenInlineKeyboardButton(text="Руский", callback_data="ru")
+    keyboard = FrozenInlineKeyboardMarkup(
+        inline_keyboard=[[button_en, button_ru]]
+    )
     return keyboard
+
+
+def build_keyboard_registry() -> None:
+    """
+    Build every static keyboard for every supported language.
+
+    Returns:
+        None
+    """
+    get_language_keyboard()
+    for language in LANGUAGES.values():
+        get_url_keyboard(language)
+        get_sorting_keyboard(language)
+        for filter_name in SELECTOR:
+            get_selection_keyboard(filter_name, language)
+    logger.debug("Keyboards built: %s", len(KEYBOARD_REGISTRY))
+
+
+build_keyboard_registry()
@@ -0,0 +1,215 @@
+"""
+The module contains middlewares that are applied to every handled update.
+"""
+import logging
+import time
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from aiogram import BaseMiddleware
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from aiogram.types import TelegramObject
+
+from metrics.registry import REGISTRY
+from tracing.tracer import new_trace_id, span, TRACE_ID_KEY
+
+logger = logging.getLogger(__name__)
+
+_NOT_LOADED: Any = object()
+
+HANDLER_LATENCY = REGISTRY.histogram(
+    "bot_handler_seconds",
+    "Latency of router handlers, including state write back",
+    ["handler"],
+)
+HANDLER_ERRORS = REGISTRY.counter(
+    "bot_handler_errors_total",
+    "Exceptions raised by router handlers",
+    ["handler"],
+)
+
+
+class CachedFSMContext(FSMContext):
+    """
+    FSM context that reads the state and the data from the storage once
+    and keeps all further changes in memory until flush() is called.
+
+    Attributes:
+        storage (BaseStorage): The storage the snapshot is loaded from.
+        key (StorageKey): The storage key of the user.
+    """
+
+    def __init__(
+        self,
+        storage: BaseStorage,
+        key: StorageKey,
+        raw_state: Optional[str] = _NOT_LOADED,
+    ) -> None:
+        super().__init__(storage=storage, key=key)
+        self._state: Optional[str] = raw_state
+        self._data: Optional[Dict[str, Any]] = None
+        self._state_changed: bool = False
+        self._data_changed: bool = False
+
+    async def get_state(self) -> Optional[str]:
+        if self._state is _NOT_LOADED:
+            self._state = await self.storage.get_state(key=self.key)
+        return self._state
+
+    async def set_state(self, state: StateType = None) -> None:
+        self._state = state.state if isinstance(state, State) else state
+        self._state_changed = True
+
+    async def get_data(self) -> Dict[str, Any]:
+        if self._data is None:
+            self._data = await self.storage.get_data(key=self.key)
+        return self._data.copy()
+
+    async def set_data(self, data: Dict[str, Any]) -> None:
+        self._data = data.copy()
+        self._data_changed = True
+
+    async def update_data(
+        self, data: Optional[Dict[str, Any]] = None, **kwargs: Any
+    ) -> Dict[str, Any]:
+        if data:
+            kwargs.update(data)
+        current_data = await self.get_data()
+        current_data.update(kwargs)
+        await self.set_data(current_data)
+        return current_data.copy()
+
+    async def flush(self) -> None:
+        """
+        Write the changed state and data back to the storage.
+
+        Returns:
+            None
+        """
+        if self._state_changed:
+            await self.storage.set_state(key=self.key, state=self._state)
+            self._state_changed = False
+        if self._data_changed:
+            await self.storage.set_data(
+                key=self.key, data=self._data  # type: ignore [arg-type]
+            )
+            self._data_changed = False
+
+
+class StateSnapshotMiddleware(BaseMiddleware):
+    """
+    Replace the FSM context of the update with a CachedFSMContext.
+
+    The state already read by aiogram for the StateFilter is reused, the data
+    is read on first access, and all changes made by the handler and by the
+    helpers in bot/utils.py are written back once after the handler.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        state = data.get("state")
+        if not isinstance(state, FSMContext) or isinstance(
+            state, CachedFSMContext
+        ):
+            return await handler(event, data)
+        context = CachedFSMContext(
+            storage=state.storage,
+            key=state.key,
+            raw_state=data.get("raw_state", _NOT_LOADED),
+        )
+        data["state"] = context
+        try:
+            return await handler(event, data)
+        finally:
+            await context.flush()
+
+
+def get_handler_name(data: Dict[str, Any]) -> str:
+    """
+    Name the handler that processes the update.
+
+    Args:
+        data (Dict[str, Any]): The middleware data of the update.
+
+    Returns:
+        str: The function name, dynamic handlers also get their keyword,
+        for example "generate_handlers[size]".
+    """
+    handler = data.get("handler")
+    callback = getattr(handler, "callback", None)
+    if isinstance(callback, partial):
+        keyword = callback.keywords.get("keyword")
+        name = getattr(callback.func, "__name__", "partial")
+        return f"{name}[{keyword}]" if keyword else name
+    return getattr(callback, "__name__", "unknown")
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """
+    Record the latency and the errors of every handler in the metrics
+    registry.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        name = get_handler_name(data)
+        start = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            HANDLER_ERRORS.inc(handler=name)
+            raise
+        finally:
+            HANDLER_LATENCY.observe(time.perf_counter() - start, handler=name)
+
+
+def get_chat_id(event: TelegramObject) -> Optional[int]:
+    chat = getattr(event, "chat", None)
+    if chat is None:
+        message = getattr(event, "message", None)
+        chat = getattr(message, "chat", None)
+    return getattr(chat, "id", None)
+
+
+class TracingMiddleware(BaseMiddleware):
+    """
+    Run every handler in the root span of the search trace.
+
+    The trace id is kept in the FSM data, so all updates of one search share
+    it. A new id is started when the data has none, and it is not written
+    back once the handler clears the state, so the next search starts a new
+    trace. Must be registered after StateSnapshotMiddleware, then storing
+    the id costs no extra storage writes.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        state = data.get("state")
+        if not isinstance(state, FSMContext):
+            return await handler(event, data)
+        stored_id = (await state.get_data()).get(TRACE_ID_KEY)
+        trace_id = stored_id or new_trace_id()
+        try:
+            with span(
+                get_handler_name(data),
+                trace_id=trace_id,
+                chat_id=get_chat_id(event),
+            ):
+                return await handler(event, data)
+        finally:
+            if stored_id is None and await state.get_state() is not None:
+                await state.update_data({TRACE_ID_KEY: trace_id})
@@ -0,0 +1,158 @@
+"""
+The module scrapes searches speculatively while the user types the armor
+class.
+
+Once the filters are chosen or a link is pasted, the URL of the search is
+known and the armor class is only a filter over its monsters. The search
+is started at this moment for the whole armor class range and kept in a
+slot of the chat; the armor class handler takes the slot and filters the
+result instead of starting the scrape.
+
+A slot is dropped and its task is cancelled when the user cancels the
+search, starts a search with another URL or does not enter the armor
+class within the TTL.
+"""
+import asyncio
+import contextvars
+import logging
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from bestiary.download import ARMOR_CLASS_RANGE
+from bot.admission import search_admission
+from exceptions.exceptions import BusyError
+from metrics.registry import REGISTRY
+from scraper.scraper import scrape_bestiary, ScrapeResult
+from settings.constantns import PREFETCH_SETTINGS, SCRAPER_SETTINGS
+
+logger = logging.getLogger(__name__)
+
+PREFETCH_RESULTS = REGISTRY.counter(
+    "prefetch_total",
+    "Speculative searches by outcome: used, cancelled or skipped",
+    ["result"],
+)
+
+
+async def scrape_all_armor_classes(chat_id: int, url: str) -> ScrapeResult:
+    """
+    Scrape the search for all armor classes if it is admitted.
+
+    Raises:
+        BusyError: If the bot is at capacity, the armor class handler then
+        makes the search itself.
+    """
+    admission = search_admission.admit()
+    if admission is None:
+        raise BusyError("Prefetch is not admitted")
+    async with admission:
+        return await scrape_bestiary(
+            url,
+            *ARMOR_CLASS_RANGE,
+            owner=chat_id,
+            timeout=SCRAPER_SETTINGS["DEADLINE"],
+        )
+
+
+class PrefetchSlots:
+    """
+    One speculative search per chat.
+
+    Attributes:
+        ttl (float): Seconds a slot waits for the armor class.
+        max_slots (int): Maximum number of searches run speculatively,
+        the others are made when the armor class is entered.
+    """
+
+    def __init__(
+        self,
+        ttl: float,
+        max_slots: int,
+        scrape: Callable[
+            [int, str], Awaitable[ScrapeResult]
+        ] = scrape_all_armor_classes,
+    ) -> None:
+        self.ttl: float = ttl
+        self.max_slots: int = max_slots
+        self._scrape = scrape
+        self._slots: Dict[int, Tuple[str, asyncio.Task]] = {}
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def start(self, chat_id: int, url: str) -> None:
+        """
+        Start the search of the chat unless it is already running.
+
+        Args:
+            chat_id (int): The chat of the search.
+            url (str): The search URL.
+
+        Returns:
+            None
+        """
+        slot = self._slots.get(chat_id)
+        if slot is not None and slot[0] == url:
+            return
+        self.cancel(chat_id)
+        if len(self._slots) >= self.max_slots:
+            PREFETCH_RESULTS.inc(result="skipped")
+            return
+        # Spans of the search must not attach to the finished handler
+        task = contextvars.Context().run(
+            asyncio.create_task, self._scrape(chat_id, url)
+        )
+        self._slots[chat_id] = (url, task)
+        asyncio.get_running_loop().call_later(
+            self.ttl, self._expire, chat_id, task
+        )
+        logger.debug("Prefetch started for chat %s", chat_id)
+
+    def take(self, chat_id: int, url: str) -> Optional[asyncio.Task]:
+        """
+        Take the search of the chat if it was started for the URL.
+
+        Args:
+            chat_id (int): The chat of the search.
+            url (str): The URL the armor class handler searches.
+
+        Returns:
+            Optional[asyncio.Task]: The search returning the monsters of all
+            armor classes, None if there is no such search.
+        """
+        slot = self._slots.pop(chat_id, None)
+        if slot is None:
+            return None
+        if slot[0] != url:
+            self._cancel_task(slot[1])
+            return None
+        PREFETCH_RESULTS.inc(result="used")
+        return slot[1]
+
+    def cancel(self, chat_id: int) -> None:
+        """Cancel the search of the chat, the user has left it."""
+        slot = self._slots.pop(chat_id, None)
+        if slot is not None:
+            self._cancel_task(slot[1])
+
+    def _expire(self, chat_id: int, task: asyncio.Task) -> None:
+        slot = self._slots.get(chat_id)
+        if slot is not None and slot[1] is task:
+            logger.debug("Prefetch of chat %s expired", chat_id)
+            self.cancel(chat_id)
+
+    @staticmethod
+    def _cancel_task(task: asyncio.Task) -> None:
+        PREFETCH_RESULTS.inc(result="cancelled")
+        if not task.done():
+            task.cancel()
+        elif not task.cancelled():
+            task.exception()  # Retrieved, so it is not logged as lost
+
+
+prefetch_slots = PrefetchSlots(
+    ttl=PREFETCH_SETTINGS["TTL"],
+    max_slots=int(PREFETCH_SETTINGS["MAX_SLOTS"]),
+)
+REGISTRY.gauge(
+    "prefetch_slots", "Speculative searches waiting for the armor class"
+).set_function(lambda: len(prefetch_slots))
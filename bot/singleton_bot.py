@@ -1,18 +1,78 @@
 import logging
 import os
-from logging.config import dictConfig
-from typing import Optional
+from typing import Any, Optional
 
 from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import PRODUCTION, TelegramAPIServer
 from dotenv import load_dotenv
 
 from exceptions.exceptions import EnvError
-from settings.log_config import log_config
+from settings.constantns import BOT_API_SETTINGS
 
-dictConfig(log_config)
 logger = logging.getLogger(__name__)
 
 
+class PooledAiohttpSession(AiohttpSession):
+    """
+    Aiohttp session of the bot with a tunable connection pool.
+
+    Attributes:
+        pool_size (int): Maximum number of simultaneous connections.
+        keepalive_timeout (float): Seconds an idle connection is kept open.
+        dns_cache_ttl (int): Seconds the resolved address is cached.
+    """
+
+    def __init__(
+        self,
+        pool_size: int,
+        keepalive_timeout: float,
+        dns_cache_ttl: int,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(**kwargs)
+        self.pool_size: int = pool_size
+        self.keepalive_timeout: float = keepalive_timeout
+        self.dns_cache_ttl: int = dns_cache_ttl
+        self._connector_init.update(
+            limit=pool_size,
+            keepalive_timeout=keepalive_timeout,
+            ttl_dns_cache=dns_cache_ttl,
+        )
+
+
+def create_bot(
+    token: str, api_url: Optional[str] = None, is_local: bool = False
+) -> Bot:
+    """
+    Create the bot with the session configured in BOT_API_SETTINGS.
+
+    Args:
+        token (str): The bot token.
+        api_url (Optional[str]): Base URL of a self-hosted Bot API server,
+        for example "http://localhost:8081". The official server is used
+        if it is not set.
+        is_local (bool): The server runs in --local mode.
+
+    Returns:
+        Bot: The bot instance.
+    """
+    api = (
+        TelegramAPIServer.from_base(api_url, is_local=is_local)
+        if api_url
+        else PRODUCTION
+    )
+    session = PooledAiohttpSession(
+        api=api,
+        timeout=BOT_API_SETTINGS["TIMEOUT"],
+        pool_size=BOT_API_SETTINGS["POOL_SIZE"],  # type: ignore [arg-type]
+        keepalive_timeout=BOT_API_SETTINGS["KEEPALIVE_TIMEOUT"],
+        dns_cache_ttl=BOT_API_SETTINGS["DNS_CACHE_TTL"],  # type: ignore
+    )
+    logger.info("Bot API server: %s", api_url or "official")
+    return Bot(token=token, session=session)
+
+
 class SingletonBot:
     """
     Implement a singleton pattern for the Bot instance.
@@ -67,9 +127,27 @@ class SingletonBot:
             BOT_TOKEN = os.getenv("BOT_TOKEN")
             logger.debug("Bot token: %s", BOT_TOKEN)
             cls.check_token(BOT_TOKEN)
-            cls.instance = Bot(token=BOT_TOKEN)
+            cls.instance = create_bot(
+                token=BOT_TOKEN,  # type: ignore [arg-type] # Checked
+                api_url=os.getenv("BOT_API_URL") or None,
+                is_local=os.getenv("BOT_API_LOCAL", "").lower()
+                in ("1", "true", "yes"),
+            )
         return cls.instance
 
+    @classmethod
+    async def close_session(cls) -> None:
+        """
+        Close the HTTP session of the bot. Safe to call several times, the
+        session is opened again by the next request.
+
+        Returns:
+            None
+        """
+        if cls.instance is not None:
+            await cls.instance.session.close()
+            logger.debug("Bot session is closed")
+
     def __getattr__(self, name: str):
         """
         Get an attribute from the singleton Bot instance.
@@ -0,0 +1,288 @@
+"""
+The module contains a persistent FSM storage for aiogram built on the
+embedded SQLite engine.
+
+Writes are coalesced in memory and flushed to the database in batches by
+a background task, reads go through an in-process LRU cache.
+"""
+import asyncio
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+
+logger = logging.getLogger(__name__)
+
+# (state, data, updated_at)
+Record = Tuple[Optional[str], Dict[str, Any], float]
+
+
+class SQLiteStorage(BaseStorage):
+    """
+    FSM storage that keeps states and data in a local SQLite database.
+
+    The database works in WAL mode, so several processes can share one file.
+    Every change is first put into the cache and into the pending batch,
+    repeated changes of the same key are coalesced, and the batch is written
+    in one transaction every `flush_interval` seconds or as soon as it
+    reaches `batch_size` keys. Keys that have not been touched for `ttl`
+    seconds are treated as missing and removed from the database.
+
+    Attributes:
+        path (str): Path to the database file.
+        flush_interval (float): Seconds between background flushes.
+        batch_size (int): Number of pending keys that forces a flush.
+        cache_size (int): Maximum number of keys kept in the read cache.
+        ttl (float): Seconds of inactivity after which a key expires.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        flush_interval: float = 0.5,
+        batch_size: int = 500,
+        cache_size: int = 10000,
+        ttl: float = 24 * 60 * 60,
+    ) -> None:
+        self.path: str = path
+        self.flush_interval: float = flush_interval
+        self.batch_size: int = batch_size
+        self.cache_size: int = cache_size
+        self.ttl: float = ttl
+        self._cache: "OrderedDict[str, Record]" = OrderedDict()
+        self._pending: Dict[str, Record] = {}
+        self._db_lock = threading.Lock()
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self._last_sweep: float = time.time()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS fsm ("
+            "key TEXT PRIMARY KEY, state TEXT, data BLOB, updated REAL)"
+        )
+        self._connection.commit()
+        self._size: int = self._connection.execute(
+            "SELECT COUNT(*) FROM fsm"
+        ).fetchone()[0]
+
+    @staticmethod
+    def make_key(key: StorageKey) -> str:
+        """
+        Convert an aiogram storage key into a database key.
+
+        Args:
+            key (StorageKey): The aiogram storage key.
+
+        Returns:
+            str: The string key used in the database and in the cache.
+        """
+        return (
+            f"{key.bot_id}:{key.chat_id}:{key.user_id}:"
+            f"{key.thread_id}:{key.destiny}"
+        )
+
+    def _is_expired(self, record: Record) -> bool:
+        return time.time() - record[2] > self.ttl
+
+    def _remember(self, db_key: str, record: Record) -> None:
+        self._cache[db_key] = record
+        self._cache.move_to_end(db_key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _read(self, db_key: str) -> Optional[Record]:
+        with self._db_lock:
+            row = self._connection.execute(
+                "SELECT state, data, updated FROM fsm WHERE key = ?",
+                (db_key,),
+            ).fetchone()
+        if row is None:
+            return None
+        state, data, updated = row
+        return state, pickle.loads(data) if data else {}, updated
+
+    def _write_batch(self, batch: List[Tuple[str, Record]]) -> None:
+        upserts = []
+        deletes = []
+        for db_key, (state, data, updated) in batch:
+            if state is None and not data:
+                deletes.append((db_key,))
+            else:
+                upserts.append(
+                    (
+                        db_key,
+                        state,
+                        pickle.dumps(data, pickle.HIGHEST_PROTOCOL),
+                        updated,
+                    )
+                )
+        with self._db_lock:
+            with self._connection:
+                # Primary key lookups, the count is kept without a scan
+                existing = sum(
+                    self._connection.execute(
+                        "SELECT 1 FROM fsm WHERE key = ?", (upsert[0],)
+                    ).fetchone()
+                    is not None
+                    for upsert in upserts
+                )
+                self._connection.executemany(
+                    "INSERT INTO fsm (key, state, data, updated) "
+                    "VALUES (?, ?, ?, ?) ON CONFLICT(key) DO UPDATE SET "
+                    "state = excluded.state, data = excluded.data, "
+                    "updated = excluded.updated",
+                    upserts,
+                )
+                deleted = self._connection.executemany(
+                    "DELETE FROM fsm WHERE key = ?", deletes
+                ).rowcount
+            self._size += len(upserts) - existing - deleted
+
+    def _sweep(self, deadline: float) -> int:
+        with self._db_lock:
+            with self._connection:
+                cursor = self._connection.execute(
+                    "DELETE FROM fsm WHERE updated < ?", (deadline,)
+                )
+            self._size -= cursor.rowcount
+        return cursor.rowcount
+
+    def size(self) -> int:
+        """
+        Return the number of keys stored in the database.
+
+        The number is counted when the database is opened and then kept
+        up to date by the flushes and sweeps of this process, so reading it
+        does not touch the database. Keys that are not flushed yet are not
+        counted.
+
+        Returns:
+            int: The number of keys.
+        """
+        return self._size
+
+    async def _get_record(self, key: StorageKey) -> Record:
+        db_key = self.make_key(key)
+        record = self._pending.get(db_key) or self._cache.get(db_key)
+        if record is None:
+            record = await asyncio.to_thread(self._read, db_key)
+        if record is None or self._is_expired(record):
+            record = (None, {}, time.time())
+        self._remember(db_key, record)
+        return record
+
+    async def _put_record(
+        self, key: StorageKey, state: Optional[str], data: Dict[str, Any]
+    ) -> None:
+        db_key = self.make_key(key)
+        record = (state, data, time.time())
+        self._remember(db_key, record)
+        self._pending[db_key] = record
+        self._ensure_flusher()
+        if len(self._pending) >= self.batch_size:
+            await self.flush()
+
+    def _ensure_flusher(self) -> None:
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.get_running_loop().create_task(
+                self._flush_periodically()
+            )
+
+    async def _flush_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+                if time.time() - self._last_sweep > self.ttl / 10:
+                    await self.expire()
+            except sqlite3.Error as error:
+                logger.error(f"FSM storage flush failed: {error}")
+
+    async def flush(self) -> None:
+        """
+        Write all pending changes to the database in one transaction.
+
+        Returns:
+            None
+        """
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            batch = list(self._pending.items())
+            self._pending = {}
+            try:
+                await asyncio.to_thread(self._write_batch, batch)
+            except sqlite3.Error:
+                # Keep the changes that were not overwritten meanwhile
+                for db_key, record in batch:
+                    self._pending.setdefault(db_key, record)
+                raise
+            logger.debug("FSM storage flushed %s keys", len(batch))
+
+    async def expire(self) -> None:
+        """
+        Remove keys that have not been touched for longer than ttl.
+
+        Returns:
+            None
+        """
+        now = time.time()
+        self._last_sweep = now
+        deadline = now - self.ttl
+        for db_key in [
+            db_key
+            for db_key, record in self._cache.items()
+            if record[2] < deadline and db_key not in self._pending
+        ]:
+            del self._cache[db_key]
+        removed = await asyncio.to_thread(self._sweep, deadline)
+        logger.debug("FSM storage expired %s keys", removed)
+
+    async def set_state(
+        self, key: StorageKey, state: StateType = None
+    ) -> None:
+        _, data, _ = await self._get_record(key)
+        await self._put_record(
+            key, state.state if isinstance(state, State) else state, data
+        )
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        state, _, _ = await self._get_record(key)
+        return state
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        state, _, _ = await self._get_record(key)
+        await self._put_record(key, state, data.copy())
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        _, data, _ = await self._get_record(key)
+        return data.copy()
+
+    async def close(self) -> None:
+        """
+        Stop the background flusher, write pending changes and close
+        the database connection.
+
+        Returns:
+            None
+        """
+        if self._flusher is not None:
+            self._flusher.cancel()
+            self._flusher = None
+        await self.flush()
+        with self._db_lock:
+            self._connection.close()
@@ -0,0 +1,256 @@
+"""
+The module contains the supervisor side of the supervisor mode: polling
+Telegram, routing the updates to the worker processes and keeping the
+workers alive.
+
+Every update is sent to the worker chosen by the hash of its chat id. An
+update is confirmed to Telegram as soon as it is routed, so a dead worker
+is started again on the same queue with the same index before an update
+is put there, and a watchdog restarts the workers that die while their
+chats are quiet. The module does not import the bot, so it is used
+without a bot token.
+"""
+import asyncio
+import logging
+import multiprocessing
+import signal
+import zlib
+from multiprocessing.process import BaseProcess
+from typing import Any, AsyncIterator, Callable, Dict, List
+
+from aiogram import Bot, Dispatcher
+from aiogram.exceptions import (
+    TelegramAPIError,
+    TelegramNetworkError,
+    TelegramRetryAfter,
+    TelegramServerError,
+)
+from aiogram.methods import GetUpdates
+from aiogram.types import Update
+from aiogram.utils.backoff import Backoff, BackoffConfig
+
+from settings.constantns import SUPERVISOR_SETTINGS
+
+logger = logging.getLogger(__name__)
+
+POLLING_BACKOFF = BackoffConfig(
+    min_delay=1.0, max_delay=5.0, factor=1.3, jitter=0.1
+)
+
+
+def get_chat_id(update: Dict[str, Any]) -> int:
+    """
+    Find the chat id of a raw update.
+
+    Args:
+        update (Dict[str, Any]): The update as received from Telegram.
+
+    Returns:
+        int: The chat id, the user id for updates without a chat (for example
+        callback queries of inline messages), or 0 if neither is present.
+    """
+    for name, event in update.items():
+        if name == "update_id" or not isinstance(event, dict):
+            continue
+        chat = event.get("chat") or (event.get("message") or {}).get("chat")
+        if chat:
+            return chat["id"]
+        user = event.get("from")
+        if user:
+            return user["id"]
+    return 0
+
+
+def choose_worker(chat_id: int, workers: int) -> int:
+    """
+    Choose the worker for a chat.
+
+    Args:
+        chat_id (int): The chat id.
+        workers (int): The number of workers.
+
+    Returns:
+        int: The index of the worker, stable between restarts.
+    """
+    return zlib.crc32(str(chat_id).encode()) % workers
+
+
+class WorkerPool:
+    """
+    Worker processes, each reads the updates of its chats from its queue.
+
+    Attributes:
+        target (Callable[[int, multiprocessing.Queue], None]): Runs a worker
+        with its index and its queue.
+        queues (List[multiprocessing.Queue]): Queues of the workers.
+        processes (List[BaseProcess]): The worker processes, a restarted
+        worker replaces the dead one.
+    """
+
+    def __init__(
+        self, size: int, target: Callable[[int, multiprocessing.Queue], None]
+    ) -> None:
+        # Workers import the bot from scratch instead of inheriting the
+        # supervisor's event loop, sessions and database connections
+        self._context = multiprocessing.get_context("spawn")
+        self.target = target
+        self.queues: List[multiprocessing.Queue] = [
+            self._context.Queue() for _ in range(size)
+        ]
+        self.processes: List[BaseProcess] = []
+
+    def __len__(self) -> int:
+        return len(self.queues)
+
+    def _spawn(self, index: int) -> BaseProcess:
+        process = self._context.Process(
+            target=self.target,
+            args=(index, self.queues[index]),
+            name=f"worker-{index}",
+        )
+        process.start()
+        return process
+
+    def start(self) -> None:
+        """Start a process for every queue."""
+        self.processes = [self._spawn(index) for index in range(len(self))]
+
+    def revive(self, index: int) -> bool:
+        """
+        Start the worker again on its queue if its process has died.
+
+        The updates left in the queue are read by the new process.
+
+        Args:
+            index (int): The index of the worker.
+
+        Returns:
+            bool: True if the worker was started again.
+        """
+        process = self.processes[index]
+        if process.is_alive():
+            return False
+        logger.error(
+            "Worker %s exited with code %s, starting it again",
+            index,
+            process.exitcode,
+        )
+        self.processes[index] = self._spawn(index)
+        return True
+
+    def stop(self, timeout: float) -> None:
+        """
+        Ask the workers to finish their updates and wait for them.
+
+        Args:
+            timeout (float): Seconds to wait for every worker before it is
+            terminated.
+
+        Returns:
+            None
+        """
+        for queue in self.queues:
+            queue.put(None)
+        for process in self.processes:
+            process.join(timeout=timeout)
+            if process.is_alive():
+                logger.warning("Worker %s is terminated", process.name)
+                process.terminate()
+
+
+async def watch_workers(pool: WorkerPool, interval: float) -> None:
+    """Start the dead workers again every `interval` seconds."""
+    while True:
+        await asyncio.sleep(interval)
+        for index in range(len(pool)):
+            pool.revive(index)
+
+
+async def poll_updates(
+    bot: Bot, allowed_updates: List[str]
+) -> AsyncIterator[Update]:
+    """
+    Read the updates of the bot with getUpdates long polling.
+
+    An update is confirmed by the next request once the caller has taken
+    it. Network and server errors are retried with a backoff, other
+    Telegram API errors stop the polling.
+
+    Args:
+        bot (Bot): The bot to poll.
+        allowed_updates (List[str]): Update types handled by the dispatcher.
+
+    Yields:
+        Update: The updates in the order of their ids.
+    """
+    polling_timeout = SUPERVISOR_SETTINGS["POLLING_TIMEOUT"]
+    get_updates = GetUpdates(
+        timeout=polling_timeout, allowed_updates=allowed_updates
+    )
+    # The request must outlive the long poll of Telegram
+    request_timeout = int(bot.session.timeout + polling_timeout)
+    backoff = Backoff(config=POLLING_BACKOFF)
+    while True:
+        try:
+            updates = await bot(get_updates, request_timeout=request_timeout)
+        except TelegramRetryAfter as error:
+            logger.warning(f"Polling is flooded, retry in {error.retry_after}")
+            await asyncio.sleep(error.retry_after)
+            continue
+        except (TelegramNetworkError, TelegramServerError) as error:
+            logger.error(
+                f"Failed to fetch updates, retry in "
+                f"{backoff.next_delay:.1f} seconds: {error}"
+            )
+            await backoff.asleep()
+            continue
+        backoff.reset()
+        for update in updates:
+            yield update
+            get_updates.offset = update.update_id + 1
+
+
+async def distribute_updates(
+    dp: Dispatcher, bot: Bot, pool: WorkerPool
+) -> None:
+    """
+    Poll Telegram and put every update into the queue of its worker until
+    SIGINT or SIGTERM.
+
+    Args:
+        dp (Dispatcher): The dispatcher with registered routers, it tells
+        which update types to poll.
+        bot (Bot): The bot to poll.
+        pool (WorkerPool): The started workers.
+
+    Returns:
+        None
+    """
+    allowed_updates = dp.resolve_used_update_types()
+    loop = asyncio.get_running_loop()
+    polling = asyncio.current_task()
+    for signal_name in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(
+                signal_name, polling.cancel  # type: ignore [union-attr]
+            )
+        except NotImplementedError:  # Windows
+            pass
+    watchdog = asyncio.create_task(
+        watch_workers(pool, SUPERVISOR_SETTINGS["WATCHDOG_INTERVAL"])
+    )
+    try:
+        async for update in poll_updates(bot, allowed_updates):
+            raw_update = update.model_dump(
+                mode="json", by_alias=True, exclude_none=True
+            )
+            worker = choose_worker(get_chat_id(raw_update), len(pool))
+            # The update is already confirmed, a dead worker would lose it
+            pool.revive(worker)
+            pool.queues[worker].put(raw_update)
+    except asyncio.CancelledError:
+        logger.info("Supervisor received a stop signal")
+    except TelegramAPIError as error:
+        logger.critical(f"Telegram API error: {error}")
+    finally:
+        watchdog.cancel()
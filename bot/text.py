@@ -0,0 +1,148 @@
+"""
+The module prepares the text of the results for Telegram messages.
+
+It does not import the bot, so it is used without a bot token.
+"""
+import heapq
+import logging
+from typing import Any, Callable, Iterable, Iterator, List
+
+from scraper.monster_card import MonsterCard
+
+logger = logging.getLogger(__name__)
+
+MAX_MESSAGE_LENGTH = 4000
+# Telegram counts the length of a message in UTF-16 code units
+TELEGRAM_MESSAGE_LIMIT = 4096
+
+
+def select_top(
+    monsters: Iterable[MonsterCard],
+    sort_key: Callable[[MonsterCard], Any],
+    limit: int,
+) -> List[MonsterCard]:
+    """
+    Select the first monsters in the sorting order without sorting them all.
+
+    A heap of `limit` monsters is kept over the stream of monsters, so the
+    cost is O(n log limit) instead of O(n log n). Monsters with equal keys
+    keep their order, as with a stable sort.
+
+    Args:
+    :param monsters: Iterable[MonsterCard] - The monsters found.
+    :param sort_key: Callable - The key of SORTING_KEYS.
+    :param limit: int - The number of monsters to show.
+
+    Returns:
+    List[MonsterCard] - At most `limit` monsters, sorted.
+    """
+    return heapq.nsmallest(limit, monsters, key=sort_key)
+
+
+def telegram_length(text: str) -> int:
+    """Return the length of the text as Telegram counts it."""
+    return len(text.encode("utf-16-le")) // 2
+
+
+def fitting_end(text: str, start: int, max_length: int) -> int:
+    """
+    Return the end of the longest piece of the text from `start` that
+    Telegram counts as at most `max_length` long.
+    """
+    # Every character takes at least one UTF-16 unit
+    end = min(len(text), start + max_length)
+    if telegram_length(text[start:end]) <= max_length:
+        return end
+    units = 0
+    for offset, char in enumerate(text[start:end]):
+        units += 2 if ord(char) > 0xFFFF else 1
+        if units > max_length:
+            # A character longer than the limit still moves the split on
+            return start + max(offset, 1)
+    return end
+
+
+def split_message(
+    text: str, max_length: int = MAX_MESSAGE_LENGTH
+) -> Iterator[str]:
+    """
+    Split the given text into multiple substrings of a specified
+    maximum length.
+
+    Aim to split by double line breaks when possible to maintain readability.
+    Return a list of substrings, each not exceeding the specified
+    maximum length. The length is counted as Telegram counts it, so a
+    character outside the BMP, such as an emoji, takes two.
+
+    Args:
+    :param text: str - The input text to be split.
+    :param max_length: int - The maximum length for each split substring.
+
+    Returns:
+    Iterator[str] - An iterator that yields each split substring.
+
+    Examples:
+    >>> list(split_message("Hello, World!", 5))
+    ['Hello', ', Wor', 'ld!']
+    >>> list(split_message("Hello\n\nWorld!", 7))
+    ['Hello', 'World!']
+    """
+    # Offsets instead of slicing off the rest keep it linear in the length
+    start = 0
+    while True:
+        end = fitting_end(text, start, max_length)
+        if end == len(text):
+            break
+        split_position = text.rfind("\n\n", start, end)
+        if split_position == -1:
+            split_position = end
+        yield text[start:split_position]
+        start = split_position
+        while start < len(text) and text[start].isspace():
+            start += 1
+    yield text[start:]
+
+
+def pack_messages(
+    parts: Iterable[str],
+    max_length: int = TELEGRAM_MESSAGE_LIMIT,
+    separator: str = "\n\n",
+) -> Iterator[str]:
+    """
+    Pack the parts, such as rendered monster cards, into messages.
+
+    Parts are taken one by one and added to the current message while it
+    fits into `max_length`; a message is yielded as soon as the next part
+    does not fit, so the whole text is never built. A part is never split
+    unless it is longer than a message on its own.
+
+    Args:
+    :param parts: Iterable[str] - The parts in the order of sending.
+    :param max_length: int - The maximum length of a message.
+    :param separator: str - The text between two parts of a message.
+
+    Returns:
+    Iterator[str] - An iterator that yields each message.
+
+    Examples:
+    >>> list(pack_messages(["aa", "bb", "cc"], 6))
+    ['aa\n\nbb', 'cc']
+    """
+    separator_length = telegram_length(separator)
+    message: List[str] = []
+    length = 0
+    for part in parts:
+        part_length = telegram_length(part)
+        if part_length > max_length:
+            if message:
+                yield separator.join(message)
+                message, length = [], 0
+            yield from split_message(part, max_length)
+            continue
+        if message and length + separator_length + part_length > max_length:
+            yield separator.join(message)
+            message, length = [], 0
+        length += part_length + (separator_length if message else 0)
+        message.append(part)
+    if message:
+        yield separator.join(message)
@@ -1,22 +1,31 @@
+import hashlib
 import logging
-from logging.config import dictConfig
-from typing import Iterator, Optional, Union
+import time
+from typing import Optional, Union
 
 from aiogram.exceptions import TelegramAPIError
 from aiogram.fsm.context import FSMContext
-from aiogram.types import CallbackQuery, InlineKeyboardMarkup
+from aiogram.types import (
+    CallbackQuery,
+    InlineKeyboardMarkup,
+    InlineQueryResultArticle,
+    InputTextMessageContent,
+)
 
 from bot.singleton_bot import SingletonBot
-from settings.log_config import log_config
-from settings.messages import MESSAGES
+from metrics.registry import REGISTRY
+from scraper.monster_card import MonsterCard
+from settings.messages import MESSAGE_TEXT_ERROR, MESSAGES
+from tracing.tracer import awaiting
 
-dictConfig(log_config)
 logger = logging.getLogger(__name__)
 
-MAX_MESSAGE_LENGTH = 4000
-
 bot = SingletonBot()
 
+SEND_SECONDS = REGISTRY.histogram(
+    "telegram_send_seconds", "Latency of sending one message to Telegram"
+)
+
 
 async def logstate(state: FSMContext, msg: str = "Current state") -> None:
     """
@@ -31,7 +40,7 @@ async def logstate(state: FSMContext, msg: str = "Current state") -> None:
         None
     """
     current_state = await state.get_state()
-    logger.debug(f"{msg}: {current_state}")
+    logger.debug("%s: %s", msg, current_state)
 
 
 def format_reply_markup_for_log(reply_markup):
@@ -65,7 +74,8 @@ async def get_current_language(state: FSMContext) -> str:
     """
     await logstate(state, "Current state in get_current_language")
     data = await state.get_data()
-    logger.debug(f"data in state = {list(data.keys()) if data else 'None'}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("data in state = %s", list(data) if data else None)
     return data.get("current_language", "en") if data else "en"
 
 
@@ -84,10 +94,30 @@ async def get_translated_text(
         Optional[str]: The translated text, or None if not available.
     """
     current_language = await get_current_language(state)
-    logger.debug(f"current_language = {current_language}")
+    logger.debug("current_language = %s", current_language)
     return text.get(current_language) if isinstance(text, dict) else text
 
 
+def format_message(key: str, **values: object) -> Union[dict, str]:
+    """
+    Put the values into every translation of the message.
+
+    Args:
+        key (str): The key of the message in MESSAGES.
+        **values: Values of the placeholders of the message.
+
+    Returns:
+        Union[dict, str]: The message as get_translated_text accepts it.
+    """
+    text = MESSAGES.get(key, MESSAGE_TEXT_ERROR)
+    if isinstance(text, dict):
+        return {
+            language: translation.format(**values)
+            for language, translation in text.items()
+        }
+    return text.format(**values)
+
+
 async def safe_send_message(
     chat_id: int,
     text: Union[dict, str],
@@ -110,10 +140,10 @@ async def safe_send_message(
     Returns:
     None
     """
-    # TODO Place logging parameters in a separate logger settings file.
-    # TODO Ensure logger stability.
-    logger.debug(
-        "STARTED chat_id = {}, text = {}".format(
+    debug = logger.isEnabledFor(logging.DEBUG)
+    if debug:
+        logger.debug(
+            "STARTED chat_id = %s, text = %s",
             chat_id,
             text[:10]
             if isinstance(text, str)
@@ -121,29 +151,39 @@ async def safe_send_message(
             if text
             else None,
         )
-    )
     clean_text = await get_translated_text(state, text)
-    logger.debug(f"clean_text = {clean_text[:20] if clean_text else 'None'}")
+    if debug:
+        logger.debug(
+            "clean_text = %s", clean_text[:20] if clean_text else None
+        )
+    start = time.perf_counter()
     try:
-        if reply_markup:
+        if reply_markup and debug:
             logger.debug(
-                f"reply_markup = {format_reply_markup_for_log(reply_markup)}"
-            )
-            await bot.send_message(
-                chat_id=chat_id,
-                text=clean_text,
-                disable_web_page_preview=True,
-                reply_markup=reply_markup,
-            )
-        else:
-            await bot.send_message(
-                chat_id=chat_id, text=clean_text, disable_web_page_preview=True
+                "reply_markup = %s",
+                format_reply_markup_for_log(reply_markup),
             )
+        with awaiting():
+            if reply_markup:
+                await bot.send_message(
+                    chat_id=chat_id,
+                    text=clean_text,
+                    disable_web_page_preview=True,
+                    reply_markup=reply_markup,
+                )
+            else:
+                await bot.send_message(
+                    chat_id=chat_id,
+                    text=clean_text,
+                    disable_web_page_preview=True,
+                )
     except TelegramAPIError as error:
         logger.error(
             f"Error sending telegram message: {error},"
             f"type: {type(error).__name__}"
         )
+    finally:
+        SEND_SECONDS.observe(time.perf_counter() - start)
     logger.debug("safe_send_message ENDED")
 
 
@@ -154,39 +194,6 @@ async def bag_report(chat_id: int, state: FSMContext) -> None:
     )
 
 
-def split_message(
-    text: str, max_length: int = MAX_MESSAGE_LENGTH
-) -> Iterator[str]:
-    """
-    Split the given text into multiple substrings of a specified
-    maximum length.
-
-    Aim to split by double line breaks when possible to maintain readability.
-    Return a list of substrings, each not exceeding the specified
-    maximum length.
-
-    Args:
-    :param text: str - The input text to be split.
-    :param max_length: int - The maximum length for each split substring.
-
-    Returns:
-    Iterator[str] - An iterator that yields each split substring.
-
-    Examples:
-    >>> list(split_message("Hello, World!", 5))
-    ['Hello', ', Wor', 'ld!']
-    >>> list(split_message("Hello\n\nWorld!", 5))
-    ['Hello', 'World!']
-    """
-    while len(text) > max_length:
-        split_position = text.rfind("\n\n", 0, max_length)
-        if split_position == -1:
-            split_position = max_length
-        yield text[:split_position]
-        text = text[split_position:].lstrip()
-    yield text
-
-
 async def form_final_url(data: dict, base_url: str) -> str:
     """
     Form the final URL by appending parameters from the FSMContext state.
@@ -207,7 +214,7 @@ async def form_final_url(data: dict, base_url: str) -> str:
         value for key, value in data.items() if key.startswith("url_")
     ]
     formed_url = f'{base_url}&{"&".join(additional_params)}'
-    logger.info(f"Final url is {formed_url}")
+    logger.info("Final url is %s", formed_url)
     return formed_url
 
 
@@ -222,9 +229,37 @@ async def safe_answer_callback(callback: CallbackQuery) -> None:
     None
     """
     try:
-        await callback.answer()
+        with awaiting():
+            await callback.answer()
     except TelegramAPIError as error:
         logger.error(
             f"Error sending telegram callback: {error},"
             f"type: {type(error).__name__}"
         )
+
+
+def make_inline_article(
+    card: MonsterCard, language: str
+) -> InlineQueryResultArticle:
+    """
+    Make the inline query result of a monster card.
+
+    The article shows the name with the armor class and the danger below
+    it, choosing it sends the whole card to the chat.
+
+    Args:
+    :param card: MonsterCard - The monster card.
+    :param language: str - The language of the card.
+
+    Returns:
+    InlineQueryResultArticle - The result, its id is derived from the link.
+    """
+    text = str(card.set_language(language))
+    name_line, _, details = text.partition("\n")
+    details = details.split("\n", 1)[-1]  # The link is shown in the text
+    return InlineQueryResultArticle(
+        id=hashlib.md5(card.link.encode()).hexdigest(),
+        title=name_line.split(": ", 1)[-1],
+        description=details,
+        input_message_content=InputTextMessageContent(message_text=text),
+    )
@@ -0,0 +1,214 @@
+"""
+The module runs the bot in webhook mode on an embedded aiohttp server.
+"""
+import asyncio
+import logging
+import os
+import secrets
+import signal
+from typing import Any, Dict, Optional, Set
+
+from aiogram import Bot, Dispatcher
+from aiogram.methods import TelegramMethod
+from aiogram.webhook.aiohttp_server import (
+    setup_application,
+    SimpleRequestHandler,
+)
+from aiohttp import web
+from dotenv import load_dotenv
+
+from exceptions.exceptions import EnvError
+from settings.constantns import WEBHOOK_SETTINGS
+
+logger = logging.getLogger(__name__)
+
+
+class LimitedRequestHandler(SimpleRequestHandler):
+    """
+    Webhook request handler that answers Telegram immediately and processes
+    updates in the background with a limited number of concurrent updates.
+
+    On shutdown it waits for the updates that are still being processed
+    before the bot session is closed.
+
+    Attributes:
+        max_concurrent_updates (int): How many updates are processed at once.
+        shutdown_timeout (float): How long to wait for in-flight updates.
+    """
+
+    def __init__(
+        self,
+        dispatcher: Dispatcher,
+        bot: Bot,
+        secret_token: Optional[str],
+        max_concurrent_updates: int,
+        shutdown_timeout: float,
+        **data: Any,
+    ) -> None:
+        super().__init__(
+            dispatcher=dispatcher,
+            bot=bot,
+            handle_in_background=True,
+            secret_token=secret_token,
+            **data,
+        )
+        self.max_concurrent_updates: int = max_concurrent_updates
+        self.shutdown_timeout: float = shutdown_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrent_updates)
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def handle(self, request: web.Request) -> web.Response:
+        """
+        Check the secret token, answer Telegram and process the update in
+        the background.
+
+        Args:
+            request (web.Request): The webhook request of Telegram.
+
+        Returns:
+            web.Response: An empty answer, 401 if the secret token is wrong.
+        """
+        bot = await self.resolve_bot(request)
+        if not self.verify_secret(
+            request.headers.get("X-Telegram-Bot-Api-Secret-Token", ""), bot
+        ):
+            return web.Response(body="Unauthorized", status=401)
+        update = await request.json(loads=bot.session.json_loads)
+        task = asyncio.create_task(self.process_update(bot, update))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return web.json_response({}, dumps=bot.session.json_dumps)
+
+    __call__ = handle
+
+    async def process_update(self, bot: Bot, update: Dict[str, Any]) -> None:
+        """
+        Feed the update to the dispatcher when one of the places is free.
+
+        Args:
+            bot (Bot): The bot of the update.
+            update (Dict[str, Any]): The raw update.
+
+        Returns:
+            None
+        """
+        async with self._semaphore:
+            result = await self.dispatcher.feed_raw_update(
+                bot=bot, update=update, **self.data
+            )
+            if isinstance(result, TelegramMethod):
+                await self.dispatcher.silent_call_request(
+                    bot=bot, result=result
+                )
+
+    async def close(self) -> None:
+        """
+        Wait for in-flight updates and close the bot session.
+
+        Returns:
+            None
+        """
+        if self._tasks:
+            logger.info(
+                "Waiting for %s updates before shutdown", len(self._tasks)
+            )
+            _, pending = await asyncio.wait(
+                self._tasks, timeout=self.shutdown_timeout
+            )
+            for task in pending:
+                task.cancel()
+            if pending:
+                # Cancelled updates unwind before the session is closed
+                await asyncio.wait(pending)
+        await super().close()
+
+
+def get_webhook_secret() -> str:
+    """
+    Read the webhook secret token from the environment.
+
+    If the token is not set, generate a random one. A random token only
+    suits a single instance: all instances behind a load balancer must
+    share the same WEBHOOK_SECRET.
+
+    Returns:
+        str: The secret token Telegram sends in every webhook request.
+    """
+    secret = os.getenv("WEBHOOK_SECRET")
+    if not secret:
+        logger.warning("WEBHOOK_SECRET is not set, a random one is used")
+        secret = secrets.token_urlsafe(32)
+    return secret
+
+
+async def run_webhook(dp: Dispatcher, bot: Bot) -> None:
+    """
+    Serve updates on an aiohttp web application until SIGINT or SIGTERM.
+
+    Actions:
+        1. Registers the webhook in Telegram on startup.
+        2. Serves updates on WEBHOOK_SETTINGS["PATH"].
+        3. On a stop signal stops accepting requests, waits for in-flight
+           updates and closes the dispatcher and the bot session.
+
+    Args:
+        dp (Dispatcher): The dispatcher with registered routers.
+        bot (Bot): The bot instance.
+
+    Returns:
+        None
+
+    Raises:
+        EnvError: If WEBHOOK_URL environment variable is missing.
+    """
+    load_dotenv()
+    webhook_url = os.getenv("WEBHOOK_URL")
+    if not webhook_url:
+        logger.critical("WEBHOOK_URL environment variable is missing")
+        raise EnvError("WEBHOOK_URL environment variable is missing")
+    secret_token = get_webhook_secret()
+
+    async def on_startup(bot: Bot) -> None:
+        await bot.set_webhook(
+            url=f"{webhook_url}{WEBHOOK_SETTINGS['PATH']}",
+            secret_token=secret_token,
+            allowed_updates=dp.resolve_used_update_types(),
+            max_connections=WEBHOOK_SETTINGS["MAX_CONNECTIONS"],
+        )
+        logger.info("Webhook is set to %s", webhook_url)
+
+    dp.startup.register(on_startup)
+    app = web.Application()
+    LimitedRequestHandler(
+        dispatcher=dp,
+        bot=bot,
+        secret_token=secret_token,
+        max_concurrent_updates=WEBHOOK_SETTINGS["MAX_CONCURRENT_UPDATES"],
+        shutdown_timeout=WEBHOOK_SETTINGS["SHUTDOWN_TIMEOUT"],
+    ).register(app, path=WEBHOOK_SETTINGS["PATH"])
+    setup_application(app, dp, bot=bot)
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(
+        runner, host=WEBHOOK_SETTINGS["HOST"], port=WEBHOOK_SETTINGS["PORT"]
+    )
+    await site.start()
+    logger.info(
+        "Webhook server started on %s:%s",
+        WEBHOOK_SETTINGS["HOST"],
+        WEBHOOK_SETTINGS["PORT"],
+    )
+
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signal_name in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(signal_name, stop_event.set)
+        except NotImplementedError:  # Windows
+            pass
+    try:
+        await stop_event.wait()
+    finally:
+        logger.info("Webhook server is shutting down")
+        await runner.cleanup()
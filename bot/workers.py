@@ -0,0 +1,136 @@
+"""
+The module runs the bot as a supervisor process and several worker
+processes on one machine.
+
+The supervisor is the only process that polls Telegram. Every update is
+sent to the worker chosen by the hash of its chat id, so all updates of
+one chat and its FSM flow are handled by the same worker (see
+bot.supervisor). The workers share the SQLite FSM storage and the dnd.su
+rate limiter through local files.
+"""
+import asyncio
+import logging
+import multiprocessing
+import signal
+from typing import Any, Dict, Optional
+
+from bot.bot import (
+    bot,
+    dp,
+    dynamic_handlers_registration,
+    register_routers,
+    start_metrics,
+)
+from bot.singleton_bot import SingletonBot
+from bot.supervisor import distribute_updates, WorkerPool
+from settings.constantns import SUPERVISOR_SETTINGS
+from settings.log_config import setup_logging
+
+logger = logging.getLogger(__name__)
+
+
+async def prepare_dispatcher() -> None:
+    await dynamic_handlers_registration()
+    await register_routers()
+
+
+async def run_worker(index: int, updates: multiprocessing.Queue) -> None:
+    """
+    Feed the updates from the queue to the dispatcher until None is received.
+
+    Args:
+        index (int): The index of the worker, used in logs.
+        updates (multiprocessing.Queue): The queue of raw updates.
+
+    Returns:
+        None
+    """
+    await prepare_dispatcher()
+    metrics_runner = await start_metrics(port_offset=index + 1)
+    await dp.emit_startup(bot=bot)
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(
+        SUPERVISOR_SETTINGS["MAX_CONCURRENT_UPDATES"]
+    )
+    tasks = set()
+
+    async def process(update: Dict[str, Any]) -> None:
+        try:
+            await dp.feed_raw_update(bot=bot, update=update)
+        except Exception as error:
+            logger.error(f"Worker {index} failed on update: {error}")
+        finally:
+            semaphore.release()
+
+    logger.info("Worker %s started", index)
+    while True:
+        await semaphore.acquire()
+        update: Optional[Dict[str, Any]] = await loop.run_in_executor(
+            None, updates.get
+        )
+        if update is None:
+            break
+        task = asyncio.create_task(process(update))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+    if tasks:
+        await asyncio.wait(
+            tasks, timeout=SUPERVISOR_SETTINGS["SHUTDOWN_TIMEOUT"]
+        )
+    await dp.emit_shutdown(bot=bot)
+    await SingletonBot.close_session()
+    if metrics_runner is not None:
+        await metrics_runner.cleanup()
+    logger.info("Worker %s stopped", index)
+
+
+def worker_main(index: int, updates: multiprocessing.Queue) -> None:
+    # Ctrl+C reaches the whole process group, the supervisor stops workers
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    setup_logging()
+    asyncio.run(run_worker(index, updates))
+
+
+async def supervise(pool: WorkerPool) -> None:
+    """
+    Distribute the updates between the workers of the pool until a stop
+    signal.
+
+    Args:
+        pool (WorkerPool): The started workers.
+
+    Returns:
+        None
+    """
+    await prepare_dispatcher()
+    try:
+        await distribute_updates(dp, bot, pool)
+    finally:
+        await SingletonBot.close_session()
+
+
+def run_supervisor(workers: int) -> None:
+    """
+    Start the worker processes and distribute updates between them.
+
+    Actions:
+        1. Starts `workers` processes, each with its own dispatcher.
+        2. Polls Telegram and sends every update to the worker of its chat,
+           a worker that has died is started again on its queue.
+        3. On a stop signal asks the workers to finish their updates and
+           waits for them.
+
+    Args:
+        workers (int): The number of worker processes.
+
+    Returns:
+        None
+    """
+    pool = WorkerPool(workers, worker_main)
+    pool.start()
+    logger.info("Supervisor started %s workers", workers)
+    try:
+        asyncio.run(supervise(pool))
+    finally:
+        pool.stop(SUPERVISOR_SETTINGS["SHUTDOWN_TIMEOUT"])
+        logger.info("Supervisor stopped")
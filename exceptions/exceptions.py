@@ -11,3 +11,9 @@ class EmptyDataError(Exception):
     """An exception means there is no data where it should be."""
 
     pass
+
+
+class BusyError(Exception):
+    """An exception means the search is rejected, the bot is at capacity."""
+
+    pass
@@ -1,16 +1,40 @@
+import argparse
 import asyncio
 import logging
-from logging.config import dictConfig
 
 from bot.bot import run_bot
-from settings.log_config import log_config
+from bot.workers import run_supervisor
+from settings.constantns import SUPERVISOR_SETTINGS
+from settings.log_config import setup_logging
 
-dictConfig(log_config)
 logger = logging.getLogger("armor_class_bot")
 
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Armor class bot")
+    parser.add_argument(
+        "--mode",
+        choices=("polling", "webhook", "supervisor"),
+        default="polling",
+        help="how to receive updates (default: polling)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=SUPERVISOR_SETTINGS["WORKERS"],
+        help="number of worker processes in supervisor mode",
+    )
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
+    setup_logging()
+    args = parse_args()
     try:
-        asyncio.run(run_bot())
+        if args.mode == "supervisor":
+            run_supervisor(args.workers)
+        else:
+            asyncio.run(run_bot(args.mode))
     except KeyboardInterrupt:
         logger.debug("Emergency interruption by keyboard")
         print("Goodbye!")
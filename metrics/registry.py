@@ -0,0 +1,307 @@
+"""
+The module contains a minimal in-process metrics registry with counters,
+gauges and histograms, exported in the Prometheus text format.
+
+Metrics are created the same way loggers are: every module asks the
+registry for its metrics by name at import time, asking twice for the same
+name returns the same metric.
+"""
+import abc
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import (
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    TypeVar,
+)
+
+LabelValues = Tuple[str, ...]
+MetricType = TypeVar("MetricType", bound="Metric")
+
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+BYTES_BUCKETS: Tuple[float, ...] = (
+    1024,
+    4096,
+    16384,
+    65536,
+    262144,
+    1048576,
+    4194304,
+)
+COUNT_BUCKETS: Tuple[float, ...] = (1, 2, 3, 5, 10, 20, 50, 100, 1000)
+
+
+def format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(
+        '{}="{}"'.format(
+            name,
+            str(value)
+            .replace("\\", "\\\\")
+            .replace("\n", "\\n")
+            .replace('"', '\\"'),
+        )
+        for name, value in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+
+class Metric(abc.ABC):
+    """
+    Base class of metrics.
+
+    Attributes:
+        name (str): The metric name.
+        documentation (str): The help text.
+        labelnames (Tuple[str, ...]): Names of the labels of the metric.
+    """
+
+    type_name: str = "untyped"
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> None:
+        self.name: str = name
+        self.documentation: str = documentation
+        self.labelnames: Tuple[str, ...] = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _label_values(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f"{self.name} expects labels {self.labelnames}, "
+                f"got {tuple(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    @abc.abstractmethod
+    def samples(self) -> Iterator[Tuple[str, str, float]]:
+        """Yield (suffix, formatted labels, value) of every sample."""
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+        lines.extend(
+            f"{self.name}{suffix}{labels} {format_value(value)}"
+            for suffix, labels, value in self.samples()
+        )
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    """A value that only goes up."""
+
+    type_name = "counter"
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels: str) -> float:
+        return self._values.get(self._label_values(labels), 0)
+
+    def samples(self) -> Iterator[Tuple[str, str, float]]:
+        for key, value in list(self._values.items()):
+            yield "", format_labels(self.labelnames, key), value
+
+
+class Gauge(Metric):
+    """
+    A value that goes up and down. Instead of setting the value, a function
+    can be given that is called on every export.
+    """
+
+    type_name = "gauge"
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def get(self, **labels: str) -> float:
+        return self._values.get(self._label_values(labels), 0)
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        self._function = function
+
+    def samples(self) -> Iterator[Tuple[str, str, float]]:
+        if self._function is not None:
+            yield "", "", self._function()
+            return
+        for key, value in list(self._values.items()):
+            yield "", format_labels(self.labelnames, key), value
+
+
+class Histogram(Metric):
+    """Distribution of observed values in cumulative buckets."""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets: Tuple[float, ...] = tuple(sorted(buckets)) + (math.inf,)
+        # label values -> [bucket counts..., sum, count]
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._label_values(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[index] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Observe the wall time of the block in seconds."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def get_count(self, **labels: str) -> float:
+        state = self._values.get(self._label_values(labels))
+        return state[-1] if state else 0
+
+    def get_sum(self, **labels: str) -> float:
+        state = self._values.get(self._label_values(labels))
+        return state[-2] if state else 0
+
+    def samples(self) -> Iterator[Tuple[str, str, float]]:
+        names = self.labelnames + ("le",)
+        for key, state in list(self._values.items()):
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                yield "_bucket", format_labels(
+                    names, key + (format_value(bound),)
+                ), cumulative
+            labels = format_labels(self.labelnames, key)
+            yield "_sum", labels, state[-2]
+            yield "_count", labels, state[-1]
+
+
+class MetricsRegistry:
+    """Collection of all metrics of the process."""
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(
+        self, metric_class: Type[MetricType], name: str, *args, **kwargs
+    ) -> MetricType:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = metric_class(
+                    name, *args, **kwargs
+                )
+            elif not isinstance(metric, metric_class):
+                raise ValueError(f"{name} is already a {metric.type_name}")
+            return metric  # type: ignore [return-value]
+
+    def counter(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._get_or_create(
+            Histogram, name, documentation, labelnames, buckets
+        )
+
+    def render(self) -> str:
+        """
+        Export all metrics.
+
+        Returns:
+            str: The metrics in the Prometheus text format 0.0.4.
+        """
+        return (
+            "\n".join(
+                metric.render()
+                for _, metric in sorted(list(self._metrics.items()))
+            )
+            + "\n"
+        )
+
+
+REGISTRY = MetricsRegistry()
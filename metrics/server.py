@@ -0,0 +1,44 @@
+"""
+The module serves the metrics registry over HTTP for Prometheus.
+"""
+import logging
+
+from aiohttp import web
+
+from metrics.registry import MetricsRegistry, REGISTRY
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def make_metrics_handler(registry: MetricsRegistry = REGISTRY):
+    async def handle_metrics(request: web.Request) -> web.Response:
+        response = web.Response(text=registry.render())
+        response.headers["Content-Type"] = CONTENT_TYPE
+        return response
+
+    return handle_metrics
+
+
+async def start_metrics_server(
+    host: str, port: int, path: str = "/metrics"
+) -> web.AppRunner:
+    """
+    Start a local HTTP server that exports the metrics.
+
+    Args:
+        host (str): The interface to listen on.
+        port (int): The port to listen on.
+        path (str): The path of the metrics endpoint.
+
+    Returns:
+        web.AppRunner: The runner, call its cleanup() to stop the server.
+    """
+    app = web.Application()
+    app.router.add_get(path, make_metrics_handler())
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host=host, port=port).start()
+    logger.info("Metrics are served on http://%s:%s%s", host, port, path)
+    return runner
@@ -0,0 +1,130 @@
+"""
+The module contains an adaptive limit of concurrent requests to dnd.su.
+
+The limit follows AIMD (additive increase, multiplicative decrease): every
+request answered within the target latency adds 1/limit, so the limit
+grows by about one per window of requests, and a timeout, a 429 or a 5xx
+answer halves it. One overload halves the limit once: failures of the
+requests that were sent before the last decrease are not counted again.
+The limit applies to the requests of one process.
+"""
+import asyncio
+import collections
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque
+
+from metrics.registry import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+LIMIT_CHANGES = REGISTRY.counter(
+    "upstream_limit_changes_total",
+    "Changes of the adaptive dnd.su concurrency limit by direction",
+    ["direction"],
+)
+
+
+class Request:
+    """
+    One request under the limit.
+
+    Attributes:
+        started (float): When the request got its place.
+        failed (bool): Set when dnd.su is overloaded: timeout, 429 or 5xx.
+    """
+
+    def __init__(self, started: float) -> None:
+        self.started: float = started
+        self.failed: bool = False
+
+
+class AdaptiveLimiter:
+    """
+    Concurrency limit that adapts to the latency and errors of dnd.su.
+
+    Attributes:
+        limit (float): The current limit, whole requests are admitted.
+        min_limit (int): The limit never goes below it.
+        max_limit (int): The limit never goes above it.
+        target_latency (float): Requests slower than this in seconds do
+        not raise the limit.
+        in_flight (int): Requests being made now.
+    """
+
+    def __init__(
+        self,
+        initial: float,
+        min_limit: int,
+        max_limit: int,
+        target_latency: float,
+    ) -> None:
+        self.limit: float = float(min(max(initial, min_limit), max_limit))
+        self.min_limit: int = min_limit
+        self.max_limit: int = max_limit
+        self.target_latency: float = target_latency
+        self.in_flight: int = 0
+        self._last_decrease: float = float("-inf")
+        self._waiters: Deque[asyncio.Future] = collections.deque()
+
+    @asynccontextmanager
+    async def request(self) -> AsyncIterator[Request]:
+        """
+        Wait for a place under the limit and hold it during the request.
+
+        Yields:
+            Request: Set its `failed` when dnd.su is overloaded.
+        """
+        queued = bool(self._waiters)  # Waiting requests go first
+        while queued or self.in_flight >= int(self.limit):
+            queued = False
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                # The place given to this waiter goes to the next one
+                if waiter.done() and not waiter.cancelled():
+                    self._wake()
+                raise
+        self.in_flight += 1
+        request = Request(time.perf_counter())
+        cancelled = False
+        try:
+            yield request
+        except asyncio.CancelledError:
+            # A request cut short by its caller says nothing about dnd.su
+            cancelled = True
+            raise
+        finally:
+            self.in_flight -= 1
+            if not cancelled:
+                self._record(request, time.perf_counter() - request.started)
+            self._wake()
+
+    def _record(self, request: Request, latency: float) -> None:
+        if request.failed:
+            if request.started < self._last_decrease:
+                return
+            self._last_decrease = time.perf_counter()
+            new_limit = max(self.min_limit, self.limit / 2)
+            LIMIT_CHANGES.inc(direction="down")
+            logger.info(
+                "dnd.su is overloaded, request limit %.1f -> %.1f",
+                self.limit,
+                new_limit,
+            )
+            self.limit = new_limit
+        elif latency <= self.target_latency and self.limit < self.max_limit:
+            if int(self.limit + 1 / self.limit) > int(self.limit):
+                LIMIT_CHANGES.inc(direction="up")
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    def _wake(self) -> None:
+        free = int(self.limit) - self.in_flight
+        while free > 0 and self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                free -= 1
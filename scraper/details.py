@@ -0,0 +1,228 @@
+"""
+The module enriches monster cards with data from their dnd.su pages.
+
+Only the cards that are about to be shown are enriched. Parsed details are
+kept in an SQLite cache keyed by the monster link, so a card shown again
+costs one cache lookup. Missing pages are fetched concurrently, at most
+`concurrency` at a time and through the shared rate limiter, and a page
+requested by several searches at once is fetched once.
+"""
+import asyncio
+import contextvars
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import aiohttp
+from bs4 import BeautifulSoup, Tag
+
+from metrics.registry import REGISTRY
+from scraper.monster_card import MonsterCard, MonsterDetails
+from scraper.scraper import get_soup, rate_limiter
+from settings.constantns import SCRAPER_CONSTANTS
+from tracing.tracer import awaiting
+
+logger = logging.getLogger(__name__)
+
+DETAILS_LOOKUPS = REGISTRY.counter(
+    "details_lookups_total",
+    "Monster detail lookups by result: hit, fetched or failed",
+    ["result"],
+)
+EXPERIENCE = re.compile(r"\(\s*([\d\s]+?)\s*опыт")
+
+
+def parse_details(soup: BeautifulSoup) -> MonsterDetails:
+    """
+    Read the monster data from its dnd.su page.
+
+    Args:
+        soup (BeautifulSoup): The parsed page.
+
+    Returns:
+        MonsterDetails: The details, fields missing from the page are None.
+    """
+    fields: Dict[str, str] = {}
+    params = soup.find("ul", class_="params")
+    for item in params.find_all("li") if isinstance(params, Tag) else []:
+        if item.strong is None:
+            continue
+        label = item.strong.get_text(strip=True)
+        text = item.get_text(" ", strip=True)
+        fields.setdefault(label, text.removeprefix(label).strip())
+    experience = EXPERIENCE.search(fields.get(SCRAPER_CONSTANTS["DANGER"], ""))
+    stats = []
+    block = soup.find("div", class_="stats")
+    if isinstance(block, Tag):
+        for stat in block.find_all("div", recursive=False):
+            texts = [
+                part.get_text(strip=True) for part in stat.find_all("div")
+            ]
+            if len(texts) >= 2:
+                stats.append((texts[0], texts[1]))
+    return MonsterDetails(
+        hit_points=fields.get(SCRAPER_CONSTANTS["HIT_POINTS"]),
+        speed=fields.get(SCRAPER_CONSTANTS["SPEED"]),
+        experience=(
+            "".join(experience.group(1).split()) if experience else None
+        ),
+        stats=tuple(stats),
+    )
+
+
+class DetailCache:
+    """
+    Parsed monster details in SQLite, shared by all bot processes.
+    Queries run in a worker thread, not on the event loop.
+
+    Attributes:
+        path (str): Path to the database file.
+        ttl (float): Seconds after which a page is fetched again.
+    """
+
+    def __init__(self, path: str, ttl: float) -> None:
+        self.path: str = path
+        self.ttl: float = ttl
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS details ("
+            "link TEXT PRIMARY KEY, data TEXT, fetched REAL)"
+        )
+        self._connection.commit()
+
+    async def get_many(
+        self, links: Sequence[str]
+    ) -> Dict[str, MonsterDetails]:
+        """Return the fresh details of the links that are cached."""
+        if not links:
+            return {}
+        return await asyncio.to_thread(self._get_many, links)
+
+    async def put(self, link: str, details: MonsterDetails) -> None:
+        await asyncio.to_thread(self._put, link, details)
+
+    def _get_many(self, links: Sequence[str]) -> Dict[str, MonsterDetails]:
+        placeholders = ",".join("?" * len(links))
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT link, data FROM details"
+                f" WHERE link IN ({placeholders}) AND fetched > ?",
+                (*links, time.time() - self.ttl),
+            ).fetchall()
+        return {
+            link: MonsterDetails.from_dict(json.loads(data))
+            for link, data in rows
+        }
+
+    def _put(self, link: str, details: MonsterDetails) -> None:
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO details VALUES (?, ?, ?)",
+                (link, json.dumps(details.to_dict()), time.time()),
+            )
+            self._connection.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+class DetailEnricher:
+    """
+    Attaches the details to the monster cards.
+
+    Attributes:
+        cache (DetailCache): The details cache.
+        concurrency (int): Maximum number of pages fetched at once.
+        timeout (float): Seconds to wait for the fetched pages, cards that
+        are not enriched in time are shown without details.
+    """
+
+    def __init__(
+        self, cache: DetailCache, concurrency: int, timeout: float
+    ) -> None:
+        self.cache: DetailCache = cache
+        self.concurrency: int = concurrency
+        self.timeout: float = timeout
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._in_flight: Dict[str, asyncio.Task] = {}
+
+    async def enrich(self, cards: Iterable[MonsterCard]) -> None:
+        """
+        Set the details of the cards from the cache or from dnd.su.
+
+        Args:
+            cards (Iterable[MonsterCard]): The cards about to be shown.
+
+        Returns:
+            None
+        """
+        cards = [card for card in cards if card.details is None]
+        cached = await self.cache.get_many([card.link for card in cards])
+        missing: List[MonsterCard] = []
+        for card in cards:
+            card.details = cached.get(card.link)
+            if card.details is None:
+                missing.append(card)
+        DETAILS_LOOKUPS.inc(len(cards) - len(missing), result="hit")
+        if not missing:
+            return
+        tasks = [self._fetch_once(card.link) for card in missing]
+        # Pages still loading after the timeout are cached for the next time
+        with awaiting():
+            done, _ = await asyncio.wait(tasks, timeout=self.timeout)
+        for card, task in zip(missing, tasks):
+            if task in done and not task.cancelled():
+                card.details = task.result()
+
+    async def close(self) -> None:
+        for task in list(self._in_flight.values()):
+            task.cancel()
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _fetch_once(self, link: str) -> asyncio.Task:
+        task = self._in_flight.get(link)
+        if task is None:
+            # The fetch may serve several searches, its awaits are counted
+            # once by the awaiting() of every enrich instead
+            task = contextvars.Context().run(
+                asyncio.create_task, self._fetch(link)
+            )
+            self._in_flight[link] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(link, None))
+        return task
+
+    async def _fetch(self, link: str) -> Optional[MonsterDetails]:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                headers={"User-Agent": SCRAPER_CONSTANTS["USER_AGENT"]}
+            )
+        try:
+            async with self._semaphore:
+                await rate_limiter.wait()
+                soup = await get_soup(session=self._session, current_url=link)
+            details = parse_details(soup) if soup is not None else None
+        except Exception as error:
+            logger.error(f"Details of {link} are not read: {error}")
+            details = None
+        if details is None:
+            DETAILS_LOOKUPS.inc(result="failed")
+            return None
+        await self.cache.put(link, details)
+        DETAILS_LOOKUPS.inc(result="fetched")
+        return details
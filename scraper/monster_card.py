@@ -1,13 +1,41 @@
 import logging
 import re
-from logging.config import dictConfig
-from typing import Optional
+from typing import Any, Dict, NamedTuple, Optional, Tuple
 
-from settings.log_config import log_config
-
-dictConfig(log_config)
 logger = logging.getLogger(__name__)
 
+# Ability abbreviations of dnd.su and their English versions
+STAT_NAMES = {
+    "СИЛ": "STR",
+    "ЛОВ": "DEX",
+    "ТЕЛ": "CON",
+    "ИНТ": "INT",
+    "МДР": "WIS",
+    "ХАР": "CHA",
+}
+
+
+class MonsterDetails(NamedTuple):
+    """Data of the monster page that the bestiary listing does not show."""
+
+    hit_points: Optional[str] = None
+    speed: Optional[str] = None
+    experience: Optional[str] = None
+    # Ability abbreviation as on dnd.su and the score, ("СИЛ", "15 (+2)")
+    stats: Tuple[Tuple[str, str], ...] = ()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {**self._asdict(), "stats": [list(stat) for stat in self.stats]}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "MonsterDetails":
+        return cls(
+            data.get("hit_points"),
+            data.get("speed"),
+            data.get("experience"),
+            tuple((name, score) for name, score in data.get("stats", [])),
+        )
+
 
 class MonsterCard:
     """
@@ -19,6 +47,8 @@ class MonsterCard:
     - armor_class (int): The armor class of the monster.
     - danger_rate (float): The danger rate of the monster,
     represented as a float.
+    - details (Optional[MonsterDetails]): Data of the monster page, set
+    only for the cards that are enriched before they are shown.
 
     Methods:
     - __init__(self, title, link, armor_class, danger_rate_str):
@@ -40,17 +70,26 @@ class MonsterCard:
             "URL": "URL",
             "ARMOR_CLASS": "Armor Class",
             "DANGER": "Danger",
+            "HIT_POINTS": "Hit Points",
+            "SPEED": "Speed",
+            "EXPERIENCE": "XP",
         },
         "ru": {
             "NAME": "Название",
             "URL": "URL",
             "ARMOR_CLASS": "Класс Доспеха",
             "DANGER": "Опасность",
+            "HIT_POINTS": "Хиты",
+            "SPEED": "Скорость",
+            "EXPERIENCE": "Опыт",
         },
     }
 
     DANGER_RATE_STRINGS = {0.125: "1/8", 0.25: "1/4", 0.5: "1/2"}
 
+    # Class default, cards pickled before the details keep working
+    details: Optional[MonsterDetails] = None
+
     def __init__(
         self,
         title: str,
@@ -150,12 +189,36 @@ class MonsterCard:
             match = re.search(r"\[(.*)\]", title_to_display)
             title_to_display = match.group(1) if match else title_to_display
 
-        return (
+        text = (
             f'{local_field_names["NAME"]}: {title_to_display}\n'
             f'{local_field_names["URL"]}: {self.link}\n'
             f'{local_field_names["ARMOR_CLASS"]}: {self.armor_class}\n'
             f'{local_field_names["DANGER"]}: {danger_str}'
         )
+        if self.details is not None:
+            text += self.__details_to_str(local_field_names)
+        return text
+
+    def __details_to_str(self, local_field_names: Dict[str, str]) -> str:
+        details: MonsterDetails = self.details  # type: ignore [assignment]
+        lines = [
+            f"{local_field_names[field]}: {value}"
+            for field, value in (
+                ("HIT_POINTS", details.hit_points),
+                ("SPEED", details.speed),
+                ("EXPERIENCE", details.experience),
+            )
+            if value
+        ]
+        if details.stats:
+            names = {} if self.language == "ru" else STAT_NAMES
+            lines.append(
+                " | ".join(
+                    f"{names.get(name, name)} {score}"
+                    for name, score in details.stats
+                )
+            )
+        return "".join(f"\n{line}" for line in lines)
 
     @staticmethod
     def sort_by_title(monster):
@@ -0,0 +1,78 @@
+"""
+The module contains a rate limiter for requests to dnd.su that is shared
+by all bot processes on the machine through a lock file.
+"""
+import asyncio
+import logging
+import os
+import struct
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows, the limiter works within one process only
+    fcntl = None  # type: ignore [assignment]
+
+logger = logging.getLogger(__name__)
+
+TIMESTAMP_FORMAT = "d"
+
+
+class SharedRateLimiter:
+    """
+    Keep a minimal interval between requests made by any process.
+
+    The time of the next free slot is stored in a small file. Every request
+    takes an exclusive lock on the file, books the next slot and sleeps
+    until that slot comes.
+
+    Attributes:
+        path (str): Path to the lock file.
+        interval (float): Minimal interval between two requests in seconds.
+    """
+
+    def __init__(self, path: str, interval: float) -> None:
+        self.path: str = path
+        self.interval: float = interval
+        self._thread_lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _book_slot(self) -> float:
+        with self._thread_lock:
+            with open(self.path, "a+b") as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                lock_file.seek(0)
+                raw = lock_file.read(struct.calcsize(TIMESTAMP_FORMAT))
+                next_free = (
+                    struct.unpack(TIMESTAMP_FORMAT, raw)[0]
+                    if len(raw) == struct.calcsize(TIMESTAMP_FORMAT)
+                    else 0.0
+                )
+                slot = max(time.time(), next_free)
+                lock_file.seek(0)
+                lock_file.truncate()
+                lock_file.write(
+                    struct.pack(TIMESTAMP_FORMAT, slot + self.interval)
+                )
+                lock_file.flush()
+                # The lock is released when the file is closed
+        return slot
+
+    async def wait(self) -> None:
+        """
+        Wait until this process may send the next request.
+
+        Returns:
+            None
+        """
+        if self.interval <= 0:
+            return
+        slot = await asyncio.to_thread(self._book_slot)
+        delay = slot - time.time()
+        if delay > 0:
+            logger.debug("Rate limiter delay %.3f s", delay)
+            await asyncio.sleep(delay)
@@ -0,0 +1,116 @@
+"""
+The module shares the page fetches of concurrent searches fairly between
+chats.
+
+Every page of a search takes a turn from the scheduler. At most `capacity`
+turns run at once and at most `per_owner` of them belong to one chat. A
+free turn goes to the waiting page whose search has read the fewest pages
+so far (least attained service), ties go in the order of arrival. A small
+search therefore overtakes a search of the whole bestiary after its first
+page, and a chat reading hundreds of pages does not delay the others.
+Searches answered from the local bestiary or a prefetched result do not
+take turns at all.
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Dict, Hashable, List, Tuple
+
+from metrics.registry import REGISTRY
+from tracing.tracer import awaiting
+
+logger = logging.getLogger(__name__)
+
+TURN_WAIT_SECONDS = REGISTRY.histogram(
+    "scheduler_wait_seconds", "Time a page waits for its turn"
+)
+
+# Attained pages, arrival number, owner and the future set on the grant
+Waiting = Tuple[int, int, Hashable, asyncio.Future]
+
+
+class FairScheduler:
+    """
+    Page turns shared between chats.
+
+    Attributes:
+        capacity (Callable[[], int]): Turns that may run at once, read on
+        every grant so it can follow an adaptive limit.
+        per_owner (int): Turns one chat may run at once.
+        running (int): Turns running now.
+    """
+
+    def __init__(self, capacity: Callable[[], int], per_owner: int) -> None:
+        self.capacity: Callable[[], int] = capacity
+        self.per_owner: int = per_owner
+        self.running: int = 0
+        self._running_by_owner: Dict[Hashable, int] = {}
+        self._waiting: List[Waiting] = []
+        self._arrivals = itertools.count()
+
+    def __len__(self) -> int:
+        """The number of pages waiting for a turn."""
+        return sum(not entry[3].done() for entry in self._waiting)
+
+    @asynccontextmanager
+    async def turn(
+        self, owner: Hashable, attained: int
+    ) -> AsyncIterator[None]:
+        """
+        Wait for the turn of a page and hold it while the page is read.
+
+        Args:
+            owner (Hashable): The chat of the search.
+            attained (int): Pages the search has already read.
+
+        Yields:
+            None
+        """
+        start = time.perf_counter()
+        granted = asyncio.get_running_loop().create_future()
+        heapq.heappush(
+            self._waiting, (attained, next(self._arrivals), owner, granted)
+        )
+        self._dispatch()
+        try:
+            with awaiting():
+                await granted
+        except asyncio.CancelledError:
+            if granted.done() and not granted.cancelled():
+                self._release(owner)
+            raise
+        TURN_WAIT_SECONDS.observe(time.perf_counter() - start)
+        try:
+            yield
+        finally:
+            self._release(owner)
+
+    def _release(self, owner: Hashable) -> None:
+        self.running -= 1
+        left = self._running_by_owner[owner] - 1
+        if left:
+            self._running_by_owner[owner] = left
+        else:
+            del self._running_by_owner[owner]
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        blocked: List[Waiting] = []
+        while self._waiting and self.running < self.capacity():
+            entry = heapq.heappop(self._waiting)
+            _, _, owner, granted = entry
+            if granted.done():  # Cancelled while waiting
+                continue
+            if self._running_by_owner.get(owner, 0) >= self.per_owner:
+                blocked.append(entry)
+                continue
+            self.running += 1
+            self._running_by_owner[owner] = (
+                self._running_by_owner.get(owner, 0) + 1
+            )
+            granted.set_result(None)
+        for entry in blocked:
+            heapq.heappush(self._waiting, entry)
@@ -1,23 +1,113 @@
 import asyncio
 import logging
 import re
-from logging.config import dictConfig
-from typing import Any, Callable, List, Optional, Tuple, Type, TypeVar, Union
+import time
+from typing import (
+    Any,
+    Callable,
+    Hashable,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    Type,
+    TypeVar,
+    Union,
+)
 
 import aiohttp
 from bs4 import BeautifulSoup, ResultSet, Tag
 
 from exceptions.exceptions import EmptyDataError
+from metrics.registry import BYTES_BUCKETS, COUNT_BUCKETS, REGISTRY
+from scraper.adaptive_limit import AdaptiveLimiter
 from scraper.monster_card import MonsterCard
-from settings.constantns import SCRAPER_CONSTANTS, SCRAPER_SETTINGS
-from settings.log_config import log_config
+from scraper.rate_limit import SharedRateLimiter
+from scraper.scheduler import FairScheduler
+from settings.constantns import (
+    ADAPTIVE_LIMIT_SETTINGS,
+    RATE_LIMIT_SETTINGS,
+    SCHEDULER_SETTINGS,
+    SCRAPER_CONSTANTS,
+    SCRAPER_SETTINGS,
+)
+from tracing.tracer import awaiting, span
 
-dictConfig(log_config)
 logger = logging.getLogger(__name__)
+# Per-card debug records are sampled, see log_config
+card_logger = logging.getLogger(f"{__name__}.cards")
 
 ExpectedType = TypeVar("ExpectedType")
 ReturnType = TypeVar("ReturnType")
 
+FETCH_SECONDS = REGISTRY.histogram(
+    "scraper_fetch_seconds", "Time of fetching one bestiary page"
+)
+FETCH_BYTES = REGISTRY.histogram(
+    "scraper_fetch_bytes",
+    "Size of one fetched bestiary page",
+    buckets=BYTES_BUCKETS,
+)
+PARSE_SECONDS = REGISTRY.histogram(
+    "scraper_parse_seconds",
+    "Time of parsing one page: html into a tree, tree into cards",
+    ["stage"],
+)
+PAGES_PER_SEARCH = REGISTRY.histogram(
+    "scraper_pages_per_search",
+    "Number of pages read by one search",
+    buckets=COUNT_BUCKETS,
+)
+
+rate_limiter = SharedRateLimiter(
+    path=RATE_LIMIT_SETTINGS["PATH"],  # type: ignore [arg-type]
+    interval=RATE_LIMIT_SETTINGS["INTERVAL"],  # type: ignore [arg-type]
+)
+upstream_limiter = AdaptiveLimiter(
+    initial=ADAPTIVE_LIMIT_SETTINGS["INITIAL"],
+    min_limit=int(ADAPTIVE_LIMIT_SETTINGS["MIN"]),
+    max_limit=int(ADAPTIVE_LIMIT_SETTINGS["MAX"]),
+    target_latency=ADAPTIVE_LIMIT_SETTINGS["TARGET_LATENCY"],
+)
+REGISTRY.gauge(
+    "upstream_concurrency_limit", "Adaptive limit of requests to dnd.su"
+).set_function(lambda: upstream_limiter.limit)
+REGISTRY.gauge(
+    "upstream_in_flight", "Requests to dnd.su being made now"
+).set_function(lambda: upstream_limiter.in_flight)
+# Searches get as many pages at once as dnd.su currently allows
+page_scheduler = FairScheduler(
+    capacity=lambda: int(upstream_limiter.limit),
+    per_owner=SCHEDULER_SETTINGS["PAGES_PER_CHAT"],
+)
+REGISTRY.gauge(
+    "scheduler_waiting_pages", "Pages of searches waiting for their turn"
+).set_function(lambda: len(page_scheduler))
+
+
+class ScrapeResult(List[MonsterCard]):
+    """
+    The monsters found by a search.
+
+    Attributes:
+        partial (bool): The deadline came before the last page was read.
+        pages_read (int): Pages read.
+        pages_total (int): Pages of the search known from the pagination,
+        at least pages_read.
+    """
+
+    def __init__(
+        self,
+        monsters: Iterable[MonsterCard] = (),
+        partial: bool = False,
+        pages_read: int = 0,
+        pages_total: int = 0,
+    ) -> None:
+        super().__init__(monsters)
+        self.partial: bool = partial
+        self.pages_read: int = pages_read
+        self.pages_total: int = pages_total
+
 
 def safe_method_call(
     instance: Any,
@@ -81,6 +171,27 @@ def is_last_page(soup: BeautifulSoup) -> bool:
     return True
 
 
+def count_pages(soup: BeautifulSoup) -> int:
+    """
+    Find the number of pages of the search from the pagination.
+
+    Args:
+        soup (BeautifulSoup): BeautifulSoup object of a search page.
+
+    Returns:
+        int: The largest page number in the pagination, 1 if there is no
+        pagination. The pagination may show only the nearest pages.
+    """
+    pagination = soup.find("ul", class_="pagination")
+    li_tags = safe_method_call(pagination, Tag, Tag.find_all, "li") or []
+    numbers = [
+        int(text)
+        for text in (tag.get_text(strip=True) for tag in li_tags)
+        if text.isdigit()
+    ]
+    return max(numbers, default=1)
+
+
 def get_title(title_tag: Tag) -> str:
     """
     Extract the title text from the given BeautifulSoup tag.
@@ -178,7 +289,7 @@ def get_armor_class_and_danger(
     check_if_empty(params, "There is no ul tags with params class")
     li_tags = safe_method_call(params, Tag, Tag.find_all, "li")
     check_if_empty(li_tags, "There is no li tags in ul tag with params class")
-    logger.debug(f"Is li_tags? - {bool(li_tags)}")
+    card_logger.debug("Is li_tags? - %s", bool(li_tags))
     for tag in li_tags:  # type: ignore [union-attr] #Checked by check_if_empty
         text = tag.get_text()
         if armor_class is None:
@@ -195,7 +306,9 @@ def get_armor_class_and_danger(
                 SCRAPER_CONSTANTS["DANGER"],
                 SCRAPER_CONSTANTS["DANGER_PATTERN"],
             )
-    logger.debug(f"armor class = {armor_class}, danger = {danger_rate}")
+    card_logger.debug(
+        "armor class = %s, danger = %s", armor_class, danger_rate
+    )
     return armor_class, danger_rate
 
 
@@ -276,6 +389,35 @@ def scrape_cards(
     return monster_data
 
 
+def filter_armor_class(
+    monsters: List[MonsterCard], min_armor_class: int, max_armor_class: int
+) -> List[MonsterCard]:
+    """
+    Keep the monsters within the armor class range.
+
+    Args:
+        monsters (List[MonsterCard]): Monsters of a wider range.
+        min_armor_class (int): Minimum armor class.
+        max_armor_class (int): Maximum armor class.
+
+    Returns:
+        List[MonsterCard]: The monsters in the range, in the same order;
+        a ScrapeResult keeps its pages.
+    """
+    if max_armor_class < min_armor_class:
+        min_armor_class, max_armor_class = max_armor_class, min_armor_class
+    found = [
+        monster
+        for monster in monsters
+        if min_armor_class <= (monster.armor_class or 0) <= max_armor_class
+    ]
+    if isinstance(monsters, ScrapeResult):
+        return ScrapeResult(
+            found, monsters.partial, monsters.pages_read, monsters.pages_total
+        )
+    return found
+
+
 async def get_soup(
     session: aiohttp.ClientSession, current_url: str
 ) -> Optional[BeautifulSoup]:
@@ -284,7 +426,8 @@ async def get_soup(
 
     Perform an asynchronous HTTP GET request to fetch the HTML content of the
     specified URL. Parse the HTML content into a BeautifulSoup object for
-    further manipulation.
+    further manipulation. The request waits for a place under the adaptive
+    limit, timeouts, 429 and 5xx answers lower the limit.
 
     Args:
         session (aiohttp.ClientSession): The aiohttp client session to use for
@@ -293,7 +436,8 @@ async def get_soup(
 
     Returns:
         Optional[BeautifulSoup]: A BeautifulSoup object containing the parsed
-        HTML content, or None if an error occurs during the request.
+        HTML content, or None if an error occurs during the request or
+        dnd.su answers with 429 or 5xx.
 
     Raises:
         Various aiohttp errors: For different types of HTTP request errors:
@@ -302,59 +446,166 @@ async def get_soup(
             aiohttp.ServerTimeoutError,
             aiohttp.ClientError.
     """
+    start = time.perf_counter()
     try:
-        async with session.get(current_url) as r:
-            text = await r.text()
+        with awaiting():
+            async with upstream_limiter.request() as request:
+                try:
+                    async with session.get(current_url) as r:
+                        if r.status == 429 or r.status >= 500:
+                            request.failed = True
+                            logger.error(
+                                f"Error on {current_url} - status {r.status}"
+                            )
+                            return None
+                        text = await r.text()
+                        FETCH_BYTES.observe(len(await r.read()))
+                except (aiohttp.ServerTimeoutError, asyncio.TimeoutError):
+                    request.failed = True
+                    raise
     except (
         aiohttp.ClientConnectionError,
         aiohttp.ClientResponseError,
         aiohttp.ServerTimeoutError,
         aiohttp.ClientError,
+        asyncio.TimeoutError,
     ) as error:
         logger.critical(f"Error on {current_url} - {error}")
         return None
-    return BeautifulSoup(text, "lxml")
+    finally:
+        FETCH_SECONDS.observe(time.perf_counter() - start)
+    with PARSE_SECONDS.time(stage="html"):
+        return BeautifulSoup(text, "lxml")
+
+
+async def read_page(
+    session: aiohttp.ClientSession,
+    current_url: str,
+    page_num: int,
+    owner: Hashable,
+    min_armor_class: int,
+    max_armor_class: int,
+) -> Tuple[Optional[BeautifulSoup], List[MonsterCard]]:
+    """
+    Read one page of the bestiary in its turn of the page scheduler.
+
+    Args:
+        session (aiohttp.ClientSession): The session of the search.
+        current_url (str): The URL of the page.
+        page_num (int): The page number, starting with 1.
+        owner (Hashable): The chat of the search.
+        min_armor_class (int): Minimum armor class.
+        max_armor_class (int): Maximum armor class.
+
+    Returns:
+        Tuple[Optional[BeautifulSoup], List[MonsterCard]]: The parsed page,
+        None if it was not loaded, and the monsters found on it.
+    """
+    soup: Optional[BeautifulSoup] = None
+    cards: List[Tag] = []
+    with span("scrape_page", page=page_num):
+        async with page_scheduler.turn(owner, page_num - 1):
+            try:
+                with awaiting():
+                    await rate_limiter.wait()
+                with span("get_soup"):
+                    soup = await get_soup(
+                        session=session, current_url=current_url
+                    )
+                check_if_empty(soup, f"No data found on link {current_url}")
+                cards = soup.find_all("div", class_="card") if soup else []
+                check_if_empty(cards, f"No data found on link {current_url}")
+            except EmptyDataError as error:
+                logger.error(f"Scraper error - {error}")
+        with PARSE_SECONDS.time(stage="cards"):
+            monsters = scrape_cards(
+                cards,  # type: ignore [arg-type]
+                min_armor_class,
+                max_armor_class,
+            )
+    return soup, monsters
 
 
 async def scrape_bestiary(
-    url: str, min_armor_class: int, max_armor_class: int
-) -> List[MonsterCard]:
+    url: str,
+    min_armor_class: int,
+    max_armor_class: int,
+    owner: Optional[Hashable] = None,
+    timeout: Optional[float] = None,
+) -> ScrapeResult:
     """
     Scrap the D&D bestiary based on armor class criteria.
 
+    Every page waits for its turn in the page scheduler, shared fairly
+    between the owners of the searches. Waiting, fetching and parsing are
+    bounded by the deadline of the search; when it comes, the monsters of
+    the pages read so far are returned as a partial result.
+
     Args:
         url (str): The URL of the D&D bestiary.
         min_armor_class (int): Minimum armor class.
         max_armor_class (int): Maximum armor class.
+        owner (Optional[Hashable]): The chat of the search, a search
+        without an owner is scheduled on its own.
+        timeout (Optional[float]): Seconds the search may take, no limit
+        by default.
 
     Returns:
-        List[MonsterCard]: List of MonsterCard objects.
+        ScrapeResult: List of MonsterCard objects with the pages read.
     """
+    if owner is None:
+        owner = object()
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout if timeout is not None else None
+    result = ScrapeResult()
     headers = {"User-Agent": SCRAPER_CONSTANTS["USER_AGENT"]}
     async with aiohttp.ClientSession(headers=headers) as session:
-        monsters_list: List[MonsterCard] = []
         page_num = 1
         last_page = False
         while not last_page and page_num <= SCRAPER_SETTINGS["MAX_PAGES"]:
-            current_url = url + f"&page={page_num}"
+            remaining = (
+                deadline - loop.time() if deadline is not None else None
+            )
             try:
-                soup = await get_soup(session=session, current_url=current_url)
-                check_if_empty(soup, f"No data found on link {current_url}")
-                cards = soup.find_all("div", class_="card") if soup else None
-                check_if_empty(cards, f"No data found on link {current_url}")
-            except EmptyDataError as error:
-                logger.error(f"Scraper error - {error}")
-            monsters_list.extend(
-                scrape_cards(
-                    cards,  # type: ignore # Already checked by check_if_none()
-                    min_armor_class,
-                    max_armor_class,
+                soup, monsters = await asyncio.wait_for(
+                    read_page(
+                        session,
+                        url + f"&page={page_num}",
+                        page_num,
+                        owner,
+                        min_armor_class,
+                        max_armor_class,
+                    ),
+                    remaining,
                 )
-            )
-            logger.debug(f" Read page №{page_num}")
+            except asyncio.TimeoutError:
+                result.partial = True
+                break
+            result.extend(monsters)
+            logger.debug(" Read page №%s", page_num)
+            result.pages_read = page_num
+            if soup is not None:
+                result.pages_total = max(result.pages_total, count_pages(soup))
             last_page = is_last_page(soup) if soup is not None else True
             if last_page:
                 logger.debug(" Reading pages completed.\n")
+                break
             page_num += 1
-            await asyncio.sleep(SCRAPER_SETTINGS["SLEEP_TIME"])
-        return monsters_list
+            sleep_time = SCRAPER_SETTINGS["SLEEP_TIME"]
+            if deadline is not None and loop.time() + sleep_time >= deadline:
+                # The next page can not be read in time
+                result.partial = True
+                break
+            with awaiting():
+                await asyncio.sleep(sleep_time)
+        result.pages_total = max(result.pages_total, result.pages_read)
+        if result.partial:
+            result.pages_total = max(result.pages_total, result.pages_read + 1)
+            logger.warning(
+                "Search deadline: %s of %s pages read on %s",
+                result.pages_read,
+                result.pages_total,
+                url,
+            )
+        PAGES_PER_SEARCH.observe(result.pages_read)
+        return result
@@ -1,5 +1,6 @@
+import os
 import re
-from typing import Callable, Dict, Pattern
+from typing import Callable, Dict, Pattern, Union
 
 from scraper.monster_card import MonsterCard
 
@@ -18,10 +19,135 @@ SORTING_KEYS: Dict[str, Callable] = {
     "sort_by_title": MonsterCard.sort_by_title,
 }
 
+# Telegram Bot API client. A self-hosted Bot API server is set with the
+# BOT_API_URL environment variable, BOT_API_LOCAL=1 if it runs in --local mode
+BOT_API_SETTINGS: Dict[str, Union[int, float]] = {
+    "POOL_SIZE": 100,
+    "TIMEOUT": 60,
+    "KEEPALIVE_TIMEOUT": 30,
+    "DNS_CACHE_TTL": 10 * 60,
+}
+
+# Storage
+STORAGE_SETTINGS: Dict[str, Union[str, int, float]] = {
+    "PATH": os.path.abspath("data/fsm_storage.sqlite3"),
+    "FLUSH_INTERVAL": 0.5,
+    "BATCH_SIZE": 500,
+    "CACHE_SIZE": 10000,
+    "TTL": 24 * 60 * 60,
+}
+
+# Webhook
+WEBHOOK_SETTINGS: Dict[str, Union[str, int, float]] = {
+    "HOST": "0.0.0.0",
+    "PORT": 8080,
+    "PATH": "/webhook",
+    "MAX_CONNECTIONS": 40,
+    "MAX_CONCURRENT_UPDATES": 100,
+    "SHUTDOWN_TIMEOUT": 30,
+}
+
+# Metrics, served for Prometheus on http://HOST:PORT/PATH,
+# supervisor workers use PORT + 1 + worker index
+METRICS_SETTINGS: Dict[str, Union[str, int, bool]] = {
+    "ENABLED": True,
+    "HOST": "127.0.0.1",
+    "PORT": 9100,
+    "PATH": "/metrics",
+}
+
 # Scraper
 SCRAPER_SETTINGS: Dict[str, int] = {
     "SLEEP_TIME": 2,
     "MAX_PAGES": 1000,
+    "DEADLINE": 15,  # Seconds of a bot search, then partial results are shown
+    "PAGE_TIMEOUT": 30,  # Seconds to read one page in python -m bestiary.sync
+}
+
+# Results of a search shown to the user, the first ones in the sort order
+RESULTS_SETTINGS: Dict[str, int] = {
+    "MAX_SHOWN": 50,
+}
+
+# Details from the monster pages, read only for the cards that are shown
+DETAILS_SETTINGS: Dict[str, Union[str, int, float, bool]] = {
+    "ENABLED": True,
+    "PATH": os.path.abspath("data/details.sqlite3"),
+    "CONCURRENCY": 4,
+    "MAX_CARDS": 10,  # The first cards of the results are enriched
+    "TIMEOUT": 10,
+    "TTL": 30 * 24 * 60 * 60,
+}
+
+# Local bestiary, built with python -m bestiary.download, then
+# python -m bestiary.snapshot and python -m bestiary.results; the snapshot
+# is used if present, searches go to dnd.su while both are missing
+BESTIARY_SETTINGS: Dict[str, str] = {
+    "PATH": os.path.abspath("data/bestiary.json"),
+    "SNAPSHOT_PATH": os.path.abspath("data/bestiary.snapshot"),
+    "RESULTS_PATH": os.path.abspath("data/bestiary_results.bin"),
+    # Listing page hashes of python -m bestiary.sync
+    "SYNC_STATE_PATH": os.path.abspath("data/bestiary_sync.json"),
+}
+
+# Inline mode, answered only from the local bestiary
+INLINE_SETTINGS: Dict[str, int] = {
+    "PAGE_SIZE": 20,  # Telegram accepts at most 50 results
+    "CACHE_TIME": 300,
+}
+
+# Searches to dnd.su: beyond MAX_RUNNING they wait, beyond MAX_RUNNING +
+# MAX_QUEUED they are rejected and offered a recent result of the same URL
+ADMISSION_SETTINGS: Dict[str, int] = {
+    "MAX_RUNNING": 20,
+    "MAX_QUEUED": 50,
+    "INITIAL_ESTIMATE": 15,  # Seconds of a search before any is measured
+    "NOTIFY_WAIT": 5,  # The user is told if the wait is longer
+    "RECENT_SEARCHES": 200,
+}
+
+# Searches started while the user types the armor class
+PREFETCH_SETTINGS: Dict[str, Union[bool, int]] = {
+    "ENABLED": True,
+    "TTL": 5 * 60,  # Seconds a search waits for the armor class
+    "MAX_SLOTS": 200,
+}
+
+# The /name command, answered only from the local bestiary
+NAME_SEARCH_SETTINGS: Dict[str, float] = {
+    "LIMIT": 10,
+    "THRESHOLD": 0.3,  # Trigram similarity from 0 to 1
+}
+
+# Shared by all bot processes on the machine
+RATE_LIMIT_SETTINGS: Dict[str, Union[str, float]] = {
+    "PATH": os.path.abspath("data/dnd_su_rate.lock"),
+    "INTERVAL": 0.25,
+}
+
+# Concurrent requests to dnd.su of one bot process, adapted between MIN
+# and MAX: raised while requests are faster than TARGET_LATENCY seconds,
+# halved on timeouts, 429 and 5xx answers
+ADAPTIVE_LIMIT_SETTINGS: Dict[str, float] = {
+    "INITIAL": 4,
+    "MIN": 1,
+    "MAX": 16,
+    "TARGET_LATENCY": 2.0,
+}
+
+# Pages of dnd.su searches are shared between chats, the chat whose
+# search has read the fewest pages goes first
+SCHEDULER_SETTINGS: Dict[str, int] = {
+    "PAGES_PER_CHAT": 1,  # Pages of one chat read at once
+}
+
+# Supervisor mode
+SUPERVISOR_SETTINGS: Dict[str, int] = {
+    "WORKERS": os.cpu_count() or 1,
+    "POLLING_TIMEOUT": 30,
+    "MAX_CONCURRENT_UPDATES": 100,
+    "SHUTDOWN_TIMEOUT": 30,
+    "WATCHDOG_INTERVAL": 5,  # Seconds between the checks of dead workers
 }
 
 SCRAPER_CONSTANTS: Dict[str, str] = {
@@ -35,6 +161,8 @@ SCRAPER_CONSTANTS: Dict[str, str] = {
     "BASE_URL": "https://dnd.su",
     "ARMOR_CLASS": "Класс Доспеха",
     "DANGER": "Опасность",
+    "HIT_POINTS": "Хиты",
+    "SPEED": "Скорость",
     "NEXT_PAGE_INDICATOR": ">",
 }
 
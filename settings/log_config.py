@@ -1,4 +1,30 @@
+import atexit
+import logging
 import os
+from logging.config import dictConfig
+from logging.handlers import QueueHandler, QueueListener
+from queue import SimpleQueue
+from typing import Dict, List
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Let through only every `rate`-th DEBUG record, other levels pass as is.
+
+    Used for the debug logs written for every scraped card.
+    """
+
+    def __init__(self, name: str = "", rate: int = 1) -> None:
+        super().__init__(name)
+        self.rate: int = max(rate, 1)
+        self._counter: int = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG:
+            return True
+        self._counter += 1
+        return self._counter % self.rate == 1 % self.rate
+
 
 log_config = {
     "version": 1,
@@ -12,12 +38,31 @@ log_config = {
             "backupCount": 5,
             "encoding": "utf-8",
         },
+        "traces": {
+            "class": "logging.handlers.RotatingFileHandler",
+            "formatter": "raw",
+            "filename": os.path.abspath("logs/traces.jsonl"),
+            "mode": "a",
+            "maxBytes": 10000000,
+            "backupCount": 5,
+            "encoding": "utf-8",
+        },
+    },
+    "filters": {
+        "card_sampling": {
+            "()": SamplingFilter,
+            "rate": 100,
+        },
     },
     "loggers": {
         "armor_class_bot": {
             "handlers": ["handler"],
             "level": "INFO",
         },
+        "bestiary": {
+            "handlers": ["handler"],
+            "level": "INFO",
+        },
         "bot": {
             "handlers": ["handler"],
             "level": "INFO",
@@ -30,6 +75,10 @@ log_config = {
             "handlers": ["handler"],
             "level": "INFO",
         },
+        "metrics": {
+            "handlers": ["handler"],
+            "level": "INFO",
+        },
         "monster_card": {
             "handlers": ["handler"],
             "level": "INFO",
@@ -38,10 +87,22 @@ log_config = {
             "handlers": ["handler"],
             "level": "INFO",
         },
+        "scraper.scraper.cards": {
+            "filters": ["card_sampling"],
+        },
         "singleton_bot": {
             "handlers": ["handler"],
             "level": "INFO",
         },
+        "tracing": {
+            "handlers": ["handler"],
+            "level": "INFO",
+        },
+        "tracing.export": {
+            "handlers": ["traces"],
+            "level": "INFO",
+            "propagate": False,
+        },
         "utils": {
             "handlers": ["handler"],
             "level": "INFO",
@@ -50,6 +111,55 @@ log_config = {
     "formatters": {
         "formatter": {
             "format": ("%(asctime)s %(levelname)s %(funcName)s %(message)s")
-        }
+        },
+        "raw": {"format": "%(message)s"},
     },
 }
+
+_listeners: List[QueueListener] = []
+
+
+def setup_logging() -> None:
+    """
+    Configure logging for the whole process. Repeated calls do nothing.
+
+    Apply log_config, then move every configured handler to its own
+    QueueListener thread and give the loggers QueueHandlers instead, so
+    writing to the log files never blocks the event loop. A listener passes
+    records to all of its handlers, so each handler gets a separate queue.
+
+    Returns:
+        None
+    """
+    if _listeners:
+        return
+    dictConfig(log_config)
+    queue_handlers: Dict[int, QueueHandler] = {}
+    for name in log_config["loggers"]:  # type: ignore [attr-defined]
+        logger = logging.getLogger(name)
+        for handler in logger.handlers[:]:
+            queue_handler = queue_handlers.get(id(handler))
+            if queue_handler is None:
+                queue: SimpleQueue = SimpleQueue()
+                queue_handler = queue_handlers[id(handler)] = QueueHandler(
+                    queue
+                )
+                _listeners.append(
+                    QueueListener(queue, handler, respect_handler_level=True)
+                )
+            logger.removeHandler(handler)
+            logger.addHandler(queue_handler)
+    for listener in _listeners:
+        listener.start()
+    atexit.register(stop_logging)
+
+
+def stop_logging() -> None:
+    """
+    Write the queued records and stop the listener threads.
+
+    Returns:
+        None
+    """
+    while _listeners:
+        _listeners.pop().stop()
@@ -120,6 +120,75 @@ MESSAGES: Dict[str, Union[str, Dict[str, str]]] = {
             "Если хотите подобрать других, наберите /start"
         ),
     },
+    "NAME_SEARCH_USAGE": {
+        "en": "Send the name of the monster after the command: /name badger",
+        "ru": "Отправьте имя монстра после команды: /name барсук",
+    },
+    "NAME_SEARCH_UNAVAILABLE": {
+        "en": (
+            "Sergeant Armor has no personnel files at hand, search by name"
+            " is unavailable.\n\nTo pick by armor class, type /start"
+        ),
+        "ru": (
+            "У сержанта Армора нет под рукой личных дел, поиск по имени"
+            " недоступен.\n\nЧтобы подобрать по классу доспеха, наберите"
+            " /start"
+        ),
+    },
+    "NAME_SEARCH_EMPTY": {
+        "en": "Sergeant Armor knows no one by that name",
+        "ru": "Сержант Армор никого не знает под таким именем",
+    },
+    "SEARCH_QUEUED": {
+        "en": (
+            "Sergeant Armor is interviewing other recruits,"
+            " your turn comes in about {seconds} s"
+        ),
+        "ru": (
+            "Сержант Армор занят другими новобранцами,"
+            " ваша очередь примерно через {seconds} с"
+        ),
+    },
+    "BUSY": {
+        "en": (
+            "Sergeant Armor is swamped right now.\n\n"
+            "Please send the armor class again in a minute"
+        ),
+        "ru": (
+            "Сержант Армор сейчас завален работой.\n\n"
+            "Пожалуйста, отправьте класс доспеха ещё раз через минуту"
+        ),
+    },
+    "BUSY_RECENT": {
+        "en": (
+            "Sergeant Armor is swamped right now, here are the grunts"
+            " he picked for this request recently"
+        ),
+        "ru": (
+            "Сержант Армор сейчас завален работой, вот салаги, которых"
+            " он недавно подбирал по этому запросу"
+        ),
+    },
+    "PARTIAL_RESULTS": {
+        "en": (
+            "Sergeant Armor ran out of time and checked only {read} of"
+            " {total} pages of recruits, the list is incomplete"
+        ),
+        "ru": (
+            "У сержанта Армора кончилось время, он проверил только {read}"
+            " из {total} страниц новобранцев, список неполный"
+        ),
+    },
+    "RESULTS_CAPPED": {
+        "en": (
+            "Sergeant Armor has lined up the first {shown} of {total}"
+            " grunts. To see others, narrow the armor class or the filters"
+        ),
+        "ru": (
+            "Сержант Армор построил первых {shown} из {total} салаг."
+            " Чтобы увидеть других, сузьте класс доспеха или фильтры"
+        ),
+    },
     "CHOICE_SORT_METHOD": {
         "en": "Choose the sorting method:",
         "ru": "Выберите способ сортировки:",
@@ -0,0 +1,57 @@
+import asyncio
+import unittest
+
+from scraper.adaptive_limit import AdaptiveLimiter
+
+
+class TestAdaptiveLimiter(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.limiter = AdaptiveLimiter(
+            initial=2, min_limit=1, max_limit=4, target_latency=1
+        )
+
+    async def run_request(self, failed=False, seconds=0.0):
+        async with self.limiter.request() as request:
+            await asyncio.sleep(seconds)
+            request.failed = failed
+
+    async def test_fast_requests_raise_the_limit(self):
+        for _ in range(3):
+            await self.run_request()
+        self.assertGreaterEqual(self.limiter.limit, 3)
+        for _ in range(20):
+            await self.run_request()
+        self.assertEqual(self.limiter.limit, 4)
+
+    async def test_slow_requests_keep_the_limit(self):
+        self.limiter.target_latency = 0
+        await self.run_request(seconds=0.01)
+        self.assertEqual(self.limiter.limit, 2)
+
+    async def test_one_overload_halves_the_limit_once(self):
+        self.limiter.limit = 4
+        await asyncio.gather(
+            *(self.run_request(failed=True, seconds=0.01) for _ in range(4))
+        )
+        self.assertEqual(self.limiter.limit, 2)
+        await self.run_request(failed=True)
+        self.assertEqual(self.limiter.limit, 1)
+        await self.run_request(failed=True)
+        self.assertEqual(self.limiter.limit, 1)
+
+    async def test_requests_wait_for_a_place(self):
+        in_flight = []
+
+        async def request():
+            async with self.limiter.request():
+                in_flight.append(self.limiter.in_flight)
+                await asyncio.sleep(0.01)
+
+        self.limiter.max_limit = 2
+        await asyncio.gather(*(request() for _ in range(6)))
+        self.assertEqual(max(in_flight), 2)
+        self.assertEqual(self.limiter.in_flight, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
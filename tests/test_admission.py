@@ -0,0 +1,71 @@
+import asyncio
+import unittest
+
+from bot.admission import RecentSearches, SearchAdmission
+from scraper.monster_card import MonsterCard
+
+
+class TestSearchAdmission(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.control = SearchAdmission(
+            max_running=2, max_queued=1, average_seconds=10
+        )
+
+    async def test_searches_beyond_the_queue_are_rejected(self):
+        release = asyncio.Event()
+        admissions = [self.control.admit() for _ in range(3)]
+        self.assertIsNone(self.control.admit())
+        self.assertEqual(
+            [admission.wait_estimate for admission in admissions],
+            [0, 0, 10],
+        )
+
+        async def search(admission):
+            async with admission:
+                await release.wait()
+
+        tasks = [asyncio.create_task(search(a)) for a in admissions]
+        await asyncio.sleep(0)
+        self.assertEqual((self.control.running, self.control.queued), (2, 1))
+        release.set()
+        await asyncio.gather(*tasks)
+        self.assertEqual((self.control.running, self.control.queued), (0, 0))
+        self.assertIsNotNone(self.control.admit())
+
+    async def test_cancelled_waiting_search_leaves_the_queue(self):
+        release = asyncio.Event()
+
+        async def search(admission):
+            async with admission:
+                await release.wait()
+
+        running = [
+            asyncio.create_task(search(self.control.admit())) for _ in range(2)
+        ]
+        waiting = asyncio.create_task(search(self.control.admit()))
+        await asyncio.sleep(0)
+        waiting.cancel()
+        await asyncio.gather(waiting, return_exceptions=True)
+        self.assertEqual(self.control.queued, 0)
+        release.set()
+        await asyncio.gather(*running)
+
+
+class TestRecentSearches(unittest.TestCase):
+    def test_wider_range_answers_narrower(self):
+        recent = RecentSearches(size=1)
+        monsters = [
+            MonsterCard("A", "/a", 12, "1"),
+            MonsterCard("B", "/b", 16, "1"),
+        ]
+        recent.put("/search", 10, 20, monsters)
+        self.assertEqual(recent.get("/search", 16, 15), monsters[1:])
+        self.assertIsNone(recent.get("/search", 5, 15))
+        recent.put("/search", 12, 12, monsters[:1])
+        self.assertEqual(recent.get("/search", 10, 20), monsters)
+        recent.put("/other", 0, 99, [])
+        self.assertIsNone(recent.get("/search", 12, 12))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,295 @@
+import itertools
+import os
+import random
+import tempfile
+import unittest
+
+from bestiary.bestiary import (
+    Bestiary,
+    FILTER_NAMES,
+    filter_values,
+    iter_bits,
+    MonsterRecord,
+    selections_from_url,
+)
+from bestiary.index import BitmapIndex
+from bestiary.inline import (
+    find_monsters,
+    inline_page,
+    InlineSearch,
+    parse_inline_query,
+)
+from bestiary.names import NameIndex, split_title, trigrams
+from bestiary.results import ResultTable
+from bestiary.search import LocalSearch
+from bestiary.snapshot import Snapshot, write_snapshot
+
+
+def make_bestiary(size=40, seed=0):
+    """Random monsters, every one matches one value of every filter."""
+    rng = random.Random(seed)
+    monsters = [
+        MonsterRecord(f"Monster {number}", f"/m/{number}", 10 + number % 9, 1)
+        for number in range(size)
+    ]
+    filters = {}
+    for name in FILTER_NAMES:
+        values = filter_values(name)[:3]
+        filters[name] = dict.fromkeys(values, 0)
+        for number in range(size):
+            filters[name][rng.choice(values)] |= 1 << number
+    return Bestiary(monsters, filters)
+
+
+def brute_force(bestiary, selections):
+    bits = bestiary.all_bits()
+    for name, code in selections.items():
+        bits &= bestiary.filters[name].get(code, 0)
+    return list(iter_bits(bits))
+
+
+class TestResultTable(unittest.TestCase):
+    def setUp(self):
+        self.bestiary = make_bestiary()
+        self.table = ResultTable.build(self.bestiary)
+
+    def combinations(self):
+        choices = [[None] + filter_values(name)[:4] for name in FILTER_NAMES]
+        names = FILTER_NAMES
+        for codes in itertools.islice(itertools.product(*choices), 0, None, 7):
+            yield {
+                name: code
+                for name, code in zip(names, codes)
+                if code is not None
+            }
+
+    def test_lookup_matches_intersection_of_filters(self):
+        for selections in self.combinations():
+            self.assertEqual(
+                self.table.lookup(selections),
+                brute_force(self.bestiary, selections),
+                selections,
+            )
+
+    def test_equal_sets_are_stored_once(self):
+        self.assertLess(self.table.set_count, len(self.table))
+
+    def test_file_round_trip(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "results.bin")
+            self.table.save(path)
+            loaded = ResultTable.load(path)
+        self.assertEqual(loaded.digest, self.bestiary.digest())
+        for selections in itertools.islice(self.combinations(), 50):
+            self.assertEqual(
+                loaded.lookup(selections), self.table.lookup(selections)
+            )
+
+    def test_unknown_value_is_not_looked_up(self):
+        self.assertIsNone(self.table.lookup({"size": "999"}))
+
+
+class TestBitmapIndex(unittest.TestCase):
+    def setUp(self):
+        self.bestiary = make_bestiary()
+        self.index = BitmapIndex(self.bestiary)
+
+    def test_query_matches_filters_and_armor_class_range(self):
+        selections = {"size": "1", "type": filter_values("type")[0]}
+        expected = [
+            number
+            for number in brute_force(self.bestiary, selections)
+            if 11 <= self.bestiary.monsters[number].armor_class <= 15
+        ]
+        self.assertEqual(self.index.query(selections, 11, 15), expected)
+        self.assertEqual(self.index.query(selections, 15, 11), expected)
+
+    def test_query_agrees_with_precomputed_results(self):
+        table = ResultTable.build(self.bestiary)
+        for code in filter_values("alignment")[:3]:
+            selections = {"alignment": code, "speed": "%2B1"}
+            self.assertEqual(
+                self.index.query(selections, 0, 99),
+                table.lookup(selections),
+            )
+
+    def test_value_missing_from_bestiary_is_not_answered(self):
+        self.assertIsNone(self.index.query({"size": "6"}, 0, 99))
+        self.assertEqual(self.index.query({}, 100, 120), [])
+
+
+class TestLocalSearch(unittest.TestCase):
+    def test_selections_from_url(self):
+        base = "https://dnd.su/bestiary/?search="
+        self.assertEqual(
+            selections_from_url(f"{base}&size=3&speed=%2B2"),
+            {"size": "3", "speed": "%2B2"},
+        )
+        self.assertEqual(selections_from_url(base), {})
+        self.assertIsNone(selections_from_url(f"{base}dragon"))
+        self.assertIsNone(selections_from_url(f"{base}&size=3&size=4"))
+        self.assertIsNone(selections_from_url(f"{base}&colour=red"))
+
+    def test_search_filters_armor_class_in_listing_order(self):
+        bestiary = make_bestiary()
+        search = LocalSearch(
+            BitmapIndex(bestiary), ResultTable.build(bestiary)
+        )
+        url = "https://dnd.su/bestiary/?search=&size=1"
+        expected = [
+            bestiary.monsters[number].link
+            for number in brute_force(bestiary, {"size": "1"})
+            if 12 <= bestiary.monsters[number].armor_class <= 14
+        ]
+        cards = search.search(url, 14, 12)
+        self.assertEqual([card.link for card in cards], expected)
+        self.assertIsNone(search.search(f"{url}&search=dragon", 12, 14))
+
+    def test_results_of_another_bestiary_are_ignored(self):
+        table = ResultTable.build(make_bestiary(seed=1))
+        with self.assertLogs("bestiary.search", level="WARNING"):
+            search = LocalSearch(BitmapIndex(make_bestiary()), table)
+        self.assertIsNone(search.results)
+
+    def test_search_without_results_uses_index(self):
+        bestiary = make_bestiary()
+        url = "https://dnd.su/bestiary/?search=&size=2"
+        self.assertEqual(
+            [
+                card.link
+                for card in LocalSearch(BitmapIndex(bestiary)).search(
+                    url, 0, 99
+                )
+            ],
+            [
+                card.link
+                for card in LocalSearch(
+                    BitmapIndex(bestiary), ResultTable.build(bestiary)
+                ).search(url, 0, 99)
+            ],
+        )
+
+
+class TestSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.bestiary = make_bestiary()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "bestiary.snapshot")
+        write_snapshot(self.bestiary, self.path)
+
+    def open_snapshot(self):
+        snapshot = Snapshot(self.path)
+        self.addCleanup(snapshot.close)
+        return snapshot
+
+    def test_snapshot_answers_like_the_bestiary(self):
+        snapshot = self.open_snapshot()
+        index = BitmapIndex(self.bestiary)
+        self.assertTrue(snapshot.verify())
+        self.assertEqual(snapshot.digest(), self.bestiary.digest())
+        self.assertEqual(list(snapshot.monsters), self.bestiary.monsters)
+        for selections in ({}, {"size": "2"}, {"size": "1", "speed": "%2B3"}):
+            self.assertEqual(
+                snapshot.query(selections, 11, 16),
+                index.query(selections, 11, 16),
+            )
+        self.assertIsNone(snapshot.query({"size": "6"}, 0, 99))
+
+    def test_corruption_is_detected(self):
+        with open(self.path, "r+b") as file:
+            file.seek(-1, os.SEEK_END)
+            last = file.read(1)
+            file.seek(-1, os.SEEK_END)
+            file.write(bytes([last[0] ^ 1]))
+        self.assertFalse(self.open_snapshot().verify())
+
+    def test_truncated_snapshot_is_rejected(self):
+        with open(self.path, "r+b") as file:
+            file.truncate(os.path.getsize(self.path) - 1)
+        with self.assertRaises(ValueError):
+            Snapshot(self.path)
+
+
+class TestInline(unittest.TestCase):
+    def setUp(self):
+        self.index = BitmapIndex(make_bestiary())
+
+    def test_parse_inline_query(self):
+        self.assertEqual(
+            parse_inline_query("15 dragon"), InlineSearch(15, 15, "dragon")
+        )
+        self.assertEqual(
+            parse_inline_query(" 16-12 Red Dragon "),
+            InlineSearch(12, 16, "red dragon"),
+        )
+        self.assertEqual(parse_inline_query("12 14"), InlineSearch(12, 14, ""))
+        self.assertEqual(
+            parse_inline_query("12 1dragon"), InlineSearch(12, 12, "1dragon")
+        )
+        self.assertIsNone(parse_inline_query("dragon"))
+
+    def test_type_name_filters_by_type(self):
+        type_bits = self.index.value_bits("type", "23")  # Monster
+        self.assertEqual(
+            find_monsters(self.index, InlineSearch(10, 18, "монстр")),
+            list(iter_bits(type_bits)),
+        )
+
+    def test_text_is_part_of_the_title(self):
+        self.assertEqual(
+            find_monsters(self.index, InlineSearch(10, 18, "ster 1")),
+            [1] + list(range(10, 20)),
+        )
+
+    def test_pages_cover_all_monsters(self):
+        links, offset = [], ""
+        while True:
+            cards, offset = inline_page(self.index, "10-18", offset, 7)
+            links += [card.link for card in cards]
+            if not offset:
+                break
+        self.assertEqual(links, [f"/m/{number}" for number in range(40)])
+
+
+class TestNameIndex(unittest.TestCase):
+    def setUp(self):
+        titles = [
+            "Барсук [Badger]",
+            "Гигантский барсук [Giant badger]",
+            "Бармен [Bartender]",
+            "Ёж",
+            "Красный дракон [Red dragon]",
+        ]
+        self.monsters = [
+            MonsterRecord(title, f"/m/{number}", 10, 1)
+            for number, title in enumerate(titles)
+        ]
+        self.names = NameIndex(self.monsters)
+
+    def test_split_title(self):
+        self.assertEqual(split_title("Барсук [Badger]"), ("Барсук", "Badger"))
+        self.assertEqual(split_title("Ёж"), ("Ёж",))
+
+    def test_trigrams_of_words(self):
+        self.assertEqual(trigrams("Ёж!"), frozenset({"  е", " еж", "еж "}))
+
+    def test_typo_tolerant_search_ranks_by_similarity(self):
+        found = [number for number, _ in self.names.search("badgr")]
+        self.assertEqual(found, [0, 1])
+        self.assertEqual(self.names.search("Барсук")[0], (0, 1.0))
+        self.assertEqual(self.names.search("ёж")[0], (3, 1.0))
+        self.assertEqual(self.names.search("red dragn")[0][0], 4)
+
+    def test_limit_and_threshold(self):
+        self.assertEqual(len(self.names.search("барсук", limit=1)), 1)
+        self.assertEqual(self.names.search("xyz"), [])
+        self.assertEqual(
+            [number for number, _ in self.names.search("badger", 10, 1.0)],
+            [0, 1],
+        )
+        self.assertEqual(self.names.search("giant badger")[0], (1, 1.0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+import asyncio
+import os
+import tempfile
+import unittest
+
+from bs4 import BeautifulSoup
+
+from scraper.details import DetailCache, DetailEnricher, parse_details
+from scraper.monster_card import MonsterCard, MonsterDetails
+from tracing.tracer import current_span, span
+
+MONSTER_PAGE = """
+<div class="card">
+  <ul class="params">
+    <li class="size-type-alignment">Маленький зверь, без мировоззрения</li>
+    <li><strong>Класс Доспеха</strong> 10</li>
+    <li><strong>Хиты</strong> 5 (1к6 + 2)</li>
+    <li><strong>Скорость</strong> 20 фт., копая 5 фт.</li>
+    <li>
+      <div class="stats">
+        <div title="Сила"><div class="stat">СИЛ</div><div>4 (-3)</div></div>
+        <div title="Ловкость"><div class="stat">ЛОВ</div><div>11 (+0)</div>
+        </div>
+      </div>
+    </li>
+    <li><strong>Опасность</strong> 0 (10 опыта)</li>
+  </ul>
+</div>
+"""
+DETAILS = MonsterDetails(
+    "5 (1к6 + 2)", "20 фт., копая 5 фт.", "10", (("СИЛ", "4 (-3)"),)
+)
+
+
+class CountingEnricher(DetailEnricher):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fetched = []
+        self.spans = []
+
+    async def _fetch(self, link):
+        self.fetched.append(link)
+        self.spans.append(current_span())
+        await asyncio.sleep(0.01)
+        await self.cache.put(link, DETAILS)
+        return DETAILS
+
+
+class TestDetails(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.cache = DetailCache(
+            os.path.join(directory.name, "details.sqlite3"), ttl=60
+        )
+        self.addCleanup(self.cache.close)
+
+    def test_parse_details(self):
+        details = parse_details(BeautifulSoup(MONSTER_PAGE, "lxml"))
+        self.assertEqual(details.hit_points, "5 (1к6 + 2)")
+        self.assertEqual(details.speed, "20 фт., копая 5 фт.")
+        self.assertEqual(details.experience, "10")
+        self.assertEqual(
+            details.stats, (("СИЛ", "4 (-3)"), ("ЛОВ", "11 (+0)"))
+        )
+
+    def test_page_without_params(self):
+        self.assertEqual(
+            parse_details(BeautifulSoup("<p></p>", "lxml")), MonsterDetails()
+        )
+
+    async def test_cache_round_trip_and_expiry(self):
+        await self.cache.put("/a", DETAILS)
+        self.assertEqual(
+            await self.cache.get_many(["/a", "/b"]), {"/a": DETAILS}
+        )
+        self.cache.ttl = -1
+        self.assertEqual(await self.cache.get_many(["/a"]), {})
+
+    async def test_concurrent_requests_fetch_a_page_once(self):
+        enricher = CountingEnricher(self.cache, concurrency=2, timeout=5)
+        first = [
+            MonsterCard("A", "/a", 10, "1"),
+            MonsterCard("B", "/b", 10, "1"),
+        ]
+        second = [MonsterCard("A", "/a", 10, "1")]
+        await asyncio.gather(enricher.enrich(first), enricher.enrich(second))
+        self.assertEqual(sorted(enricher.fetched), ["/a", "/b"])
+        self.assertTrue(
+            all(card.details == DETAILS for card in first + second)
+        )
+
+        shown_again = [MonsterCard("B", "/b", 10, "1")]
+        await enricher.enrich(shown_again)
+        self.assertEqual(len(enricher.fetched), 2)
+        self.assertEqual(shown_again[0].details, DETAILS)
+
+    async def test_fetches_are_not_traced_in_the_search(self):
+        enricher = CountingEnricher(self.cache, concurrency=2, timeout=5)
+        cards = [MonsterCard("A", "/a", 10, "1")]
+        with span("enrich_details", trace_id="abc") as traced:
+            await enricher.enrich(cards)
+        self.assertEqual(enricher.spans, [None])
+        self.assertGreater(traced.await_time, 0)
+        self.assertGreaterEqual(traced.wall_time, traced.await_time)
+
+    async def test_card_shows_details_in_its_language(self):
+        card = MonsterCard("Барсук [Badger]", "/a", 10, "0")
+        card.details = DETAILS
+        self.assertIn("Hit Points: 5 (1к6 + 2)", str(card))
+        self.assertIn("STR 4 (-3)", str(card))
+        self.assertIn("СИЛ 4 (-3)", str(card.set_language("ru")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+
+from pydantic import ValidationError
+
+from bot.keyboards import (
+    build_selection_keyboard,
+    get_selection_keyboard,
+    get_sorting_keyboard,
+    KEYBOARD_REGISTRY,
+)
+from settings.constantns import LANGUAGES
+from settings.selector import SELECTOR
+
+
+class TestKeyboardRegistry(unittest.TestCase):
+    def test_every_selection_keyboard_is_prebuilt(self):
+        for language in LANGUAGES.values():
+            for filter_name in SELECTOR:
+                self.assertIn(
+                    ("selection", filter_name, language), KEYBOARD_REGISTRY
+                )
+
+    def test_registry_returns_shared_instance(self):
+        self.assertIs(
+            get_selection_keyboard("type", "en"),
+            get_selection_keyboard("type", "en"),
+        )
+        self.assertIs(get_sorting_keyboard("ru"), get_sorting_keyboard("ru"))
+
+    def test_registry_matches_fresh_build(self):
+        self.assertEqual(
+            get_selection_keyboard("danger", "ru").model_dump(),
+            build_selection_keyboard("danger", "ru").model_dump(),
+        )
+
+    def test_shared_keyboard_is_frozen(self):
+        keyboard = get_selection_keyboard("size", "en")
+        with self.assertRaises(ValidationError):
+            keyboard.inline_keyboard = []
+        with self.assertRaises(ValidationError):
+            keyboard.inline_keyboard[0][0].text = "Changed"
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,27 @@
+import logging
+import unittest
+
+from settings.log_config import SamplingFilter
+
+
+def make_record(level: int) -> logging.LogRecord:
+    return logging.LogRecord("scraper", level, __file__, 1, "msg", None, None)
+
+
+class TestSamplingFilter(unittest.TestCase):
+    def test_every_nth_debug_record_passes(self):
+        sampling = SamplingFilter(rate=10)
+        passed = [
+            sampling.filter(make_record(logging.DEBUG)) for _ in range(30)
+        ]
+        self.assertEqual(passed.count(True), 3)
+        self.assertTrue(passed[0])
+
+    def test_higher_levels_are_not_sampled(self):
+        sampling = SamplingFilter(rate=10)
+        for _ in range(5):
+            self.assertTrue(sampling.filter(make_record(logging.ERROR)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+import unittest
+
+from metrics.registry import MetricsRegistry
+
+
+class TestMetricsRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry = MetricsRegistry()
+
+    def test_same_name_returns_same_metric(self):
+        first = self.registry.counter("requests_total", "Requests")
+        second = self.registry.counter("requests_total", "Requests")
+        self.assertIs(first, second)
+        with self.assertRaises(ValueError):
+            self.registry.gauge("requests_total", "Requests")
+
+    def test_counter_render(self):
+        counter = self.registry.counter("errors_total", "Errors", ["handler"])
+        counter.inc(handler="start")
+        counter.inc(2, handler="start")
+        self.assertIn(
+            'errors_total{handler="start"} 3', self.registry.render()
+        )
+        with self.assertRaises(ValueError):
+            counter.inc(wrong="label")
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = self.registry.histogram(
+            "latency_seconds", "Latency", buckets=(0.1, 1)
+        )
+        for value in (0.05, 0.5, 0.7, 5):
+            histogram.observe(value)
+        lines = self.registry.render().splitlines()
+        self.assertIn("# TYPE latency_seconds histogram", lines)
+        self.assertIn('latency_seconds_bucket{le="0.1"} 1', lines)
+        self.assertIn('latency_seconds_bucket{le="1"} 3', lines)
+        self.assertIn('latency_seconds_bucket{le="+Inf"} 4', lines)
+        self.assertIn("latency_seconds_sum 6.25", lines)
+        self.assertIn("latency_seconds_count 4", lines)
+
+    def test_gauge_function(self):
+        gauge = self.registry.gauge("keys", "Keys")
+        gauge.set_function(lambda: 7)
+        self.assertIn("keys 7", self.registry.render())
+
+
+if __name__ == "__main__":
+    unittest.main()
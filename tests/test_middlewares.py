@@ -0,0 +1,115 @@
+import unittest
+from collections import Counter
+
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from bot.middlewares import (
+    CachedFSMContext,
+    StateSnapshotMiddleware,
+    TracingMiddleware,
+)
+from bot.states import FSMSearchAC
+from tracing.tracer import current_span, TRACE_ID_KEY
+
+
+class CountingStorage(MemoryStorage):
+    def __init__(self):
+        super().__init__()
+        self.calls = Counter()
+
+    async def get_state(self, key):
+        self.calls["get_state"] += 1
+        return await super().get_state(key)
+
+    async def set_state(self, key, state=None):
+        self.calls["set_state"] += 1
+        await super().set_state(key, state)
+
+    async def get_data(self, key):
+        self.calls["get_data"] += 1
+        return await super().get_data(key)
+
+    async def set_data(self, key, data):
+        self.calls["set_data"] += 1
+        await super().set_data(key, data)
+
+
+class TestStateSnapshotMiddleware(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.storage = CountingStorage()
+        self.key = StorageKey(bot_id=1, chat_id=2, user_id=3)
+        self.middleware = StateSnapshotMiddleware()
+
+    async def handler(self, event, data):
+        state = data["state"]
+        self.assertIsInstance(state, CachedFSMContext)
+        for _ in range(3):
+            await state.get_state()
+            await state.get_data()
+        await state.update_data({"url_size": "size=1"})
+        await state.update_data({"url_type": "type=21"})
+        await state.set_state(FSMSearchAC.alignment_selection)
+        return "handled"
+
+    async def test_storage_is_read_and_written_once(self):
+        data = {
+            "state": FSMContext(storage=self.storage, key=self.key),
+            "raw_state": FSMSearchAC.type_selection.state,
+        }
+        result = await self.middleware(self.handler, None, data)
+        self.assertEqual(result, "handled")
+        self.assertEqual(
+            self.storage.calls,
+            Counter(get_data=1, set_data=1, set_state=1),
+        )
+        self.assertEqual(
+            await self.storage.get_data(self.key),
+            {"url_size": "size=1", "url_type": "type=21"},
+        )
+        self.assertEqual(
+            await self.storage.get_state(self.key),
+            FSMSearchAC.alignment_selection.state,
+        )
+
+    async def test_nothing_written_without_changes(self):
+        async def reader(event, data):
+            await data["state"].get_data()
+
+        data = {"state": FSMContext(storage=self.storage, key=self.key)}
+        await self.middleware(reader, None, data)
+        self.assertEqual(self.storage.calls, Counter(get_data=1))
+
+
+class TestTracingMiddleware(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.storage = MemoryStorage()
+        self.key = StorageKey(bot_id=1, chat_id=2, user_id=3)
+        self.middleware = TracingMiddleware()
+
+    async def run_handler(self, new_state):
+        seen = []
+
+        async def handler(event, data):
+            seen.append(current_span().trace_id)
+            if new_state is None:
+                await data["state"].clear()
+            else:
+                await data["state"].set_state(new_state)
+
+        data = {"state": FSMContext(storage=self.storage, key=self.key)}
+        with self.assertLogs("tracing.export", level="INFO"):
+            await self.middleware(handler, None, data)
+        return seen[0]
+
+    async def test_trace_id_is_kept_until_state_is_cleared(self):
+        first = await self.run_handler(FSMSearchAC.size_selection)
+        second = await self.run_handler(FSMSearchAC.type_selection)
+        self.assertEqual(first, second)
+        await self.run_handler(None)
+        self.assertNotIn(TRACE_ID_KEY, await self.storage.get_data(self.key))
+
+
+if __name__ == "__main__":
+    unittest.main()
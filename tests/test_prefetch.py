@@ -0,0 +1,68 @@
+import asyncio
+import unittest
+
+from bot.prefetch import PrefetchSlots
+from scraper.monster_card import MonsterCard
+from scraper.scraper import filter_armor_class
+
+MONSTERS = [
+    MonsterCard("A", "/a", 12, "1"),
+    MonsterCard("B", "/b", 15, "2"),
+    MonsterCard("C", "/c", 18, "3"),
+]
+
+
+class TestPrefetch(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.started = []
+        self.release = asyncio.Event()
+        self.slots = PrefetchSlots(ttl=60, max_slots=2, scrape=self.scrape)
+
+    async def scrape(self, chat_id, url):
+        self.started.append(url)
+        await self.release.wait()
+        return MONSTERS
+
+    def test_filter_armor_class(self):
+        self.assertEqual(
+            [card.title for card in filter_armor_class(MONSTERS, 16, 12)],
+            ["A", "B"],
+        )
+
+    async def test_slot_is_taken_for_its_url(self):
+        self.slots.start(1, "/search")
+        self.slots.start(1, "/search")
+        self.release.set()
+        task = self.slots.take(1, "/search")
+        self.assertEqual(await task, MONSTERS)
+        self.assertEqual(self.started, ["/search"])
+        self.assertIsNone(self.slots.take(1, "/search"))
+
+    async def test_other_url_cancels_the_slot(self):
+        self.slots.start(1, "/old")
+        await asyncio.sleep(0)
+        task = self.slots._slots[1][1]
+        self.slots.start(1, "/new")
+        self.assertIsNone(self.slots.take(1, "/other"))
+        await asyncio.sleep(0)
+        self.assertTrue(task.cancelled())
+        self.assertEqual(len(self.slots), 0)
+
+    async def test_cancel_and_slot_limit(self):
+        for chat_id in (1, 2, 3):
+            self.slots.start(chat_id, "/search")
+        self.assertEqual(len(self.slots), 2)
+        self.assertIsNone(self.slots.take(3, "/search"))
+        self.slots.cancel(1)
+        self.assertIsNone(self.slots.take(1, "/search"))
+        self.assertEqual(len(self.slots), 1)
+
+    async def test_unused_slot_expires(self):
+        self.slots.ttl = 0
+        self.slots.start(1, "/search")
+        await asyncio.sleep(0.01)
+        self.assertEqual(len(self.slots), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
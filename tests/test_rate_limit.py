@@ -0,0 +1,27 @@
+import os
+import tempfile
+import unittest
+
+from scraper.rate_limit import SharedRateLimiter
+
+
+class TestSharedRateLimiter(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "rate.lock")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_limiters_share_slots_through_file(self):
+        first = SharedRateLimiter(self.path, interval=10)
+        second = SharedRateLimiter(self.path, interval=10)
+        slot_1 = first._book_slot()
+        slot_2 = second._book_slot()
+        slot_3 = first._book_slot()
+        self.assertAlmostEqual(slot_2 - slot_1, 10, places=3)
+        self.assertAlmostEqual(slot_3 - slot_2, 10, places=3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import asyncio
+import unittest
+
+from scraper.scheduler import FairScheduler
+
+
+class TestFairScheduler(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.capacity = 1
+        self.scheduler = FairScheduler(lambda: self.capacity, per_owner=1)
+        self.order = []
+
+    async def page(self, owner, attained, seconds=0.01):
+        async with self.scheduler.turn(owner, attained):
+            self.order.append(owner)
+            await asyncio.sleep(seconds)
+
+    async def test_least_served_search_goes_first(self):
+        first = asyncio.create_task(self.page("heavy", 50))
+        await asyncio.sleep(0)
+        waiting = [
+            asyncio.create_task(self.page("heavy", 51)),
+            asyncio.create_task(self.page("small", 0)),
+        ]
+        await asyncio.gather(first, *waiting)
+        self.assertEqual(self.order, ["heavy", "small", "heavy"])
+
+    async def test_pages_of_one_chat_do_not_run_at_once(self):
+        self.capacity = 3
+        running = []
+
+        async def page(owner):
+            async with self.scheduler.turn(owner, 0):
+                running.append(self.scheduler.running)
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(page("a"), page("a"), page("b"))
+        self.assertEqual(max(running), 2)
+        self.assertEqual(self.scheduler.running, 0)
+
+    async def test_cancelled_page_frees_its_place(self):
+        first = asyncio.create_task(self.page("a", 0))
+        await asyncio.sleep(0)
+        cancelled = asyncio.create_task(self.page("b", 0))
+        await asyncio.sleep(0)
+        self.assertEqual(len(self.scheduler), 1)
+        cancelled.cancel()
+        await asyncio.gather(first, self.page("c", 1))
+        self.assertEqual(self.order, ["a", "c"])
+        self.assertEqual(len(self.scheduler), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,10 +1,17 @@
 import logging
+import random
 import unittest
 from logging.config import dictConfig
 
 from bs4 import BeautifulSoup
 
 import tests.htmpl_sample
+from benchmarks.dnd_stub import (
+    make_card,
+    make_page,
+    search_url,
+    start_stub_server,
+)
 from exceptions.exceptions import EmptyDataError
 from scraper.monster_card import MonsterCard
 from scraper.scraper import (
@@ -14,11 +21,13 @@ from scraper.scraper import (
     get_link,
     get_title,
     is_last_page,
+    rate_limiter,
     read_characteristic,
     safe_method_call,
+    scrape_bestiary,
     scrape_cards,
 )
-from settings.constantns import SCRAPER_CONSTANTS
+from settings.constantns import SCRAPER_CONSTANTS, SCRAPER_SETTINGS
 from settings.log_config import log_config
 
 dictConfig(log_config)
@@ -240,5 +249,39 @@ class TestScraperFunctions(unittest.TestCase):
         self.assertEqual(result[1].title, "Monster")
 
 
+class TestScrapeDeadline(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        sleep_time = SCRAPER_SETTINGS["SLEEP_TIME"]
+        interval = rate_limiter.interval
+        SCRAPER_SETTINGS["SLEEP_TIME"] = 0.05
+        rate_limiter.interval = 0
+
+        def restore():
+            SCRAPER_SETTINGS["SLEEP_TIME"] = sleep_time
+            rate_limiter.interval = interval
+
+        self.addCleanup(restore)
+        rng = random.Random(0)
+        pages = [
+            make_page([make_card(page, rng)], page, 5) for page in range(1, 6)
+        ]
+        runner, url = await start_stub_server({"all": pages})
+        self.addAsyncCleanup(runner.cleanup)
+        self.url = search_url(url, "all")
+
+    async def test_search_without_deadline_reads_all_pages(self):
+        result = await scrape_bestiary(self.url, 0, 99)
+        self.assertFalse(result.partial)
+        self.assertEqual((result.pages_read, result.pages_total), (5, 5))
+        self.assertEqual(len(result), 5)
+
+    async def test_deadline_returns_pages_read(self):
+        result = await scrape_bestiary(self.url, 0, 99, timeout=0.08)
+        self.assertTrue(result.partial)
+        self.assertLess(result.pages_read, 5)
+        self.assertGreater(result.pages_total, result.pages_read)
+        self.assertEqual(len(result), result.pages_read)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,36 @@
+import unittest
+
+from aiogram.client.telegram import PRODUCTION
+
+from bot.singleton_bot import create_bot, PooledAiohttpSession
+from settings.constantns import BOT_API_SETTINGS
+
+TOKEN = "42:test"
+
+
+class TestCreateBot(unittest.IsolatedAsyncioTestCase):
+    async def test_official_server_by_default(self):
+        bot = create_bot(TOKEN)
+        self.assertIs(bot.session.api, PRODUCTION)
+        await bot.session.close()
+
+    async def test_self_hosted_server_and_pool(self):
+        bot = create_bot(
+            TOKEN, api_url="http://localhost:8081/", is_local=True
+        )
+        session = bot.session
+        self.assertIsInstance(session, PooledAiohttpSession)
+        self.assertEqual(
+            session.api.api_url(TOKEN, "getMe"),
+            f"http://localhost:8081/bot{TOKEN}/getMe",
+        )
+        self.assertTrue(session.api.is_local)
+        self.assertEqual(session.timeout, BOT_API_SETTINGS["TIMEOUT"])
+        client = await session.create_session()
+        self.assertEqual(client.connector.limit, BOT_API_SETTINGS["POOL_SIZE"])
+        await session.close()
+        self.assertTrue(client.closed)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import os
+import tempfile
+import time
+import unittest
+
+from aiogram.fsm.storage.base import StorageKey
+
+from bot.states import FSMSearchAC
+from bot.storage import SQLiteStorage
+from scraper.monster_card import MonsterCard
+
+
+class TestSQLiteStorage(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "fsm.sqlite3")
+        self.key = StorageKey(bot_id=1, chat_id=2, user_id=3)
+        self.storage = SQLiteStorage(self.path, flush_interval=60)
+
+    async def asyncTearDown(self):
+        await self.storage.close()
+        self.directory.cleanup()
+
+    async def test_state_and_data_are_cached(self):
+        await self.storage.set_state(self.key, FSMSearchAC.get_armor_class)
+        await self.storage.update_data(self.key, {"url_size": "size=1"})
+        self.assertEqual(
+            await self.storage.get_state(self.key),
+            FSMSearchAC.get_armor_class.state,
+        )
+        self.assertEqual(
+            await self.storage.get_data(self.key), {"url_size": "size=1"}
+        )
+
+    async def test_writes_are_coalesced(self):
+        for page in range(100):
+            await self.storage.update_data(self.key, {"page": page})
+        self.assertEqual(len(self.storage._pending), 1)
+
+    async def test_data_survives_restart(self):
+        monster = MonsterCard("Dragon", "http://example.com/dragon", 15, "1")
+        await self.storage.set_state(self.key, FSMSearchAC.sort_results)
+        await self.storage.set_data(self.key, {"monsters": [monster]})
+        await self.storage.close()
+
+        self.storage = SQLiteStorage(self.path, flush_interval=60)
+        data = await self.storage.get_data(self.key)
+        self.assertEqual(data["monsters"][0].title, "Dragon")
+        self.assertEqual(
+            await self.storage.get_state(self.key),
+            FSMSearchAC.sort_results.state,
+        )
+
+    async def test_clear_removes_key(self):
+        await self.storage.set_state(self.key, FSMSearchAC.get_url)
+        await self.storage.flush()
+        await self.storage.set_state(self.key, None)
+        await self.storage.set_data(self.key, {})
+        await self.storage.flush()
+        self.assertIsNone(self.storage._read(self.storage.make_key(self.key)))
+
+    async def test_stale_keys_expire(self):
+        self.storage.ttl = 10
+        await self.storage.set_data(self.key, {"current_language": "ru"})
+        await self.storage.flush()
+        db_key = self.storage.make_key(self.key)
+        state, data, _ = self.storage._cache[db_key]
+        self.storage._cache[db_key] = (state, data, time.time() - 20)
+        self.assertEqual(await self.storage.get_data(self.key), {})
+
+    async def test_size_follows_flushes_and_sweeps(self):
+        other = StorageKey(bot_id=1, chat_id=4, user_id=4)
+        self.assertEqual(self.storage.size(), 0)
+        await self.storage.set_state(self.key, FSMSearchAC.get_url)
+        await self.storage.set_state(other, FSMSearchAC.get_url)
+        self.assertEqual(self.storage.size(), 0)
+        await self.storage.flush()
+        self.assertEqual(self.storage.size(), 2)
+        await self.storage.set_state(self.key, FSMSearchAC.sort_results)
+        await self.storage.set_state(other, None)
+        await self.storage.flush()
+        self.assertEqual(self.storage.size(), 1)
+        self.storage.ttl = -1
+        await self.storage.expire()
+        self.assertEqual(self.storage.size(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,152 @@
+import asyncio
+import unittest
+
+from aiogram.types import Update
+
+from bot.supervisor import (
+    choose_worker,
+    distribute_updates,
+    get_chat_id,
+    watch_workers,
+    WorkerPool,
+)
+
+USER = {"id": 7, "is_bot": False, "first_name": "User"}
+CHAT = {"id": -100, "type": "group"}
+MESSAGE = {"message_id": 1, "date": 0, "chat": CHAT, "from": USER}
+
+
+def read_until_none(index, updates):
+    while updates.get() is not None:
+        pass
+
+
+class FakeQueue:
+    def __init__(self):
+        self.items = []
+
+    def put(self, item):
+        self.items.append(item)
+
+
+class FakePool:
+    def __init__(self, size):
+        self.queues = [FakeQueue() for _ in range(size)]
+        self.revived = []
+
+    def __len__(self):
+        return len(self.queues)
+
+    def revive(self, index):
+        self.revived.append(index)
+        return False
+
+
+class FakeSession:
+    timeout = 60
+
+
+class FakeBot:
+    """Answers getUpdates with the batches, then stops the supervisor."""
+
+    session = FakeSession()
+
+    def __init__(self, *batches):
+        self.batches = list(batches)
+
+    async def __call__(self, method, request_timeout):
+        if not self.batches:
+            raise asyncio.CancelledError
+        return self.batches.pop(0)
+
+
+class FakeDispatcher:
+    def resolve_used_update_types(self):
+        return ["message", "callback_query"]
+
+
+class TestRouting(unittest.TestCase):
+    def test_chat_id_of_message_callback_and_inline_updates(self):
+        self.assertEqual(
+            get_chat_id({"update_id": 1, "message": MESSAGE}), -100
+        )
+        callback = {"id": "1", "from": USER, "chat_instance": "1"}
+        self.assertEqual(
+            get_chat_id(
+                {
+                    "update_id": 2,
+                    "callback_query": {**callback, "message": MESSAGE},
+                }
+            ),
+            -100,
+        )
+        # A callback of an inline message has no chat, its user is used
+        self.assertEqual(
+            get_chat_id({"update_id": 3, "callback_query": callback}), 7
+        )
+        inline_query = {"id": "1", "from": USER, "query": "15", "offset": ""}
+        self.assertEqual(
+            get_chat_id({"update_id": 4, "inline_query": inline_query}), 7
+        )
+        self.assertEqual(get_chat_id({"update_id": 5}), 0)
+
+    def test_worker_is_stable_and_in_range(self):
+        for chat_id in range(-500, 500, 7):
+            worker = choose_worker(chat_id, 4)
+            self.assertIn(worker, range(4))
+            self.assertEqual(choose_worker(chat_id, 4), worker)
+        self.assertEqual(
+            len({choose_worker(chat_id, 4) for chat_id in range(100)}), 4
+        )
+
+
+class TestDistributeUpdates(unittest.IsolatedAsyncioTestCase):
+    async def test_updates_go_to_the_live_worker_of_their_chat(self):
+        chats = [{**CHAT, "id": chat_id} for chat_id in range(-10, 0)]
+        updates = [
+            Update.model_validate(
+                {"update_id": number, "message": {**MESSAGE, "chat": chat}}
+            )
+            for number, chat in enumerate(chats)
+        ]
+        pool = FakePool(3)
+        with self.assertLogs("bot.supervisor", level="INFO"):
+            await distribute_updates(
+                FakeDispatcher(), FakeBot(updates[:4], updates[4:]), pool
+            )
+        for update, chat in zip(updates, chats):
+            worker = choose_worker(chat["id"], 3)
+            self.assertIn(
+                update.update_id,
+                [item["update_id"] for item in pool.queues[worker].items],
+            )
+        self.assertEqual(sum(len(queue.items) for queue in pool.queues), 10)
+        self.assertEqual(
+            pool.revived,
+            [choose_worker(chat["id"], 3) for chat in chats],
+        )
+
+    async def test_watchdog_checks_every_worker(self):
+        pool = FakePool(2)
+        watchdog = asyncio.create_task(watch_workers(pool, 0.01))
+        await asyncio.sleep(0.05)
+        watchdog.cancel()
+        self.assertEqual(set(pool.revived), {0, 1})
+
+
+class TestWorkerPool(unittest.TestCase):
+    def test_dead_worker_is_started_again_on_its_queue(self):
+        pool = WorkerPool(1, read_until_none)
+        pool.start()
+        first = pool.processes[0]
+        first.kill()
+        first.join(timeout=30)
+        self.assertFalse(first.is_alive())
+        with self.assertLogs("bot.supervisor", level="ERROR"):
+            self.assertTrue(pool.revive(0))
+        self.assertIsNot(pool.processes[0], first)
+        self.assertEqual(pool.processes[0].name, "worker-0")
+        self.assertFalse(pool.revive(0))
+        # The new worker stops on the None put into the same queue
+        pool.stop(timeout=30)
+        self.assertEqual(pool.processes[0].exitcode, 0)
@@ -0,0 +1,110 @@
+import asyncio
+import random
+import unittest
+
+from benchmarks.dnd_stub import (
+    make_card,
+    make_page,
+    search_url,
+    start_stub_server,
+)
+from bestiary.bestiary import Bestiary
+from bestiary.sync import content_hash, sync_bestiary, sync_page, SyncReport
+from scraper.scraper import rate_limiter
+from settings.constantns import SCRAPER_SETTINGS
+
+
+def make_pages(numbers_per_page):
+    rng = random.Random(0)
+    return [
+        make_page(
+            [make_card(number, rng) for number in numbers],
+            page,
+            len(numbers_per_page),
+        )
+        for page, numbers in enumerate(numbers_per_page, 1)
+    ]
+
+
+class TestSync(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        sleep_time = SCRAPER_SETTINGS["SLEEP_TIME"]
+        interval = rate_limiter.interval
+        SCRAPER_SETTINGS["SLEEP_TIME"] = 0
+        rate_limiter.interval = 0
+
+        def restore():
+            SCRAPER_SETTINGS["SLEEP_TIME"] = sleep_time
+            rate_limiter.interval = interval
+
+        self.addCleanup(restore)
+        self.corpus = {"all": make_pages([[1, 2, 3], [4, 5]])}
+        runner, url = await start_stub_server(self.corpus)
+        self.addAsyncCleanup(runner.cleanup)
+        self.base_url = search_url(url, "all")
+
+    async def sync(self, bestiary, state):
+        # The stub ignores filters, every size has the full listing
+        return await sync_bestiary(
+            bestiary, state, self.base_url, {"size": ["1", "2"]}
+        )
+
+    def test_hash_ignores_page_frame(self):
+        page = make_pages([[1]])[0]
+        self.assertEqual(
+            content_hash(page),
+            content_hash(page.replace("<html>", "<html><!-- token 1 -->")),
+        )
+
+    async def test_unchanged_pages_are_not_parsed(self):
+        bestiary, state, report = await self.sync(Bestiary([], {}), {})
+        self.assertEqual(len(bestiary), 5)
+        self.assertEqual(report.pages["parsed"], 6)
+        self.assertEqual(len(report.added), 5)
+
+        again, state, report = await self.sync(bestiary, state)
+        self.assertEqual(report.pages["parsed"], 0)
+        self.assertEqual(report.pages["unchanged"], 6)
+        self.assertEqual(again.digest(), bestiary.digest())
+        self.assertEqual(report.added + report.removed + report.changed, [])
+
+    async def test_delta_is_reported_by_link(self):
+        bestiary, state, _ = await self.sync(Bestiary([], {}), {})
+        self.corpus["all"] = make_pages([[1, 2, 3], [4, 6]])
+        changed, state, report = await self.sync(bestiary, state)
+        self.assertEqual(report.pages["parsed"], 3)
+        self.assertEqual(report.pages["unchanged"], 3)
+        self.assertEqual(
+            report.added, ["https://dnd.su/bestiary/6-monster-6/"]
+        )
+        self.assertEqual(
+            report.removed, ["https://dnd.su/bestiary/5-monster-5/"]
+        )
+        self.assertEqual(
+            [monster.link for monster in changed.monsters][-1],
+            "https://dnd.su/bestiary/6-monster-6/",
+        )
+        self.assertEqual(changed.filters["size"]["1"], changed.all_bits())
+
+    async def test_timed_out_page_is_failed(self):
+        class TimedOutSession:
+            def get(self, url, headers):
+                return self
+
+            async def __aenter__(self):
+                raise asyncio.TimeoutError
+
+            async def __aexit__(self, *exc_info):
+                pass
+
+        report = SyncReport()
+        with self.assertLogs("bestiary.sync", level="ERROR"):
+            page = await sync_page(
+                TimedOutSession(), f"{self.base_url}&page=1", None, report
+            )
+        self.assertIsNone(page)
+        self.assertEqual(report.pages["failed"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import random
+import unittest
+
+from bot.text import pack_messages, select_top, split_message, telegram_length
+from scraper.monster_card import MonsterCard
+
+
+class TestSelectTop(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(0)
+        self.monsters = [
+            MonsterCard(
+                f"Monster {number}", f"/{number}", rng.randint(5, 25), "1"
+            )
+            for number in range(300)
+        ]
+
+    def test_same_as_sorted_prefix(self):
+        for key in (MonsterCard.sort_by_ac, MonsterCard.sort_by_title):
+            self.assertEqual(
+                select_top(iter(self.monsters), key, 20),
+                sorted(self.monsters, key=key)[:20],
+            )
+
+    def test_limit_above_count(self):
+        self.assertEqual(
+            len(select_top(self.monsters, MonsterCard.sort_by_ac, 1000)), 300
+        )
+
+
+class TestPackMessages(unittest.TestCase):
+    def test_cards_are_not_split(self):
+        cards = [
+            f"Card {number}:" + "x" * (number % 7 * 30)
+            for number in range(200)
+        ]
+        messages = list(pack_messages(cards, max_length=500))
+        self.assertTrue(all(len(message) <= 500 for message in messages))
+        self.assertEqual(
+            [card for message in messages for card in message.split("\n\n")],
+            cards,
+        )
+        self.assertLessEqual(
+            len(messages), len(list(split_message("\n\n".join(cards), 500)))
+        )
+
+    def test_message_is_filled_up_to_the_limit(self):
+        self.assertEqual(
+            list(pack_messages(["aa", "bb", "cc"], max_length=6)),
+            ["aa\n\nbb", "cc"],
+        )
+
+    def test_long_card_is_split_alone(self):
+        self.assertEqual(
+            list(pack_messages(["a", "b" * 12, "c"], max_length=5)),
+            ["a", "bbbbb", "bbbbb", "bb", "c"],
+        )
+
+    def test_length_in_utf16_units(self):
+        self.assertEqual(
+            list(pack_messages(["🐉", "🐉"], max_length=5)), ["🐉", "🐉"]
+        )
+
+
+class TestSplitMessage(unittest.TestCase):
+    def test_examples(self):
+        self.assertEqual(
+            list(split_message("Hello, World!", 5)), ["Hello", ", Wor", "ld!"]
+        )
+        self.assertEqual(
+            list(split_message("Hello\n\nWorld!", 7)), ["Hello", "World!"]
+        )
+
+    def test_parts_fit_in_utf16_units(self):
+        self.assertEqual(list(split_message("🐉a🐉🐉", 3)), ["🐉a", "🐉", "🐉"])
+        card = "Dragon🐉" * 1000
+        parts = list(pack_messages([card], max_length=4096))
+        self.assertEqual("".join(parts), card)
+        self.assertTrue(all(telegram_length(part) <= 4096 for part in parts))
+
+
+if __name__ == "__main__":
+    unittest.main()
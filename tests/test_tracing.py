@@ -0,0 +1,56 @@
+import asyncio
+import json
+import unittest
+
+from tracing.summary import summarize
+from tracing.tracer import awaiting, current_span, span
+
+
+class TestTracer(unittest.IsolatedAsyncioTestCase):
+    async def test_span_without_trace_is_not_recorded(self):
+        with span("orphan") as orphan:
+            self.assertIsNone(orphan)
+            self.assertIsNone(current_span())
+
+    async def test_children_share_trace_and_export_json(self):
+        with self.assertLogs("tracing.export", level="INFO") as logs:
+            with span("handler", trace_id="abc", chat_id=1) as root:
+                with span("scrape") as child:
+                    with awaiting():
+                        await asyncio.sleep(0.01)
+        spans = [json.loads(record.getMessage()) for record in logs.records]
+        self.assertEqual(
+            [item["name"] for item in spans], ["scrape", "handler"]
+        )
+        self.assertEqual(spans[0]["parent_id"], root.span_id)
+        self.assertEqual(spans[1]["chat_id"], 1)
+        self.assertTrue(all(item["trace_id"] == "abc" for item in spans))
+        self.assertGreater(child.await_time, 0)
+        self.assertGreaterEqual(root.await_time, child.await_time)
+        self.assertGreaterEqual(root.wall_time, root.await_time)
+        self.assertIsNone(current_span())
+
+
+class TestSummary(unittest.TestCase):
+    def test_slowest_traces_and_stage_percentiles(self):
+        spans = [
+            {"trace_id": "a", "parent_id": None, "name": "h1",
+             "wall_ms": 10.0, "await_ms": 5.0},
+            {"trace_id": "a", "parent_id": "x", "name": "scrape",
+             "wall_ms": 8.0, "await_ms": 5.0},
+            {"trace_id": "b", "parent_id": None, "name": "h1",
+             "wall_ms": 50.0, "await_ms": 1.0},
+            {"trace_id": "b", "parent_id": None, "name": "h2",
+             "wall_ms": 20.0, "await_ms": 1.0},
+        ]  # fmt: skip
+        summary = summarize(spans, top=1)
+        self.assertEqual(len(summary["traces"]), 1)
+        self.assertEqual(summary["traces"][0]["trace_id"], "b")
+        self.assertEqual(summary["traces"][0]["wall_ms"], 70.0)
+        self.assertEqual(summary["stages"]["h1"]["count"], 2)
+        self.assertEqual(summary["stages"]["h1"]["wall_p99_ms"], 50.0)
+        self.assertEqual(summary["stages"]["scrape"]["await_p50_ms"], 5.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import asyncio
+import unittest
+
+from aiogram import Bot
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+from bot.webhook import LimitedRequestHandler
+
+SECRET = "secret"
+
+
+class FakeDispatcher:
+    def __init__(self):
+        self.release = asyncio.Event()
+        self.running = 0
+        self.max_running = 0
+        self.fed = []
+
+    async def feed_raw_update(self, bot, update):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await self.release.wait()
+        finally:
+            self.running -= 1
+        self.fed.append(update["update_id"])
+
+
+class TestLimitedRequestHandler(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.dispatcher = FakeDispatcher()
+        self.handler = LimitedRequestHandler(
+            dispatcher=self.dispatcher,
+            bot=Bot("42:TEST"),
+            secret_token=SECRET,
+            max_concurrent_updates=2,
+            shutdown_timeout=1,
+        )
+        app = web.Application()
+        self.handler.register(app, path="/webhook")
+        self.client = TestClient(TestServer(app))
+        await self.client.start_server()
+        self.addAsyncCleanup(self.client.close)
+
+    async def post(self, update_id, secret=SECRET):
+        return await self.client.post(
+            "/webhook",
+            json={"update_id": update_id},
+            headers={"X-Telegram-Bot-Api-Secret-Token": secret},
+        )
+
+    async def test_updates_are_limited_and_drained_on_close(self):
+        for update_id in range(5):
+            response = await self.post(update_id)
+            self.assertEqual(response.status, 200)
+        await asyncio.sleep(0.01)
+        self.assertEqual(self.dispatcher.max_running, 2)
+        self.assertEqual(self.dispatcher.fed, [])
+
+        asyncio.get_running_loop().call_later(
+            0.01, self.dispatcher.release.set
+        )
+        await self.handler.close()
+        self.assertEqual(sorted(self.dispatcher.fed), list(range(5)))
+
+    async def test_updates_left_after_timeout_are_cancelled(self):
+        await self.post(1)
+        await asyncio.sleep(0.01)
+        self.handler.shutdown_timeout = 0.01
+        await self.handler.close()
+        self.assertEqual(self.dispatcher.running, 0)
+        self.assertEqual(self.dispatcher.fed, [])
+
+    async def test_wrong_secret_is_rejected(self):
+        response = await self.post(1, secret="wrong")
+        self.assertEqual(response.status, 401)
+        await asyncio.sleep(0.01)
+        self.assertEqual(self.dispatcher.max_running, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
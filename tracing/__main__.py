@@ -0,0 +1,3 @@
+from tracing.summary import main
+
+main()
@@ -0,0 +1,125 @@
+"""
+The module summarizes exported traces: the slowest searches and the
+latency of every stage.
+
+Run: python -m tracing [--file logs/traces.jsonl] [--top 10]
+"""
+import argparse
+import json
+import os
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List
+
+DEFAULT_TRACES_PATH = os.path.abspath("logs/traces.jsonl")
+
+
+def read_spans(path: str) -> Iterable[Dict[str, Any]]:
+    with open(path, encoding="utf-8") as traces:
+        for line in traces:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+def percentile(values: List[float], share: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(int(share * len(ordered)), len(ordered) - 1)
+    return ordered[index]
+
+
+def summarize(spans: Iterable[Dict[str, Any]], top: int) -> Dict[str, Any]:
+    """
+    Group spans into traces and stages.
+
+    Args:
+        spans (Iterable[Dict[str, Any]]): Exported spans.
+        top (int): How many slowest traces to return.
+
+    Returns:
+        Dict[str, Any]: "traces" - the slowest traces with time per root
+        stage, "stages" - wall and await percentiles of every span name.
+    """
+    traces: Dict[str, Dict[str, Any]] = defaultdict(
+        lambda: {"wall_ms": 0.0, "await_ms": 0.0, "stages": defaultdict(float)}
+    )
+    stages: Dict[str, Dict[str, List[float]]] = defaultdict(
+        lambda: {"wall_ms": [], "await_ms": []}
+    )
+    for span in spans:
+        stages[span["name"]]["wall_ms"].append(span["wall_ms"])
+        stages[span["name"]]["await_ms"].append(span["await_ms"])
+        if span.get("parent_id") is None:
+            trace = traces[span["trace_id"]]
+            trace["wall_ms"] += span["wall_ms"]
+            trace["await_ms"] += span["await_ms"]
+            trace["stages"][span["name"]] += span["wall_ms"]
+    slowest = sorted(
+        traces.items(), key=lambda item: item[1]["wall_ms"], reverse=True
+    )[:top]
+    return {
+        "traces": [
+            {"trace_id": trace_id, **trace} for trace_id, trace in slowest
+        ],
+        "stages": {
+            name: {
+                "count": len(values["wall_ms"]),
+                "wall_p50_ms": percentile(values["wall_ms"], 0.5),
+                "wall_p99_ms": percentile(values["wall_ms"], 0.99),
+                "await_p50_ms": percentile(values["await_ms"], 0.5),
+                "await_p99_ms": percentile(values["await_ms"], 0.99),
+            }
+            for name, values in stages.items()
+        },
+    }
+
+
+def print_summary(summary: Dict[str, Any]) -> None:
+    print("Slowest traces")
+    for trace in summary["traces"]:
+        print(
+            f"  {trace['trace_id']}  wall {trace['wall_ms']:10.1f} ms"
+            f"  await {trace['await_ms']:10.1f} ms"
+        )
+        for name, wall_ms in sorted(
+            trace["stages"].items(), key=lambda item: item[1], reverse=True
+        ):
+            share = wall_ms / trace["wall_ms"] * 100 if trace["wall_ms"] else 0
+            print(f"      {name:<36}{wall_ms:10.1f} ms {share:5.1f}%")
+    print("\nStages")
+    print(
+        f"  {'name':<36}{'count':>7}{'wall p50':>11}{'wall p99':>11}"
+        f"{'await p50':>11}{'await p99':>11}"
+    )
+    for name, stage in sorted(
+        summary["stages"].items(),
+        key=lambda item: item[1]["wall_p99_ms"],
+        reverse=True,
+    ):
+        print(
+            f"  {name:<36}{stage['count']:>7}{stage['wall_p50_ms']:>11.1f}"
+            f"{stage['wall_p99_ms']:>11.1f}{stage['await_p50_ms']:>11.1f}"
+            f"{stage['await_p99_ms']:>11.1f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Summarize the slowest search traces"
+    )
+    parser.add_argument("--file", default=DEFAULT_TRACES_PATH)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument(
+        "--json", action="store_true", help="print the summary as JSON"
+    )
+    args = parser.parse_args()
+    summary = summarize(read_spans(args.file), args.top)
+    if args.json:
+        print(json.dumps(summary, indent=2, ensure_ascii=False))
+    else:
+        print_summary(summary)
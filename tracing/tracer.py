@@ -0,0 +1,139 @@
+"""
+The module contains lightweight span-based tracing of searches.
+
+A trace is one search from the first button press to the final message.
+Its id is kept in the FSM data under TRACE_ID_KEY, so all updates of the
+search belong to one trace. Every step is a span that records its wall time
+and the time spent awaiting I/O, finished spans are exported as JSON lines
+through the "tracing.export" logger (see log_config).
+"""
+import json
+import logging
+import secrets
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+export_logger = logging.getLogger("tracing.export")
+
+TRACE_ID_KEY = "trace_id"
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar(
+    "current_span", default=None
+)
+
+
+def new_trace_id() -> str:
+    return secrets.token_hex(8)
+
+
+class Span:
+    """
+    One traced step.
+
+    Attributes:
+        name (str): The name of the step.
+        trace_id (str): The id of the trace the span belongs to.
+        span_id (str): The id of the span.
+        parent (Optional[Span]): The enclosing span.
+        attributes (Dict[str, Any]): Additional exported values.
+        start (float): Unix time of the start.
+        wall_time (float): Seconds from the start to the end.
+        await_time (float): Seconds spent in awaited I/O inside the span.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        trace_id: str,
+        parent: Optional["Span"] = None,
+        attributes: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        self.name: str = name
+        self.trace_id: str = trace_id
+        self.span_id: str = secrets.token_hex(4)
+        self.parent: Optional[Span] = parent
+        self.attributes: Dict[str, Any] = attributes or {}
+        self.start: float = time.time()
+        self.wall_time: float = 0.0
+        self.await_time: float = 0.0
+        self._started: float = time.perf_counter()
+
+    def finish(self) -> None:
+        self.wall_time = time.perf_counter() - self._started
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent.span_id if self.parent else None,
+            "name": self.name,
+            "start": round(self.start, 6),
+            "wall_ms": round(self.wall_time * 1000, 3),
+            "await_ms": round(self.await_time * 1000, 3),
+            **self.attributes,
+        }
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+@contextmanager
+def span(
+    name: str, trace_id: Optional[str] = None, **attributes: Any
+) -> Iterator[Optional[Span]]:
+    """
+    Trace the block as a span.
+
+    Without trace_id the span is a child of the current span. If there is
+    no current span and no trace_id, nothing is traced.
+
+    Args:
+        name (str): The name of the step.
+        trace_id (Optional[str]): Starts a root span of this trace.
+        **attributes: Values exported with the span.
+
+    Yields:
+        Optional[Span]: The span or None if nothing is traced.
+    """
+    parent = _current_span.get()
+    if trace_id is None:
+        if parent is None:
+            yield None
+            return
+        trace_id = parent.trace_id
+    current = Span(name, trace_id, parent, attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    finally:
+        _current_span.reset(token)
+        current.finish()
+        export(current)
+
+
+@contextmanager
+def awaiting() -> Iterator[None]:
+    """
+    Count the block as awaited I/O time of the current span and of all
+    its parents.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        traced = _current_span.get()
+        while traced is not None:
+            traced.await_time += elapsed
+            traced = traced.parent
+
+
+def export(finished: Span) -> None:
+    if export_logger.isEnabledFor(logging.INFO):
+        export_logger.info(
+            json.dumps(finished.to_dict(), ensure_ascii=False, default=str)
+        )